@@ -0,0 +1,377 @@
+"""
+Header-only EXIF reader for JPEG, PNG and HEIC/HEIF files.
+
+Only the container metadata is read: JPEG marker segments up to the first
+scan, PNG chunks up to the first IDAT, and the HEIF 'meta' box plus the Exif
+item it points to. Pixel data is never read or decoded. Only the tags the
+Phase A analysis consumes are decoded; everything else, such as MakerNote
+blobs, is skipped.
+
+Values are formatted the way str() formats Pillow's EXIF values, so rows
+match those produced through extract_exif_data().
+"""
+import os
+import struct
+
+# Tags decoded from IFD0 and the Exif sub-IFD
+IFD0_TAGS = {
+    0x010F: 'Make',
+    0x0110: 'Model',
+    0x0112: 'Orientation',
+    0x0132: 'DateTime',
+}
+EXIF_IFD_TAGS = {
+    0x829A: 'ExposureTime',
+    0x8827: 'ISOSpeedRatings',
+    0x9209: 'Flash',
+    0x920A: 'FocalLength',
+}
+EXIF_IFD_POINTER = 0x8769
+
+# TIFF field type -> (struct format, size in bytes)
+TIFF_TYPES = {
+    1: ('B', 1),   # BYTE
+    2: ('s', 1),   # ASCII
+    3: ('H', 2),   # SHORT
+    4: ('L', 4),   # LONG
+    5: ('LL', 8),  # RATIONAL
+    7: ('s', 1),   # UNDEFINED
+    9: ('l', 4),   # SLONG
+    10: ('ll', 8), # SRATIONAL
+}
+
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+JPEG_MODES = {1: 'L', 3: 'RGB', 4: 'CMYK'}
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+PNG_MODES = {0: 'L', 2: 'RGB', 3: 'P', 4: 'LA', 6: 'RGBA'}
+HEIF_BRANDS = {b'heic', b'heix', b'heim', b'heis', b'hevc', b'hevx', b'mif1', b'msf1', b'avif'}
+
+
+def read_exif_header(image_path):
+    """
+    Read dimensions, format and the consumed EXIF tags from an image header.
+
+    Returns a dict shaped like extract_exif_data()'s result (tag names plus
+    'Width', 'Height', 'Format' and, where the header says, 'Mode'), or
+    {'Error': ...} if the file is unreadable or not JPEG/PNG/HEIF.
+    """
+    try:
+        with open(image_path, 'rb') as f:
+            start = f.read(12)
+            f.seek(0)
+            if start[:2] == b'\xff\xd8':
+                return _read_jpeg_header(f)
+            if start[:8] == PNG_SIGNATURE:
+                return _read_png_header(f)
+            if start[4:8] == b'ftyp' and start[8:12] in HEIF_BRANDS:
+                return _read_heif_header(f)
+        return {'Error': f"Unsupported image format: {os.path.basename(image_path)}"}
+    except Exception as e:
+        return {'Error': str(e)}
+
+
+def _read_exact(f, size):
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError("Truncated image header")
+    return data
+
+
+def _read_jpeg_header(f):
+    """Walk JPEG marker segments until the start of scan"""
+    result = {'Format': 'JPEG'}
+    f.seek(2)
+    while True:
+        byte = _read_exact(f, 1)
+        if byte != b'\xff':
+            raise ValueError("Invalid JPEG marker")
+        marker = _read_exact(f, 1)[0]
+        while marker == 0xFF:  # fill bytes
+            marker = _read_exact(f, 1)[0]
+        if marker == 0xDA or marker == 0xD9:  # start of scan / end of image
+            break
+        if 0xD0 <= marker <= 0xD7 or marker == 0x01:  # markers without a length
+            continue
+        length = struct.unpack('>H', _read_exact(f, 2))[0] - 2
+        if marker == 0xE1 and 'exif' not in result:
+            payload = _read_exact(f, length)
+            if payload.startswith(b'Exif\x00\x00'):
+                result['exif'] = payload[6:]
+        elif marker in JPEG_SOF_MARKERS:
+            _precision, height, width, components = struct.unpack('>BHHB', _read_exact(f, 6))
+            result['Width'] = width
+            result['Height'] = height
+            if components in JPEG_MODES:
+                result['Mode'] = JPEG_MODES[components]
+            f.seek(length - 6, os.SEEK_CUR)
+        else:
+            f.seek(length, os.SEEK_CUR)
+    return _finish(result)
+
+
+def _read_png_header(f):
+    """Walk PNG chunks until the first image data chunk"""
+    result = {'Format': 'PNG'}
+    f.seek(len(PNG_SIGNATURE))
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            break
+        length, chunk_type = struct.unpack('>I4s', header)
+        if chunk_type in (b'IDAT', b'IEND'):
+            break
+        if chunk_type == b'IHDR':
+            width, height, _bit_depth, color_type = struct.unpack('>IIBB', _read_exact(f, 10))
+            result['Width'] = width
+            result['Height'] = height
+            if color_type in PNG_MODES:
+                result['Mode'] = PNG_MODES[color_type]
+            f.seek(length - 10 + 4, os.SEEK_CUR)
+        elif chunk_type == b'eXIf':
+            payload = _read_exact(f, length)
+            if payload.startswith(b'Exif\x00\x00'):
+                payload = payload[6:]
+            result['exif'] = payload
+            f.seek(4, os.SEEK_CUR)
+        else:
+            f.seek(length + 4, os.SEEK_CUR)  # skip data and CRC
+    return _finish(result)
+
+
+def _iter_boxes(data, offset=0, end=None):
+    """Yield (type, payload start, payload end) for ISO BMFF boxes in data[offset:end]"""
+    end = len(data) if end is None else end
+    while offset + 8 <= end:
+        size, box_type = struct.unpack_from('>I4s', data, offset)
+        header = 8
+        if size == 1:
+            size = struct.unpack_from('>Q', data, offset + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header:
+            break
+        yield box_type, offset + header, min(offset + size, end)
+        offset += size
+
+
+def _read_heif_header(f):
+    """Read the top-level HEIF 'meta' box and the Exif item it references"""
+    result = {'Format': 'HEIF'}
+    meta = None
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            break
+        size, box_type = struct.unpack('>I4s', header)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack('>Q', _read_exact(f, 8))[0]
+            header_size = 16
+        if box_type == b'meta':
+            meta = _read_exact(f, size - header_size)
+            break
+        if size == 0 or box_type == b'mdat':
+            break
+        f.seek(size - header_size, os.SEEK_CUR)
+    if meta is None:
+        return _finish(result)
+
+    # 'meta' is a full box: skip version/flags before its children
+    children = {box_type: (start, end) for box_type, start, end in _iter_boxes(meta, 4)}
+    primary_id = None
+    if b'pitm' in children:
+        start, _ = children[b'pitm']
+        version = meta[start]
+        primary_id = struct.unpack_from('>H' if version == 0 else '>I', meta, start + 4)[0]
+
+    exif_id = None
+    if b'iinf' in children:
+        exif_id = _find_heif_item(meta, *children[b'iinf'], item_type=b'Exif')
+
+    if b'iprp' in children and primary_id is not None:
+        size = _find_heif_primary_size(meta, *children[b'iprp'], item_id=primary_id)
+        if size:
+            result['Width'], result['Height'] = size
+
+    if exif_id is not None and b'iloc' in children:
+        location = _find_heif_item_location(meta, *children[b'iloc'], item_id=exif_id)
+        if location:
+            offset, length = location
+            f.seek(offset)
+            item = _read_exact(f, length)
+            tiff_offset = struct.unpack_from('>I', item)[0]
+            result['exif'] = item[4 + tiff_offset:]
+    return _finish(result)
+
+
+def _find_heif_item(data, start, end, item_type):
+    """Return the ID of the first item of item_type listed in an 'iinf' box"""
+    version = data[start]
+    offset = start + 4 + (2 if version == 0 else 4)
+    for box_type, infe_start, _infe_end in _iter_boxes(data, offset, end):
+        if box_type != b'infe':
+            continue
+        infe_version = data[infe_start]
+        if infe_version < 2:
+            continue
+        id_format = '>H' if infe_version == 2 else '>I'
+        id_size = struct.calcsize(id_format)
+        item_id = struct.unpack_from(id_format, data, infe_start + 4)[0]
+        found_type = data[infe_start + 4 + id_size + 2:infe_start + 4 + id_size + 6]
+        if found_type == item_type:
+            return item_id
+    return None
+
+
+def _read_sized_int(data, offset, size):
+    if size == 0:
+        return 0, offset
+    value = int.from_bytes(data[offset:offset + size], 'big')
+    return value, offset + size
+
+
+def _find_heif_item_location(data, start, end, item_id):
+    """Return (file offset, length) of an item's first extent from an 'iloc' box"""
+    version = data[start]
+    offset = start + 4
+    sizes = data[offset] << 8 | data[offset + 1]
+    offset_size, length_size = sizes >> 12, (sizes >> 8) & 0xF
+    base_offset_size = (sizes >> 4) & 0xF
+    index_size = sizes & 0xF if version in (1, 2) else 0
+    offset += 2
+    count_format = '>H' if version < 2 else '>I'
+    item_count = struct.unpack_from(count_format, data, offset)[0]
+    offset += struct.calcsize(count_format)
+
+    for _ in range(item_count):
+        current_id = struct.unpack_from(count_format, data, offset)[0]
+        offset += struct.calcsize(count_format)
+        construction_method = 0
+        if version in (1, 2):
+            construction_method = struct.unpack_from('>H', data, offset)[0] & 0xF
+            offset += 2
+        offset += 2  # data_reference_index
+        base_offset, offset = _read_sized_int(data, offset, base_offset_size)
+        extent_count = struct.unpack_from('>H', data, offset)[0]
+        offset += 2
+        extents = []
+        for _ in range(extent_count):
+            _index, offset = _read_sized_int(data, offset, index_size)
+            extent_offset, offset = _read_sized_int(data, offset, offset_size)
+            extent_length, offset = _read_sized_int(data, offset, length_size)
+            extents.append((base_offset + extent_offset, extent_length))
+        if current_id == item_id:
+            # Only items stored in the file itself (construction method 0) are supported
+            if construction_method != 0 or not extents:
+                return None
+            return extents[0]
+    return None
+
+
+def _find_heif_primary_size(data, start, end, item_id):
+    """Return (width, height) from the 'ispe' property associated with item_id"""
+    boxes = {box_type: (box_start, box_end) for box_type, box_start, box_end in _iter_boxes(data, start, end)}
+    if b'ipco' not in boxes or b'ipma' not in boxes:
+        return None
+    properties = list(_iter_boxes(data, *boxes[b'ipco']))
+
+    ipma_start, _ = boxes[b'ipma']
+    version, flags = data[ipma_start], int.from_bytes(data[ipma_start + 1:ipma_start + 4], 'big')
+    offset = ipma_start + 4
+    entry_count = struct.unpack_from('>I', data, offset)[0]
+    offset += 4
+    for _ in range(entry_count):
+        id_format = '>H' if version < 1 else '>I'
+        current_id = struct.unpack_from(id_format, data, offset)[0]
+        offset += struct.calcsize(id_format)
+        association_count = data[offset]
+        offset += 1
+        for _ in range(association_count):
+            if flags & 1:
+                index = struct.unpack_from('>H', data, offset)[0] & 0x7FFF
+                offset += 2
+            else:
+                index = data[offset] & 0x7F
+                offset += 1
+            if current_id != item_id or not 0 < index <= len(properties):
+                continue
+            box_type, box_start, _box_end = properties[index - 1]
+            if box_type == b'ispe':
+                return struct.unpack_from('>II', data, box_start + 4)
+    return None
+
+
+def _finish(result):
+    """Decode the collected TIFF block (if any) into the wanted tags"""
+    exif = result.pop('exif', None)
+    if exif:
+        result.update(parse_tiff_tags(exif))
+    return result
+
+
+def parse_tiff_tags(data):
+    """Decode the consumed IFD0 and Exif sub-IFD tags from a TIFF/EXIF block"""
+    if data.startswith(b'Exif\x00\x00'):
+        data = data[6:]
+    if data[:2] == b'II':
+        endian = '<'
+    elif data[:2] == b'MM':
+        endian = '>'
+    else:
+        return {}
+    ifd0_offset = struct.unpack_from(endian + 'I', data, 4)[0]
+    tags = {}
+    pointers = _read_ifd(data, endian, ifd0_offset, IFD0_TAGS, tags)
+    if EXIF_IFD_POINTER in pointers:
+        _read_ifd(data, endian, pointers[EXIF_IFD_POINTER], EXIF_IFD_TAGS, tags)
+    return tags
+
+
+def _read_ifd(data, endian, offset, wanted, tags):
+    """Decode wanted tags of one IFD into tags; return {tag: offset} for the Exif IFD pointer"""
+    pointers = {}
+    if offset + 2 > len(data):
+        return pointers
+    entry_count = struct.unpack_from(endian + 'H', data, offset)[0]
+    for index in range(entry_count):
+        entry = offset + 2 + index * 12
+        if entry + 12 > len(data):
+            break
+        tag, field_type, count = struct.unpack_from(endian + 'HHI', data, entry)
+        if tag == EXIF_IFD_POINTER:
+            pointers[tag] = struct.unpack_from(endian + 'I', data, entry + 8)[0]
+            continue
+        if tag not in wanted or field_type not in TIFF_TYPES:
+            continue
+        value_format, value_size = TIFF_TYPES[field_type]
+        total = value_size * count
+        if total <= 4:
+            value_offset = entry + 8
+        else:
+            value_offset = struct.unpack_from(endian + 'I', data, entry + 8)[0]
+        if value_offset + total > len(data):
+            continue
+        tags[wanted[tag]] = _format_value(data, endian, field_type, value_format, count, value_offset)
+    return pointers
+
+
+def _format_value(data, endian, field_type, value_format, count, offset):
+    """Format a TIFF value as str() of the value Pillow would return"""
+    if field_type in (2, 7):
+        raw = data[offset:offset + count]
+        if field_type == 2:
+            return raw.split(b'\x00', 1)[0].decode('utf-8', 'replace')
+        return str(raw)
+    values = []
+    step = struct.calcsize(endian + value_format)
+    for index in range(count):
+        unpacked = struct.unpack_from(endian + value_format, data, offset + index * step)
+        if len(unpacked) == 2:
+            numerator, denominator = unpacked
+            values.append(numerator / denominator if denominator else float('nan'))
+        else:
+            values.append(unpacked[0])
+    if len(values) == 1:
+        return str(values[0])
+    return str(tuple(values))
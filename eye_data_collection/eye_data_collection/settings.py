@@ -142,13 +142,57 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # File upload settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10MB
+UPLOAD_MAX_FILE_SIZE = 10485760  # 10MB, same as SubmissionForm.MAX_FILE_SIZE
+
+# Reject oversized and non-image files while they stream in, before spooling
+FILE_UPLOAD_HANDLERS = [
+    'uploads.upload_handlers.ImageUploadGuardHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
 
 # WhiteNoise configuration for static files
 STORAGES = {
     "default": {
         "BACKEND": "django.core.files.storage.FileSystemStorage",
     },
+    # Submission images: one blob per unique content under MEDIA_ROOT (uploads.storage)
+    "eye_images": {
+        "BACKEND": "uploads.storage.ContentAddressedStorage",
+    },
     "staticfiles": {
         "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
     },
 }
+
+# Background quality scoring (python manage.py process_submissions)
+PROCESSING_MAX_ATTEMPTS = config('PROCESSING_MAX_ATTEMPTS', default=5, cast=int)
+PROCESSING_RETRY_BASE_SECONDS = config('PROCESSING_RETRY_BASE_SECONDS', default=10, cast=int)
+PROCESSING_RETRY_MAX_SECONDS = config('PROCESSING_RETRY_MAX_SECONDS', default=3600, cast=int)
+PROCESSING_LEASE_SECONDS = config('PROCESSING_LEASE_SECONDS', default=600, cast=int)
+
+# Upload quality gate (uploads.forms.SubmissionForm), off unless QUALITY_GATE_ENABLED is set
+# Eye images below these thresholds are rejected with a "please retake" message.
+# Thresholds are full-resolution values, as in the Phase A analysis; the sharpness check runs on a
+# decode downscaled to about QUALITY_GATE_WORKING_SIZE and adjusts the threshold for that scale.
+# The brightness/sharpness check is skipped (header-only) when it would exceed QUALITY_GATE_BUDGET_MS.
+QUALITY_GATE_ENABLED = config('QUALITY_GATE_ENABLED', default=False, cast=bool)
+QUALITY_GATE_MIN_MEGAPIXELS = config('QUALITY_GATE_MIN_MEGAPIXELS', default=2.0, cast=float)
+QUALITY_GATE_MIN_BRIGHTNESS = config('QUALITY_GATE_MIN_BRIGHTNESS', default=100.0, cast=float)
+QUALITY_GATE_MIN_SHARPNESS = config('QUALITY_GATE_MIN_SHARPNESS', default=40.0, cast=float)
+QUALITY_GATE_BUDGET_MS = config('QUALITY_GATE_BUDGET_MS', default=200, cast=int)
+QUALITY_GATE_WORKING_SIZE = config('QUALITY_GATE_WORKING_SIZE', default=768, cast=int)
+
+# Resumable (tus-style) chunked uploads: partial files stay on local disk until finalized
+RESUMABLE_UPLOAD_DIR = config('RESUMABLE_UPLOAD_DIR', default=str(MEDIA_ROOT / 'partial_uploads'))
+RESUMABLE_UPLOAD_EXPIRY_HOURS = config('RESUMABLE_UPLOAD_EXPIRY_HOURS', default=24, cast=int)
+
+# Near-duplicate search: maximum dHash Hamming distance (of 64 bits) between two copies of a photo
+NEAR_DUPLICATE_MAX_DISTANCE = config('NEAR_DUPLICATE_MAX_DISTANCE', default=6, cast=int)
+
+# Normalized image derivatives written at ingest (auto-oriented, progressive JPEG, no metadata)
+DERIVATIVE_MAX_LONG_EDGE = config('DERIVATIVE_MAX_LONG_EDGE', default=2048, cast=int)
+DERIVATIVE_JPEG_QUALITY = config('DERIVATIVE_JPEG_QUALITY', default=85, cast=int)
+
+# Background exports: finished archives are written here (outside MEDIA_ROOT, served to staff only)
+EXPORT_DIR = config('EXPORT_DIR', default=str(BASE_DIR / 'exports'))
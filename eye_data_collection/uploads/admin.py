@@ -1,12 +1,30 @@
-from django.contrib import admin
-from django.http import HttpResponse
+from django.conf import settings
+from django.contrib import admin, messages
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
 from django.utils import timezone
+from django.utils.html import format_html
 import csv
 import json
-import zipfile
-import os
-from io import BytesIO, StringIO
-from .models import Submission
+from . import fingerprints
+from .exports import (
+    CSV_HEADER, csv_row, iterate_by_pk, json_record, stream_csv, stream_ndjson, stream_zip, submission_values,
+    zip_entries,
+)
+from .models import ExportCheckpoint, ExportJob, ImageQualityMetrics, ProcessingJob, Submission
+
+
+class ImageQualityMetricsInline(admin.TabularInline):
+    """Read-only quality metrics computed by the background worker"""
+    model = ImageQualityMetrics
+    extra = 0
+    can_delete = False
+    readonly_fields = ('eye_side', 'resolution', 'megapixels', 'aspect_ratio',
+                       'file_size_kb', 'brightness', 'sharpness_score', 'computed_at')
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(Submission)
@@ -24,6 +42,7 @@ class SubmissionAdmin(admin.ModelAdmin):
         'has_left_eye',
         'has_right_eye',
         'has_camera_specs',
+        'processing_status',
     )
     
     # Add filtering capabilities
@@ -60,8 +79,15 @@ class SubmissionAdmin(admin.ModelAdmin):
         }),
     )
     
+    inlines = [ImageQualityMetricsInline]
+
     # Actions for bulk operations
-    actions = ['export_as_csv', 'export_as_json', 'export_as_zip']
+    actions = [
+        'export_as_csv', 'export_as_json', 'export_as_csv_streaming', 'export_as_ndjson',
+        'export_as_zip', 'export_as_zip_normalized',
+        'queue_export_csv', 'queue_export_json', 'queue_export_zip', 'queue_export_zip_normalized',
+        'find_near_duplicates',
+    ]
     
     def has_left_eye(self, obj):
         """Display whether left eye image exists"""
@@ -80,6 +106,15 @@ class SubmissionAdmin(admin.ModelAdmin):
         return bool(obj.camera_specs_image)
     has_camera_specs.boolean = True
     has_camera_specs.short_description = 'Camera Specs'
+
+    def processing_status(self, obj):
+        """Display the background quality-scoring status"""
+        job = getattr(obj, 'processing_job', None)
+        return job.get_status_display() if job else '-'
+    processing_status.short_description = 'Scoring'
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('processing_job')
     
     def export_as_csv(self, request, queryset):
         """
@@ -91,29 +126,11 @@ class SubmissionAdmin(admin.ModelAdmin):
         response['Content-Disposition'] = f'attachment; filename="{filename}"'
         
         writer = csv.writer(response)
-        
-        # Write header
-        header = [
-            'Submission ID',
-            'Submitted At',
-            'IP Address',
-            'Left Eye Image',
-            'Right Eye Image',
-            'Camera Specs Image',
-        ]
-        writer.writerow(header)
+        writer.writerow(CSV_HEADER)
         
         # Write data rows
         for submission in queryset:
-            row = [
-                submission.id,
-                submission.submitted_at.strftime('%Y-%m-%d %H:%M:%S'),
-                submission.ip_address or '',
-                submission.left_eye_image.name if submission.left_eye_image else '',
-                submission.right_eye_image.name if submission.right_eye_image else '',
-                submission.camera_specs_image.name if submission.camera_specs_image else '',
-            ]
-            writer.writerow(row)
+            writer.writerow(csv_row(submission_values(submission)))
         
         self.message_user(
             request,
@@ -133,19 +150,7 @@ class SubmissionAdmin(admin.ModelAdmin):
         response['Content-Disposition'] = f'attachment; filename="{filename}"'
         
         # Build data structure
-        data = []
-        for submission in queryset:
-            submission_data = {
-                'submission_id': submission.id,
-                'submitted_at': submission.submitted_at.isoformat(),
-                'ip_address': submission.ip_address,
-                'images': {
-                    'left_eye': submission.left_eye_image.name if submission.left_eye_image else None,
-                    'right_eye': submission.right_eye_image.name if submission.right_eye_image else None,
-                    'camera_specs': submission.camera_specs_image.name if submission.camera_specs_image else None,
-                }
-            }
-            data.append(submission_data)
+        data = [json_record(submission_values(submission)) for submission in queryset]
         
         # Write JSON
         json.dump(data, response, indent=2)
@@ -158,7 +163,35 @@ class SubmissionAdmin(admin.ModelAdmin):
     
     export_as_json.short_description = 'Export selected submissions as JSON'
 
-    def export_as_zip(self, request, queryset):
+    def export_as_csv_streaming(self, request, queryset):
+        """
+        Export selected submissions as CSV, streamed while the rows are read.
+        Only the exported columns are fetched, in chunks, in one pass.
+        """
+        response = StreamingHttpResponse(stream_csv(queryset), content_type='text/csv')
+        filename = f'submissions_export_{timezone.now().strftime("%Y%m%d_%H%M%S")}.csv'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+
+        self.message_user(request, 'Exporting selected submissions as CSV (streamed).')
+        return response
+
+    export_as_csv_streaming.short_description = 'Export selected submissions as CSV (streamed, for large selections)'
+
+    def export_as_ndjson(self, request, queryset):
+        """
+        Export selected submissions as newline-delimited JSON, one object per
+        line, streamed like export_as_csv_streaming.
+        """
+        response = StreamingHttpResponse(stream_ndjson(queryset), content_type='application/x-ndjson')
+        filename = f'submissions_export_{timezone.now().strftime("%Y%m%d_%H%M%S")}.ndjson'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+
+        self.message_user(request, 'Exporting selected submissions as NDJSON (streamed).')
+        return response
+
+    export_as_ndjson.short_description = 'Export selected submissions as NDJSON (streamed, for large selections)'
+
+    def export_as_zip(self, request, queryset, use_derivatives=False):
         """
         Export selected submissions as ZIP file containing all images and a CSV manifest.
         The ZIP file structure:
@@ -166,79 +199,194 @@ class SubmissionAdmin(admin.ModelAdmin):
         - left_eye/ (folder with all left eye images)
         - right_eye/ (folder with all right eye images)
         - camera_specs/ (folder with all camera specs images)
+        With use_derivatives, the normalized derivatives are exported where
+        they exist instead of the original uploads.
+        The archive is streamed while it is built; images are read in chunks.
         """
-        # Create in-memory ZIP file
-        zip_buffer = BytesIO()
-
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            # Create CSV manifest using StringIO
-            csv_buffer = StringIO()
-            csv_writer = csv.writer(csv_buffer)
-
-            # Write CSV header
-            header = [
-                'Submission ID',
-                'Submitted At',
-                'IP Address',
-                'Camera Type',
-                'Left Eye Image Filename',
-                'Right Eye Image Filename',
-                'Camera Specs Image Filename',
-            ]
-            csv_writer.writerow(header)
-
-            # Process each submission
-            for submission in queryset:
-                # Write CSV row
-                row = [
-                    submission.id,
-                    submission.submitted_at.strftime('%Y-%m-%d %H:%M:%S'),
-                    submission.ip_address or '',
-                    submission.get_camera_type_display() if submission.camera_type else '',
-                    f'left_eye/submission_{submission.id}_{os.path.basename(submission.left_eye_image.name)}' if submission.left_eye_image else '',
-                    f'right_eye/submission_{submission.id}_{os.path.basename(submission.right_eye_image.name)}' if submission.right_eye_image else '',
-                    f'camera_specs/submission_{submission.id}_{os.path.basename(submission.camera_specs_image.name)}' if submission.camera_specs_image else '',
-                ]
-                csv_writer.writerow(row)
-
-                # Add left eye image to ZIP
-                if submission.left_eye_image:
-                    try:
-                        image_path = f'left_eye/submission_{submission.id}_{os.path.basename(submission.left_eye_image.name)}'
-                        zip_file.writestr(image_path, submission.left_eye_image.read())
-                    except Exception as e:
-                        pass  # Skip if file can't be read
-
-                # Add right eye image to ZIP
-                if submission.right_eye_image:
-                    try:
-                        image_path = f'right_eye/submission_{submission.id}_{os.path.basename(submission.right_eye_image.name)}'
-                        zip_file.writestr(image_path, submission.right_eye_image.read())
-                    except Exception as e:
-                        pass  # Skip if file can't be read
-
-                # Add camera specs image to ZIP
-                if submission.camera_specs_image:
-                    try:
-                        image_path = f'camera_specs/submission_{submission.id}_{os.path.basename(submission.camera_specs_image.name)}'
-                        zip_file.writestr(image_path, submission.camera_specs_image.read())
-                    except Exception as e:
-                        pass  # Skip if file can't be read
-
-            # Add CSV manifest to ZIP
-            csv_buffer.seek(0)
-            zip_file.writestr('submissions_manifest.csv', csv_buffer.getvalue().encode('utf-8'))
-
-        # Prepare response
-        zip_buffer.seek(0)
-        response = HttpResponse(zip_buffer.read(), content_type='application/zip')
+        if use_derivatives:
+            queryset = queryset.prefetch_related('derivatives')
+
+        # Stream the archive while it is being built
+        response = StreamingHttpResponse(
+            stream_zip(zip_entries(iterate_by_pk(queryset, 500, descending=True), use_derivatives)),
+            content_type='application/zip',
+        )
         filename = f'submissions_export_{timezone.now().strftime("%Y%m%d_%H%M%S")}.zip'
         response['Content-Disposition'] = f'attachment; filename="{filename}"'
 
+        # No count or success claim: the archive has not been written yet
+        self.message_user(request, 'Exporting selected submissions with images as ZIP (streamed).')
+        return response
+
+    export_as_zip.short_description = 'Export selected submissions with images as ZIP'
+
+    def export_as_zip_normalized(self, request, queryset):
+        """Export selected submissions as ZIP file with the normalized (smaller) images"""
+        return self.export_as_zip(request, queryset, use_derivatives=True)
+
+    export_as_zip_normalized.short_description = 'Export selected submissions with normalized images as ZIP'
+
+    def _queue_export(self, request, queryset, export_format):
+        """Create a background export job for the selected submissions"""
+        job = ExportJob.objects.create(
+            export_format=export_format,
+            submission_ids=list(queryset.values_list('id', flat=True)),
+            requested_by=request.user,
+        )
         self.message_user(
             request,
-            f'Successfully exported {queryset.count()} submission(s) with images as ZIP.'
+            format_html(
+                'Queued export #{} of {} submission(s). <a href="{}">Follow its progress</a>; '
+                'the download link appears there when it is done.',
+                job.pk,
+                len(job.submission_ids),
+                reverse('admin:uploads_exportjob_change', args=[job.pk]),
+            ),
         )
-        return response
 
-    export_as_zip.short_description = 'Export selected submissions with images as ZIP'
+    def queue_export_csv(self, request, queryset):
+        self._queue_export(request, queryset, ExportJob.FORMAT_CSV)
+
+    queue_export_csv.short_description = 'Export selected submissions as CSV in the background'
+
+    def queue_export_json(self, request, queryset):
+        self._queue_export(request, queryset, ExportJob.FORMAT_JSON)
+
+    queue_export_json.short_description = 'Export selected submissions as JSON in the background'
+
+    def queue_export_zip(self, request, queryset):
+        self._queue_export(request, queryset, ExportJob.FORMAT_ZIP)
+
+    queue_export_zip.short_description = 'Export selected submissions with images as ZIP in the background'
+
+    def queue_export_zip_normalized(self, request, queryset):
+        self._queue_export(request, queryset, ExportJob.FORMAT_ZIP_NORMALIZED)
+
+    queue_export_zip_normalized.short_description = (
+        'Export selected submissions with normalized images as ZIP in the background'
+    )
+
+    def find_near_duplicates(self, request, queryset):
+        """
+        Report eye images in other submissions that look like near duplicates
+        (dHash within NEAR_DUPLICATE_MAX_DISTANCE bits) of the selected ones.
+        """
+        results = fingerprints.find_near_duplicates(queryset, settings.NEAR_DUPLICATE_MAX_DISTANCE)
+        if not results:
+            self.message_user(request, 'No near duplicates found for the selected submission(s).')
+            return
+
+        for fingerprint, match, distance in results[:50]:
+            self.message_user(
+                request,
+                f'Submission #{fingerprint.submission_id} {fingerprint.eye_side} eye looks like '
+                f'submission #{match.submission_id} {match.eye_side} eye (distance {distance}).',
+                level=messages.WARNING,
+            )
+        if len(results) > 50:
+            self.message_user(
+                request,
+                f'{len(results) - 50} more match(es); run "python manage.py find_near_duplicates" for the full list.',
+                level=messages.WARNING,
+            )
+
+    find_near_duplicates.short_description = 'Find near duplicates of selected submissions'
+
+
+@admin.register(ProcessingJob)
+class ProcessingJobAdmin(admin.ModelAdmin):
+    """
+    Admin interface for the background quality-scoring queue.
+    Failed jobs can be re-queued with the retry action.
+    """
+
+    list_display = ('submission', 'status', 'attempts', 'run_after', 'updated_at')
+    list_filter = ('status',)
+    search_fields = ('submission__id',)
+    readonly_fields = ('submission', 'attempts', 'locked_at', 'last_error', 'created_at', 'updated_at')
+    actions = ['retry_jobs']
+
+    def retry_jobs(self, request, queryset):
+        """Reset selected jobs to pending so the worker picks them up again"""
+        updated = queryset.exclude(status=ProcessingJob.STATUS_RUNNING).update(
+            status=ProcessingJob.STATUS_PENDING,
+            attempts=0,
+            run_after=timezone.now(),
+        )
+        self.message_user(request, f'Re-queued {updated} job(s).')
+
+    retry_jobs.short_description = 'Retry selected jobs'
+
+
+@admin.register(ExportCheckpoint)
+class ExportCheckpointAdmin(admin.ModelAdmin):
+    """
+    Admin interface for incremental export checkpoints.
+    Lower last_submission_id to export older submissions again.
+    """
+
+    list_display = ('name', 'last_submission_id', 'updated_at')
+    search_fields = ('name',)
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    """
+    Admin interface for background exports.
+    Add a job with a checkpoint to export everything submitted since that
+    checkpoint's last export; the process_exports command writes the file.
+    """
+
+    list_display = ('id', 'export_format', 'checkpoint', 'status', 'progress', 'created_at', 'finished_at', 'download_link')
+    list_filter = ('status', 'export_format')
+    readonly_fields = ('status', 'progress', 'after_submission_id', 'up_to_submission_id', 'download_link',
+                       'requested_by', 'last_error', 'created_at', 'started_at', 'finished_at')
+    actions = ['retry_exports']
+
+    def get_readonly_fields(self, request, obj=None):
+        if obj is not None:
+            return ('export_format', 'checkpoint') + self.readonly_fields
+        return self.readonly_fields
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            obj.requested_by = request.user
+        super().save_model(request, obj, form, change)
+
+    def progress(self, obj):
+        """Display submissions written so far"""
+        if obj.status == ExportJob.STATUS_PENDING:
+            return '-'
+        return f'{obj.processed}/{obj.total}'
+    progress.short_description = 'Progress'
+
+    def download_link(self, obj):
+        """Display a link to the finished export"""
+        if obj.status != ExportJob.STATUS_DONE:
+            return '-'
+        return format_html('<a href="{}">{}</a>', reverse('admin:uploads_exportjob_download', args=[obj.pk]), obj.filename)
+    download_link.short_description = 'Download'
+
+    def get_urls(self):
+        urls = [
+            path('<int:job_id>/download/', self.admin_site.admin_view(self.download_view), name='uploads_exportjob_download'),
+        ]
+        return urls + super().get_urls()
+
+    def download_view(self, request, job_id):
+        """Serve a finished export file (staff only)"""
+        job = get_object_or_404(ExportJob, pk=job_id, status=ExportJob.STATUS_DONE)
+        if not self.has_view_permission(request, job) or not job.path.exists():
+            raise Http404('Export file not found')
+        return FileResponse(open(job.path, 'rb'), as_attachment=True, filename=job.filename)
+
+    def retry_exports(self, request, queryset):
+        """Reset selected failed exports to pending so the worker picks them up again"""
+        updated = queryset.filter(status=ExportJob.STATUS_FAILED).update(
+            status=ExportJob.STATUS_PENDING,
+            processed=0,
+            last_error='',
+        )
+        self.message_user(request, f'Re-queued {updated} export(s).')
+
+    retry_exports.short_description = 'Retry selected exports'
@@ -0,0 +1,176 @@
+"""
+Memory-mapped store of preprocessed eye images for repeated analysis.
+
+Every left and right eye image is decoded once, oriented per EXIF, padded
+to a square and resized to image_size x image_size RGB, and written as one
+row of images.npy (uint8, shape (capacity, size, size, 3)). index.npy maps
+each row to (submission_id, eye_side) and meta.json records the number of
+rows in use and the last submission included, so the build_array_store
+command only appends submissions added since the last run. The row
+capacity doubles when it runs out, keeping appends amortized O(1).
+
+Reading is zero-copy:
+
+    store = ArrayStore('path/to/store')
+    images = store.images            # (count, size, size, 3) read-only memmap
+    left = images[store.index['eye_side'] == 'left']
+"""
+
+import json
+import os
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from .exports import iterate_by_pk
+from .processing import EYE_IMAGE_FIELDS
+from .shards import ordered_parallel
+
+IMAGES_FILENAME = 'images.npy'
+INDEX_FILENAME = 'index.npy'
+META_FILENAME = 'meta.json'
+
+INDEX_DTYPE = np.dtype([('submission_id', '<i8'), ('eye_side', '<U5')])
+
+
+def preprocess_image(image_file, image_size):
+    """An image file as a (image_size, image_size, 3) uint8 array, aspect ratio kept by padding"""
+    with Image.open(image_file) as img:
+        # Let JPEG decode at reduced scale; the resize below does the rest
+        img.draft('RGB', (image_size, image_size))
+        img = ImageOps.exif_transpose(img)
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        img = ImageOps.pad(img, (image_size, image_size), Image.Resampling.BILINEAR, color=(0, 0, 0))
+    return np.asarray(img, dtype=np.uint8)
+
+
+class ArrayStore:
+    """Read access to a store directory written by build_array_store"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path / META_FILENAME) as meta_file:
+            self.meta = json.load(meta_file)
+        self.image_size = self.meta['image_size']
+        self.count = self.meta['count']
+        self.index = np.load(self.path / INDEX_FILENAME)[:self.count]
+        self._images = np.load(self.path / IMAGES_FILENAME, mmap_mode='r')
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def images(self):
+        """All stored images as a read-only memmap, shape (count, size, size, 3)"""
+        return self._images[:self.count]
+
+    def rows(self, submission_id, eye_side=None):
+        """Row numbers of a submission's images"""
+        mask = self.index['submission_id'] == submission_id
+        if eye_side is not None:
+            mask &= self.index['eye_side'] == eye_side
+        return np.flatnonzero(mask)
+
+
+def _load_for_update(path, image_size):
+    """(meta, index) of an existing store, or of a new empty one"""
+    meta_path = path / META_FILENAME
+    if not meta_path.exists():
+        meta = {'image_size': image_size, 'count': 0, 'last_submission_id': 0}
+        return meta, np.zeros(0, dtype=INDEX_DTYPE)
+
+    with open(meta_path) as meta_file:
+        meta = json.load(meta_file)
+    if meta['image_size'] != image_size:
+        raise ValueError(f"Store at {path} holds {meta['image_size']}px images, not {image_size}px")
+    return meta, np.load(path / INDEX_FILENAME)[:meta['count']]
+
+
+def _grow(path, images, image_size, used):
+    """Re-create images.npy with twice the rows (at least 1024), copying the first `used` rows"""
+    capacity = max(len(images) * 2 if images is not None else 0, 1024)
+    temp_path = path / (IMAGES_FILENAME + '.part')
+    grown = np.lib.format.open_memmap(
+        temp_path, mode='w+', dtype=np.uint8, shape=(capacity, image_size, image_size, 3)
+    )
+    if images is not None:
+        grown[:used] = images[:used]
+    grown.flush()
+    del grown
+    os.replace(temp_path, path / IMAGES_FILENAME)
+    return np.load(path / IMAGES_FILENAME, mmap_mode='r+')
+
+
+def _commit(path, meta, index):
+    """Write index.npy and meta.json; rows past meta['count'] are ignored by readers"""
+    np.save(path / (INDEX_FILENAME + '.part.npy'), index)
+    os.replace(path / (INDEX_FILENAME + '.part.npy'), path / INDEX_FILENAME)
+    meta_part = path / (META_FILENAME + '.part')
+    with open(meta_part, 'w') as meta_file:
+        json.dump(meta, meta_file, indent=2)
+    os.replace(meta_part, path / META_FILENAME)
+
+
+def update_store(queryset, path, image_size=256, workers=8, use_derivatives=False, batch_size=500):
+    """
+    Append the eye images of submissions in queryset newer than the store's
+    last_submission_id. Progress is committed every batch_size submissions,
+    so an interrupted run continues from the last committed batch. Images
+    that cannot be decoded are left out and listed in meta['skipped'].
+    Yields (rows added, [(submission_id, eye_side, error), ...], meta) after each commit.
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    meta, index = _load_for_update(path, image_size)
+    images = np.load(path / IMAGES_FILENAME, mmap_mode='r+') if (path / IMAGES_FILENAME).exists() else None
+
+    queryset = queryset.filter(id__gt=meta['last_submission_id'])
+    if use_derivatives:
+        queryset = queryset.prefetch_related('derivatives')
+
+    def load(item):
+        # A file that cannot be read or decoded is skipped, not fatal: the batch
+        # must still commit, or every later run would stop at the same image
+        submission, eye_side, image = item
+        try:
+            with image.storage.open(image.name, 'rb') as image_file:
+                return submission.id, eye_side, preprocess_image(image_file, image_size), None
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            return submission.id, eye_side, None, f'{type(e).__name__}: {e}'
+
+    def items(batch):
+        for submission in batch:
+            for eye_side, field_name in EYE_IMAGE_FIELDS.items():
+                image = submission.get_image(field_name, use_derivatives)
+                if image:
+                    yield submission, eye_side, image
+
+    submissions = iterate_by_pk(queryset, batch_size)
+    while True:
+        batch = list(islice(submissions, batch_size))
+        if not batch:
+            break
+
+        rows = []
+        skipped = []
+        for submission_id, eye_side, array, error in ordered_parallel(load, items(batch), workers):
+            if error is not None:
+                skipped.append((submission_id, eye_side, error))
+                continue
+            row = meta['count'] + len(rows)
+            if images is None or row >= len(images):
+                images = _grow(path, images, image_size, row)
+            images[row] = array
+            rows.append((submission_id, eye_side))
+
+        if images is not None:
+            images.flush()
+        index = np.concatenate([index, np.array(rows, dtype=INDEX_DTYPE)])
+        meta['count'] += len(rows)
+        meta['last_submission_id'] = batch[-1].id
+        meta['skipped'] = meta.get('skipped', []) + [[submission_id, eye_side] for submission_id, eye_side, _ in skipped]
+        _commit(path, meta, index)
+        yield len(rows), skipped, meta
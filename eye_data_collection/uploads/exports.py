@@ -0,0 +1,365 @@
+"""
+Submission exports: CSV, JSON and ZIP archives with images.
+
+zipfile writes into a ZipStream, which only keeps the bytes produced since
+they were last handed to the response. Members are added from iterables of
+chunks, so neither the files nor the archive are ever held in memory as a
+whole, and the first bytes go out as soon as the first member starts.
+Images are stored as-is (JPEG/PNG/HEIC are already compressed); everything
+else, such as the manifest, is deflated.
+
+Export jobs run the same writers in the background (process_exports
+management command) and write the result to EXPORT_DIR. An incremental job
+covers the submission ids between its checkpoint and the newest submission
+when it starts, so repeated syncs only read what was added since.
+"""
+
+import csv
+import io
+import json
+import os
+import tempfile
+import textwrap
+import traceback
+import zipfile
+
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import ExportCheckpoint, ExportJob, Submission
+
+CHUNK_SIZE = 64 * 1024
+
+# Already-compressed formats: deflating them costs CPU for no gain
+STORED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.heic', '.heif'}
+
+
+class ZipStream:
+    """Write-only, unseekable file object collecting what zipfile writes until drained"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def compress_type(arcname):
+    extension = os.path.splitext(arcname)[1].lower()
+    return zipfile.ZIP_STORED if extension in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+
+
+def read_chunks(file, chunk_size=CHUNK_SIZE):
+    """Byte chunks of an open file object (text is encoded as UTF-8), closing it at the end"""
+    try:
+        while chunk := file.read(chunk_size):
+            yield chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+    finally:
+        file.close()
+
+
+def stream_zip(entries):
+    """
+    Yield a ZIP archive piece by piece.
+    entries yields (arcname, chunks), chunks being an iterable of bytes.
+    """
+    stream = ZipStream()
+    date_time = timezone.localtime().timetuple()[:6]
+
+    with zipfile.ZipFile(stream, 'w') as zip_file:
+        for arcname, chunks in entries:
+            info = zipfile.ZipInfo(arcname, date_time=date_time)
+            info.compress_type = compress_type(arcname)
+            with zip_file.open(info, 'w') as member:
+                for chunk in chunks:
+                    member.write(chunk)
+                    data = stream.drain()
+                    if data:
+                        yield data
+            yield stream.drain()
+
+    # Central directory
+    yield stream.drain()
+
+
+# ZIP export folders for the submission image fields
+ZIP_IMAGE_FOLDERS = [
+    ('left_eye', 'left_eye_image'),
+    ('right_eye', 'right_eye_image'),
+    ('camera_specs', 'camera_specs_image'),
+]
+
+CSV_HEADER = [
+    'Submission ID',
+    'Submitted At',
+    'IP Address',
+    'Left Eye Image',
+    'Right Eye Image',
+    'Camera Specs Image',
+]
+
+MANIFEST_HEADER = [
+    'Submission ID',
+    'Submitted At',
+    'IP Address',
+    'Camera Type',
+    'Left Eye Image Filename',
+    'Right Eye Image Filename',
+    'Camera Specs Image Filename',
+]
+
+
+# Submission columns read by the CSV and JSON exports, in this order
+EXPORT_FIELDS = ['id', 'submitted_at', 'ip_address', 'left_eye_image', 'right_eye_image', 'camera_specs_image']
+
+# Rows fetched per query by the streaming exports
+STREAM_CHUNK_SIZE = 2000
+
+
+def iterate_by_pk(queryset, chunk_size=STREAM_CHUNK_SIZE, descending=False):
+    """
+    Rows of queryset in primary key order, fetched chunk_size at a time with
+    `pk > last` (or `pk < last`) queries. Unlike .iterator() this needs no
+    server-side cursor, which a transaction-mode pooler (the Neon -pooler
+    host) cannot keep open between queries. Prefetches apply per chunk.
+    A values_list() queryset must list the primary key first.
+    """
+    queryset = queryset.order_by('-pk' if descending else 'pk')
+    last_pk = None
+    while True:
+        if last_pk is None:
+            page = queryset
+        elif descending:
+            page = queryset.filter(pk__lt=last_pk)
+        else:
+            page = queryset.filter(pk__gt=last_pk)
+        rows = list(page[:chunk_size])
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last_pk = rows[-1][0] if isinstance(rows[-1], tuple) else rows[-1].pk
+
+
+def submission_values(submission):
+    """EXPORT_FIELDS of a Submission instance, as values_list(*EXPORT_FIELDS) returns them"""
+    return (
+        submission.id,
+        submission.submitted_at,
+        submission.ip_address,
+        submission.left_eye_image.name,
+        submission.right_eye_image.name,
+        submission.camera_specs_image.name,
+    )
+
+
+def csv_row(values):
+    submission_id, submitted_at, ip_address, left_eye, right_eye, camera_specs = values
+    return [
+        submission_id,
+        submitted_at.strftime('%Y-%m-%d %H:%M:%S'),
+        ip_address or '',
+        left_eye or '',
+        right_eye or '',
+        camera_specs or '',
+    ]
+
+
+def json_record(values):
+    submission_id, submitted_at, ip_address, left_eye, right_eye, camera_specs = values
+    return {
+        'submission_id': submission_id,
+        'submitted_at': submitted_at.isoformat(),
+        'ip_address': ip_address,
+        'images': {
+            'left_eye': left_eye or None,
+            'right_eye': right_eye or None,
+            'camera_specs': camera_specs or None,
+        }
+    }
+
+
+class Echo:
+    """Pseudo-buffer for csv.writer: write() returns the line instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(queryset):
+    """
+    Yield a CSV export line by line, newest first like the admin list (by
+    descending id), reading only EXPORT_FIELDS in chunks of
+    STREAM_CHUNK_SIZE rows.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+    for values in iterate_by_pk(queryset.values_list(*EXPORT_FIELDS), descending=True):
+        yield writer.writerow(csv_row(values))
+
+
+def stream_ndjson(queryset):
+    """Yield newline-delimited JSON, one json_record per line, like stream_csv"""
+    for values in iterate_by_pk(queryset.values_list(*EXPORT_FIELDS), descending=True):
+        yield json.dumps(json_record(values)) + '\n'
+
+
+def zip_entries(submissions, use_derivatives=False):
+    """
+    ZIP members for stream_zip: the images of each submission, then a CSV
+    manifest (spooled to disk once it grows) as the last member.
+    With use_derivatives, submissions should have their derivatives prefetched.
+    """
+    manifest = tempfile.SpooledTemporaryFile(max_size=1024 * 1024, mode='w+', newline='', encoding='utf-8')
+    csv_writer = csv.writer(manifest)
+    csv_writer.writerow(MANIFEST_HEADER)
+
+    for submission in submissions:
+        images = []
+        for folder, field_name in ZIP_IMAGE_FOLDERS:
+            image = submission.get_image(field_name, use_derivatives)
+            image_path = f'{folder}/submission_{submission.id}_{os.path.basename(image.name)}' if image else ''
+            images.append((image_path, image))
+
+        csv_writer.writerow([
+            submission.id,
+            submission.submitted_at.strftime('%Y-%m-%d %H:%M:%S'),
+            submission.ip_address or '',
+            submission.get_camera_type_display() if submission.camera_type else '',
+        ] + [image_path for image_path, image in images])
+
+        for image_path, image in images:
+            if not image:
+                continue
+            try:
+                image.open('rb')
+            except Exception:
+                continue  # Skip if file can't be read
+            yield image_path, read_chunks(image)
+
+    manifest.seek(0)
+    yield 'submissions_manifest.csv', read_chunks(manifest)
+
+
+def write_export(export_format, submissions, file):
+    """Write submissions to a binary file object in one of the ExportJob formats"""
+    if export_format in (ExportJob.FORMAT_ZIP, ExportJob.FORMAT_ZIP_NORMALIZED):
+        use_derivatives = export_format == ExportJob.FORMAT_ZIP_NORMALIZED
+        for data in stream_zip(zip_entries(submissions, use_derivatives)):
+            file.write(data)
+        return
+
+    text = io.TextIOWrapper(file, encoding='utf-8', newline='')
+    if export_format == ExportJob.FORMAT_CSV:
+        writer = csv.writer(text)
+        writer.writerow(CSV_HEADER)
+        for submission in submissions:
+            writer.writerow(csv_row(submission_values(submission)))
+    else:
+        # Same layout as json.dump(records, indent=2), one record at a time
+        separator = '[\n'
+        for submission in submissions:
+            record = json.dumps(json_record(submission_values(submission)), indent=2)
+            text.write(separator + textwrap.indent(record, '  '))
+            separator = ',\n'
+        text.write('[]' if separator == '[\n' else '\n]')
+    text.detach()
+
+
+# ============================================================================
+# Background export jobs
+# ============================================================================
+
+def claim_next_export():
+    """Claim the oldest pending export job and mark it running, or return None"""
+    for job in ExportJob.objects.filter(status=ExportJob.STATUS_PENDING).order_by('created_at')[:10]:
+        claimed = ExportJob.objects.filter(pk=job.pk, status=ExportJob.STATUS_PENDING).update(
+            status=ExportJob.STATUS_RUNNING,
+            started_at=timezone.now(),
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+
+def job_submissions(job, batch_size=500, progress_every=100):
+    """
+    Submissions of a job in id order, fetched batch_size at a time.
+    Stores the number processed on the job every progress_every submissions.
+    """
+    if job.checkpoint_id is not None:
+        queryset = Submission.objects.filter(id__gt=job.after_submission_id, id__lte=job.up_to_submission_id)
+        batches = [queryset]
+    else:
+        ids = sorted(job.submission_ids)
+        batches = [Submission.objects.filter(id__in=ids[i:i + batch_size]) for i in range(0, len(ids), batch_size)]
+
+    processed = 0
+    for batch in batches:
+        if job.export_format == ExportJob.FORMAT_ZIP_NORMALIZED:
+            batch = batch.prefetch_related('derivatives')
+        for submission in iterate_by_pk(batch, batch_size):
+            yield submission
+            processed += 1
+            if processed % progress_every == 0:
+                ExportJob.objects.filter(pk=job.pk).update(processed=processed)
+    ExportJob.objects.filter(pk=job.pk).update(processed=processed)
+
+
+def run_export(job):
+    """Write a claimed export job to EXPORT_DIR. Returns True on success."""
+    partial_path = None
+    try:
+        if job.checkpoint_id is not None:
+            # Fix the id range now, so submissions arriving meanwhile go into the next export
+            job.after_submission_id = job.checkpoint.last_submission_id
+            job.up_to_submission_id = max(
+                Submission.objects.aggregate(newest=Max('id'))['newest'] or 0,
+                job.after_submission_id,
+            )
+            job.total = Submission.objects.filter(
+                id__gt=job.after_submission_id, id__lte=job.up_to_submission_id
+            ).count()
+        elif job.submission_ids is None:
+            # E.g. its checkpoint was deleted; an empty export would look like a success
+            raise ValueError('Export job has neither a checkpoint nor a selection of submissions')
+        else:
+            job.total = len(job.submission_ids)
+        job.filename = f'submissions_export_{job.pk}_{timezone.now().strftime("%Y%m%d_%H%M%S")}.{job.extension}'
+        job.save(update_fields=['after_submission_id', 'up_to_submission_id', 'total', 'filename'])
+
+        job.path.parent.mkdir(parents=True, exist_ok=True)
+        partial_path = job.path.with_name(job.filename + '.part')
+        with open(partial_path, 'wb') as file:
+            write_export(job.export_format, job_submissions(job), file)
+        os.replace(partial_path, job.path)
+    except Exception:
+        job.status = ExportJob.STATUS_FAILED
+        job.last_error = traceback.format_exc()
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'last_error', 'finished_at'])
+        if partial_path is not None and partial_path.exists():
+            partial_path.unlink()
+        return False
+
+    if job.checkpoint_id is not None:
+        # Only move forward, and only from where this export started
+        ExportCheckpoint.objects.filter(
+            pk=job.checkpoint_id, last_submission_id=job.after_submission_id
+        ).update(last_submission_id=job.up_to_submission_id, updated_at=timezone.now())
+
+    job.status = ExportJob.STATUS_DONE
+    job.last_error = ''
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'last_error', 'finished_at'])
+    return True
+
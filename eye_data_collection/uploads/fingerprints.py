@@ -0,0 +1,130 @@
+"""
+Perceptual fingerprints (dHash) for near-duplicate detection.
+
+A 64-bit difference hash survives re-encoding, resizing and small edits,
+so copies of the same eye photo end up within a few bits of each other.
+Lookups use multi-index hashing: the hash is split into four 16-bit bands
+stored in indexed columns. Two hashes within Hamming distance d agree on
+at least one band up to d // 4 bits (pigeonhole), so a query only fetches
+rows whose band values lie in that small neighbourhood, then checks the
+exact distance in Python.
+"""
+
+from itertools import combinations
+
+from PIL import Image
+
+from .models import ImageFingerprint
+
+BAND_BITS = 16
+BAND_COUNT = 4
+BAND_MASK = (1 << BAND_BITS) - 1
+
+# Image.transpose operations for EXIF orientations 2-8 (as in ImageOps.exif_transpose)
+ORIENTATION_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+
+def compute_dhash(image_file, hash_size=8):
+    """
+    64-bit difference hash of an image file (unsigned int).
+    The image is reduced to a small square first, then oriented per EXIF;
+    squashing commutes with 90-degree turns, so orientation is still exact.
+    """
+    with Image.open(image_file) as img:
+        orientation = img.getexif().get(0x0112)
+        img.draft('L', (hash_size * 8, hash_size * 8))
+        small = img.convert('L').resize((hash_size * 4, hash_size * 4), Image.Resampling.BOX)
+
+    if orientation in ORIENTATION_TRANSPOSE:
+        small = small.transpose(ORIENTATION_TRANSPOSE[orientation])
+    pixels = list(small.resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS).getdata())
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def split_bands(value):
+    """The four 16-bit bands of a 64-bit hash, most significant first"""
+    return [(value >> (BAND_BITS * (BAND_COUNT - 1 - band))) & BAND_MASK for band in range(BAND_COUNT)]
+
+
+def to_signed(value):
+    """Store an unsigned 64-bit hash in a signed BigIntegerField"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+def fingerprint_fields(value):
+    """Model field values for a hash"""
+    fields = {'dhash': to_signed(value)}
+    for band, band_value in enumerate(split_bands(value)):
+        fields[f'band{band}'] = band_value
+    return fields
+
+
+def hamming_distance(a, b):
+    return (to_unsigned(a) ^ to_unsigned(b)).bit_count()
+
+
+def band_neighbours(band_value, radius):
+    """All 16-bit values within Hamming distance radius of band_value"""
+    values = [band_value]
+    for flips in range(1, radius + 1):
+        for bits in combinations(range(BAND_BITS), flips):
+            flipped = band_value
+            for bit in bits:
+                flipped ^= 1 << bit
+            values.append(flipped)
+    return values
+
+
+def near_duplicates(value, max_distance, queryset=None):
+    """
+    Fingerprints within max_distance bits of a hash, closest first,
+    as [(fingerprint, distance), ...].
+    """
+    if queryset is None:
+        queryset = ImageFingerprint.objects.all()
+    band_radius = max_distance // BAND_COUNT
+
+    candidates = {}
+    for band, band_value in enumerate(split_bands(value)):
+        lookup = {f'band{band}__in': band_neighbours(band_value, band_radius)}
+        for fingerprint in queryset.filter(**lookup):
+            candidates[fingerprint.pk] = fingerprint
+
+    matches = []
+    for fingerprint in candidates.values():
+        distance = hamming_distance(value, fingerprint.dhash)
+        if distance <= max_distance:
+            matches.append((fingerprint, distance))
+    matches.sort(key=lambda match: (match[1], match[0].submission_id, match[0].eye_side))
+    return matches
+
+
+def find_near_duplicates(submissions, max_distance):
+    """
+    Near duplicates of the eye images of the given submissions in other submissions.
+    Returns [(fingerprint, match, distance), ...].
+    """
+    results = []
+    for fingerprint in ImageFingerprint.objects.filter(submission__in=submissions).order_by('submission_id', 'eye_side'):
+        others = ImageFingerprint.objects.exclude(submission_id=fingerprint.submission_id)
+        for match, distance in near_duplicates(to_unsigned(fingerprint.dhash), max_distance, others):
+            results.append((fingerprint, match, distance))
+    return results
@@ -1,12 +1,16 @@
 from django import forms
+from django.conf import settings
 from django.core.validators import FileExtensionValidator
+from PIL import UnidentifiedImageError
 from .models import Submission
+from .quality import check_upload_quality
+from .storage import find_duplicates
 
 
 class SubmissionForm(forms.ModelForm):
     """
     Form for uploading eye images.
-    Validates file types and sizes.
+    Validates file types, sizes and eye image quality.
     """
     
     # Maximum file size: 10MB
@@ -56,12 +60,16 @@ class SubmissionForm(forms.ModelForm):
         image = self.cleaned_data.get('left_eye_image')
         if image:
             self._validate_file_size(image)
+            self._validate_quality(image, 'left_eye_image')
+            self._find_duplicates(image, 'left_eye_image')
         return image
     
     def clean_right_eye_image(self):
         image = self.cleaned_data.get('right_eye_image')
         if image:
             self._validate_file_size(image)
+            self._validate_quality(image, 'right_eye_image')
+            self._find_duplicates(image, 'right_eye_image')
         return image
     
     def clean_camera_specs_image(self):
@@ -77,3 +85,45 @@ class SubmissionForm(forms.ModelForm):
                 f'File size exceeds maximum limit of {self.MAX_FILE_SIZE // (1024*1024)}MB. '
                 f'Your file is {file.size // (1024*1024)}MB.'
             )
+
+    def _find_duplicates(self, file, field_name):
+        """Record ids of earlier submissions with the same image content in self.duplicates[field_name]"""
+        if not hasattr(self, 'duplicates'):
+            self.duplicates = {}
+        submission_ids = list(find_duplicates(file).values_list('id', flat=True))
+        if submission_ids:
+            self.duplicates[field_name] = submission_ids
+
+    def _validate_quality(self, file, field_name):
+        """
+        Reject eye images that are too small, too dark or blurry (QUALITY_GATE_* settings).
+        The check result is kept in self.quality_checks[field_name].
+        """
+        if not getattr(settings, 'QUALITY_GATE_ENABLED', False):
+            return
+
+        file.seek(0)
+        try:
+            check = check_upload_quality(
+                file,
+                min_megapixels=settings.QUALITY_GATE_MIN_MEGAPIXELS,
+                min_brightness=settings.QUALITY_GATE_MIN_BRIGHTNESS,
+                min_sharpness=settings.QUALITY_GATE_MIN_SHARPNESS,
+                budget_ms=settings.QUALITY_GATE_BUDGET_MS,
+                working_size=settings.QUALITY_GATE_WORKING_SIZE,
+            )
+        except (UnidentifiedImageError, OSError):
+            # Formats Pillow cannot decode (e.g. HEIC) skip the gate
+            return
+        finally:
+            file.seek(0)
+
+        if not hasattr(self, 'quality_checks'):
+            self.quality_checks = {}
+        self.quality_checks[field_name] = check
+
+        if check['problems']:
+            raise forms.ValidationError(
+                f"Please retake this photo: {' and '.join(check['problems'])}. "
+                'Use good lighting and hold the phone steady.'
+            )
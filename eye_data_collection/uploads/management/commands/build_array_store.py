@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from uploads.array_store import update_store
+from uploads.models import Submission
+
+
+class Command(BaseCommand):
+    help = 'Build or update the memory-mapped array store of preprocessed eye images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output_dir', help='Store directory (re-use it to add new submissions)')
+        parser.add_argument(
+            '--image-size',
+            type=int,
+            default=256,
+            help='Width and height of the stored images in pixels (default: 256)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=8,
+            help='Threads decoding images in parallel (default: 8)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Submissions added between commits of the index (default: 500)',
+        )
+        parser.add_argument(
+            '--normalized',
+            action='store_true',
+            help='Decode the normalized derivatives instead of the original uploads where they exist (faster)',
+        )
+
+    def handle(self, *args, **options):
+        updates = update_store(
+            Submission.objects.all(),
+            options['output_dir'],
+            image_size=options['image_size'],
+            workers=options['workers'],
+            use_derivatives=options['normalized'],
+            batch_size=options['batch_size'],
+        )
+        added = skipped_total = 0
+        meta = None
+        try:
+            for rows, skipped, meta in updates:
+                added += rows
+                skipped_total += len(skipped)
+                for submission_id, eye_side, error in skipped:
+                    self.stderr.write(f'Skipped submission #{submission_id} {eye_side} eye: {error}')
+                self.stdout.write(f"Added {rows} image(s), up to submission #{meta['last_submission_id']}")
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if meta is None:
+            self.stdout.write('Array store is up to date')
+        else:
+            self.stdout.write(f"Added {added} image(s); the store now holds {meta['count']}")
+            if skipped_total:
+                self.stdout.write(f'{skipped_total} image(s) could not be decoded and were skipped')
@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+
+from uploads.models import Submission
+from uploads.shards import export_shards
+
+
+class Command(BaseCommand):
+    help = 'Export submissions as WebDataset-style tar shards (eye images + JSON sidecar) for training'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output_dir', help='Directory for the shards and shards.json (re-use it to resume)')
+        parser.add_argument(
+            '--samples-per-shard',
+            type=int,
+            default=1000,
+            help='Submissions per shard (default: 1000)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=8,
+            help='Threads reading image files in parallel (default: 8)',
+        )
+        parser.add_argument(
+            '--normalized',
+            action='store_true',
+            help='Export the normalized derivatives instead of the original uploads where they exist',
+        )
+        parser.add_argument(
+            '--camera-type',
+            choices=[choice for choice, label in Submission.CAMERA_CHOICES],
+            help='Only export submissions taken with this camera',
+        )
+        parser.add_argument('--since-id', type=int, help='Only export submissions with a higher id')
+        parser.add_argument('--until-id', type=int, help='Only export submissions up to this id')
+
+    def handle(self, *args, **options):
+        queryset = Submission.objects.all()
+        if options['camera_type']:
+            queryset = queryset.filter(camera_type=options['camera_type'])
+        if options['since_id'] is not None:
+            queryset = queryset.filter(id__gt=options['since_id'])
+        if options['until_id'] is not None:
+            queryset = queryset.filter(id__lte=options['until_id'])
+
+        shards = samples = 0
+        for entry in export_shards(
+            queryset,
+            options['output_dir'],
+            samples_per_shard=options['samples_per_shard'],
+            workers=options['workers'],
+            use_derivatives=options['normalized'],
+        ):
+            shards += 1
+            samples += entry['samples']
+            self.stdout.write(
+                f"{entry['name']}: {entry['samples']} submission(s), "
+                f"#{entry['first_submission_id']}-#{entry['last_submission_id']}"
+            )
+
+        self.stdout.write(f'Wrote {shards} shard(s) with {samples} submission(s) to {options["output_dir"]}')
@@ -0,0 +1,80 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from uploads.exports import iterate_by_pk
+from uploads.fingerprints import compute_dhash, find_near_duplicates, fingerprint_fields
+from uploads.models import ImageFingerprint, Submission
+from uploads.processing import EYE_IMAGE_FIELDS
+
+
+class Command(BaseCommand):
+    help = 'List eye images that are near duplicates (dHash distance) of images in other submissions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'submission_ids',
+            nargs='*',
+            type=int,
+            help='Submissions to check (default: all)',
+        )
+        parser.add_argument(
+            '--max-distance',
+            type=int,
+            default=settings.NEAR_DUPLICATE_MAX_DISTANCE,
+            help=f'Maximum Hamming distance in bits (default: {settings.NEAR_DUPLICATE_MAX_DISTANCE})',
+        )
+        parser.add_argument(
+            '--backfill',
+            action='store_true',
+            help='First compute fingerprints for eye images that do not have one yet',
+        )
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            self.backfill()
+
+        submissions = Submission.objects.all()
+        if options['submission_ids']:
+            submissions = submissions.filter(pk__in=options['submission_ids'])
+
+        started = time.perf_counter()
+        results = find_near_duplicates(submissions, options['max_distance'])
+        elapsed = time.perf_counter() - started
+
+        seen = set()
+        for fingerprint, match, distance in results:
+            # Each pair is found from both sides when checking all submissions
+            pair = frozenset([(fingerprint.submission_id, fingerprint.eye_side), (match.submission_id, match.eye_side)])
+            if pair in seen:
+                continue
+            seen.add(pair)
+            self.stdout.write(
+                f'Submission #{fingerprint.submission_id} {fingerprint.eye_side} eye ~ '
+                f'submission #{match.submission_id} {match.eye_side} eye (distance {distance})'
+            )
+        self.stdout.write(f'{len(seen)} near-duplicate pair(s) found in {elapsed * 1000:.0f} ms')
+
+    def backfill(self):
+        computed = 0
+        for eye_side, field_name in EYE_IMAGE_FIELDS.items():
+            missing = (
+                Submission.objects.exclude(fingerprints__eye_side=eye_side)
+                .exclude(**{field_name: ''})
+            )
+            for submission in iterate_by_pk(missing, 500):
+                field = getattr(submission, field_name)
+                try:
+                    with field.open('rb') as image_file:
+                        dhash = compute_dhash(image_file)
+                except Exception as e:
+                    self.stderr.write(f'Submission #{submission.pk} {eye_side} eye: {e}')
+                    continue
+                ImageFingerprint.objects.update_or_create(
+                    submission=submission,
+                    eye_side=eye_side,
+                    defaults=fingerprint_fields(dhash),
+                )
+                computed += 1
+        self.stdout.write(f'Computed {computed} missing fingerprint(s)')
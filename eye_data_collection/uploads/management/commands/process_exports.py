@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from uploads.exports import claim_next_export, run_export
+from uploads.models import ExportCheckpoint, ExportJob
+
+
+class Command(BaseCommand):
+    help = 'Write queued submission exports (CSV, JSON or ZIP) to EXPORT_DIR'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run the exports that are currently queued and exit instead of polling',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5.0,
+            help='Seconds to wait between polls when the queue is empty (default: 5)',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Queue an incremental export of the submissions added since this checkpoint '
+                 '(created if it does not exist) before processing',
+        )
+        parser.add_argument(
+            '--format',
+            choices=[choice for choice, label in ExportJob.FORMAT_CHOICES],
+            default=ExportJob.FORMAT_ZIP,
+            help='Format of the export queued with --checkpoint (default: zip)',
+        )
+
+    def handle(self, *args, **options):
+        if options['checkpoint']:
+            checkpoint, created = ExportCheckpoint.objects.get_or_create(name=options['checkpoint'])
+            job = ExportJob.objects.create(export_format=options['format'], checkpoint=checkpoint)
+            self.stdout.write(
+                f'Queued export #{job.pk}: submissions after #{checkpoint.last_submission_id} '
+                f'(checkpoint "{checkpoint.name}")'
+            )
+
+        while True:
+            job = claim_next_export()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            if run_export(job):
+                self.stdout.write(f'Export #{job.pk}: {job.total} submission(s) written to {job.path}')
+            else:
+                self.stdout.write(f'Export #{job.pk} failed:\n{job.last_error}')
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from uploads.processing import enqueue_missing_jobs, process_pending_jobs
+
+
+class Command(BaseCommand):
+    help = 'Score new submissions in the background (quality metrics for left and right eye images)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process the jobs that are currently due and exit instead of polling',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to wait between polls when the queue is empty (default: 2)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Jobs to run before checking for submissions without a job again (default: 50)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            queued = enqueue_missing_jobs()
+            if queued:
+                self.stdout.write(f'Queued {queued} submission(s) without a processing job')
+
+            succeeded, failed = process_pending_jobs(limit=options['batch_size'])
+            if succeeded or failed:
+                self.stdout.write(f'Processed {succeeded + failed} job(s): {succeeded} succeeded, {failed} failed')
+
+            if options['once']:
+                if succeeded + failed < options['batch_size']:
+                    break
+                continue
+            if not (succeeded or failed):
+                time.sleep(options['poll_interval'])
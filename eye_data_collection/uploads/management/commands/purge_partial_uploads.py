@@ -0,0 +1,71 @@
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from uploads.exports import iterate_by_pk
+from uploads.models import DraftSubmission, ResumableUpload
+
+
+class Command(BaseCommand):
+    help = 'Delete resumable uploads and draft submissions that were abandoned before being finalized'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=settings.RESUMABLE_UPLOAD_EXPIRY_HOURS,
+            help='Delete uploads not written to for this many hours '
+                 f'(default: RESUMABLE_UPLOAD_EXPIRY_HOURS = {settings.RESUMABLE_UPLOAD_EXPIRY_HOURS})',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report what would be deleted',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        expired = ResumableUpload.objects.filter(updated_at__lt=cutoff)
+
+        deleted_uploads = 0
+        freed_bytes = 0
+        for upload in iterate_by_pk(expired, 500):
+            freed_bytes += upload.path.stat().st_size if upload.path.exists() else 0
+            deleted_uploads += 1
+            if not options['dry_run']:
+                upload.delete_file()
+                upload.delete()
+
+        # Drafts never committed; their images live in media storage
+        deleted_drafts = 0
+        for draft in iterate_by_pk(DraftSubmission.objects.filter(updated_at__lt=cutoff), 500):
+            for field_name in DraftSubmission.IMAGE_FIELDS:
+                field = getattr(draft, field_name)
+                freed_bytes += field.size if field and field.storage.exists(field.name) else 0
+            deleted_drafts += 1
+            if not options['dry_run']:
+                draft.delete_files()
+                draft.delete()
+
+        # Partial files whose row is gone (e.g. deleted in the admin)
+        orphans = 0
+        partial_dir = Path(settings.RESUMABLE_UPLOAD_DIR)
+        if partial_dir.is_dir():
+            known = {str(upload_id) for upload_id in ResumableUpload.objects.values_list('id', flat=True)}
+            for path in partial_dir.glob('*.part'):
+                if path.stem in known or path.stat().st_mtime >= cutoff.timestamp():
+                    continue
+                freed_bytes += path.stat().st_size
+                orphans += 1
+                if not options['dry_run']:
+                    path.unlink(missing_ok=True)
+
+        action = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(
+            f'{action} {deleted_uploads} expired upload(s), {deleted_drafts} draft(s) '
+            f'and {orphans} orphaned partial file(s), '
+            f'{freed_bytes / (1024 * 1024):.1f}MB'
+        )
@@ -0,0 +1,108 @@
+import hashlib
+import os
+import re
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from uploads.models import StoredBlob, Submission
+from uploads.storage import SHARDED_NAME_REGEX, sharded_name
+
+IMAGE_FIELDS = Submission.IMAGE_FIELDS
+
+
+def relocated_name(name):
+    """
+    Target name for a file stored under the old layout.
+    Derived from the old name, so a re-run after an interruption picks the
+    same target and can tell an already-moved file from a missing one.
+    """
+    return sharded_name(hashlib.sha1(name.encode('utf-8')).hexdigest()[:32], name)
+
+
+def move_file(storage, old_name, new_name):
+    """Move a stored file, renaming in place when the storage is on the local filesystem"""
+    try:
+        old_path, new_path = storage.path(old_name), storage.path(new_name)
+    except NotImplementedError:
+        with storage.open(old_name, 'rb') as content:
+            saved = storage.save(new_name, content)
+        if saved != new_name:
+            raise RuntimeError(f'{new_name} already exists in storage')
+        storage.delete(old_name)
+        return
+    os.makedirs(os.path.dirname(new_path), exist_ok=True)
+    os.replace(old_path, new_path)
+
+
+class Command(BaseCommand):
+    help = 'Move submission images from the old uploads/<id>/ layout to hash-sharded paths'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Submissions updated per database batch (default: 500)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report what would be moved',
+        )
+
+    def handle(self, *args, **options):
+        # Rows with at least one image outside the sharded layout. Moved rows drop
+        # out of this query, so an interrupted run simply continues where it stopped.
+        pending = Q()
+        for field_name in IMAGE_FIELDS:
+            pending |= ~Q(**{f'{field_name}__regex': SHARDED_NAME_REGEX}) & ~Q(**{field_name: ''})
+        queryset = Submission.objects.filter(pending).order_by('pk')
+
+        moved = missing = 0
+        last_pk = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk)[:options['batch_size']])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+
+            changed = []
+            renamed = {}
+            for submission in batch:
+                updated = False
+                for field_name in IMAGE_FIELDS:
+                    field = getattr(submission, field_name)
+                    if not field or re.match(SHARDED_NAME_REGEX, field.name):
+                        continue
+                    new_name = relocated_name(field.name)
+                    if options['dry_run']:
+                        self.stdout.write(f'{field.name} -> {new_name}')
+                        moved += 1
+                        continue
+
+                    if field.storage.exists(field.name):
+                        move_file(field.storage, field.name, new_name)
+                    elif not field.storage.exists(new_name):
+                        # Neither copy exists: leave the row alone and report it
+                        self.stderr.write(f'Missing file for submission #{submission.pk}: {field.name}')
+                        missing += 1
+                        continue
+                    renamed[field.name] = new_name
+                    field.name = new_name
+                    moved += 1
+                    updated = True
+                if updated:
+                    changed.append(submission)
+
+            if changed:
+                with transaction.atomic():
+                    Submission.objects.bulk_update(changed, IMAGE_FIELDS)
+                    # Reference counts follow the files to their new names
+                    for old_name, new_name in renamed.items():
+                        StoredBlob.objects.filter(name=old_name).update(name=new_name)
+            self.stdout.write(f'Processed submissions up to #{last_pk}: {moved} file(s) moved so far')
+
+        action = 'Would move' if options['dry_run'] else 'Moved'
+        self.stdout.write(self.style.SUCCESS(f'{action} {moved} file(s); {missing} missing'))
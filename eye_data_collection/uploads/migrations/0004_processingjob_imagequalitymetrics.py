@@ -0,0 +1,55 @@
+# Generated by Django 6.0 on 2026-10-18 04:49
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploads', '0003_submission_camera_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessingJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], db_index=True, default='pending', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('run_after', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('submission', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='processing_job', to='uploads.submission')),
+            ],
+            options={
+                'verbose_name': 'Processing Job',
+                'verbose_name_plural': 'Processing Jobs',
+                'ordering': ['run_after'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ImageQualityMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('eye_side', models.CharField(choices=[('left', 'Left Eye'), ('right', 'Right Eye')], max_length=5)),
+                ('resolution', models.CharField(max_length=20)),
+                ('megapixels', models.FloatField()),
+                ('aspect_ratio', models.FloatField()),
+                ('file_size_kb', models.FloatField()),
+                ('brightness', models.FloatField()),
+                ('sharpness_score', models.FloatField()),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quality_metrics', to='uploads.submission')),
+            ],
+            options={
+                'verbose_name': 'Image Quality Metrics',
+                'verbose_name_plural': 'Image Quality Metrics',
+                'ordering': ['submission', 'eye_side'],
+                'constraints': [models.UniqueConstraint(fields=('submission', 'eye_side'), name='unique_metrics_per_eye')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0 on 2026-10-18 05:41
+
+import uploads.models
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploads', '0005_resumableupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DraftSubmission',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('left_eye_image', models.ImageField(blank=True, upload_to=uploads.models.draft_upload_to)),
+                ('right_eye_image', models.ImageField(blank=True, upload_to=uploads.models.draft_upload_to)),
+                ('camera_specs_image', models.ImageField(blank=True, upload_to=uploads.models.draft_upload_to)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Draft Submission',
+                'verbose_name_plural': 'Draft Submissions',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
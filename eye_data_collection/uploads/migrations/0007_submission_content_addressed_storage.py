@@ -0,0 +1,31 @@
+# Generated by Django 6.0 on 2026-10-18 06:05
+
+import django.core.validators
+import uploads.models
+import uploads.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploads', '0006_draftsubmission'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='submission',
+            name='camera_specs_image',
+            field=models.ImageField(storage=uploads.storage.eye_image_storage, upload_to=uploads.models.upload_to, validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png', 'heic'])], verbose_name='Camera Specifications Screenshot'),
+        ),
+        migrations.AlterField(
+            model_name='submission',
+            name='left_eye_image',
+            field=models.ImageField(storage=uploads.storage.eye_image_storage, upload_to=uploads.models.upload_to, validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png', 'heic'])], verbose_name='Left Eye Image'),
+        ),
+        migrations.AlterField(
+            model_name='submission',
+            name='right_eye_image',
+            field=models.ImageField(storage=uploads.storage.eye_image_storage, upload_to=uploads.models.upload_to, validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png', 'heic'])], verbose_name='Right Eye Image'),
+        ),
+    ]
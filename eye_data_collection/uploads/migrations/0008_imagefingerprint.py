@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-18 06:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploads', '0007_submission_content_addressed_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageFingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('eye_side', models.CharField(choices=[('left', 'Left Eye'), ('right', 'Right Eye')], max_length=5)),
+                ('dhash', models.BigIntegerField()),
+                ('band0', models.PositiveIntegerField(db_index=True)),
+                ('band1', models.PositiveIntegerField(db_index=True)),
+                ('band2', models.PositiveIntegerField(db_index=True)),
+                ('band3', models.PositiveIntegerField(db_index=True)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fingerprints', to='uploads.submission')),
+            ],
+            options={
+                'verbose_name': 'Image Fingerprint',
+                'verbose_name_plural': 'Image Fingerprints',
+                'ordering': ['submission', 'eye_side'],
+                'constraints': [models.UniqueConstraint(fields=('submission', 'eye_side'), name='unique_fingerprint_per_eye')],
+            },
+        ),
+    ]
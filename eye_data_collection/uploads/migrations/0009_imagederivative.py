@@ -0,0 +1,35 @@
+# Generated by Django 6.0 on 2026-10-18 06:58
+
+import django.db.models.deletion
+import uploads.models
+import uploads.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploads', '0008_imagefingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageDerivative',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_field', models.CharField(choices=[('left_eye_image', 'Left Eye Image'), ('right_eye_image', 'Right Eye Image'), ('camera_specs_image', 'Camera Specifications Screenshot')], max_length=20)),
+                ('image', models.ImageField(height_field='height', storage=uploads.storage.eye_image_storage, upload_to=uploads.models.upload_to, width_field='width')),
+                ('width', models.PositiveIntegerField(blank=True, null=True)),
+                ('height', models.PositiveIntegerField(blank=True, null=True)),
+                ('exif', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='derivatives', to='uploads.submission')),
+            ],
+            options={
+                'verbose_name': 'Image Derivative',
+                'verbose_name_plural': 'Image Derivatives',
+                'ordering': ['submission', 'source_field'],
+                'constraints': [models.UniqueConstraint(fields=('submission', 'source_field'), name='unique_derivative_per_image')],
+            },
+        ),
+    ]
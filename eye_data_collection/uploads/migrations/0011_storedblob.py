@@ -0,0 +1,48 @@
+# Generated by Django 6.0 on 2026-10-18 05:20
+
+from collections import Counter
+
+from django.db import migrations, models
+
+SUBMISSION_IMAGE_FIELDS = ('left_eye_image', 'right_eye_image', 'camera_specs_image')
+
+
+def count_references(apps, schema_editor):
+    """Create a StoredBlob for every image name already in use, with its reference count"""
+    Submission = apps.get_model('uploads', 'Submission')
+    ImageDerivative = apps.get_model('uploads', 'ImageDerivative')
+    StoredBlob = apps.get_model('uploads', 'StoredBlob')
+
+    counts = Counter()
+    for names in Submission.objects.values_list(*SUBMISSION_IMAGE_FIELDS).iterator():
+        counts.update(name for name in names if name)
+    counts.update(name for name in ImageDerivative.objects.values_list('image', flat=True).iterator() if name)
+    StoredBlob.objects.bulk_create(
+        [StoredBlob(name=name, ref_count=count) for name, count in counts.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploads', '0010_exportcheckpoint_exportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('ref_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Stored Blob',
+                'verbose_name_plural': 'Stored Blobs',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,22 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.utils import timezone
 from django.core.validators import FileExtensionValidator
+from pathlib import Path
 import os
+import uuid
+from .storage import eye_image_storage, sharded_name
 
 
 def upload_to(instance, filename):
-    """Generate upload path for images"""
-    return os.path.join('uploads', str(instance.id), filename)
+    """Generate a unique, hash-sharded upload path for images"""
+    return sharded_name(uuid.uuid4().hex, filename)
+
+
+def draft_upload_to(instance, filename):
+    """Generate upload path for images of a draft submission"""
+    return os.path.join('drafts', str(instance.id), filename)
 
 
 class Submission(models.Model):
@@ -13,22 +24,27 @@ class Submission(models.Model):
     Model to store eye image submissions from participants.
     Each submission contains three images: left eye, right eye, and camera specifications.
     """
+
+    IMAGE_FIELDS = ('left_eye_image', 'right_eye_image', 'camera_specs_image')
     
     # Image fields
     left_eye_image = models.ImageField(
         upload_to=upload_to,
+        storage=eye_image_storage,
         validators=[FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png', 'heic'])],
         verbose_name='Left Eye Image'
     )
     
     right_eye_image = models.ImageField(
         upload_to=upload_to,
+        storage=eye_image_storage,
         validators=[FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png', 'heic'])],
         verbose_name='Right Eye Image'
     )
     
     camera_specs_image = models.ImageField(
         upload_to=upload_to,
+        storage=eye_image_storage,
         validators=[FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png', 'heic'])],
         verbose_name='Camera Specifications Screenshot'
     )
@@ -71,3 +87,401 @@ class Submission(models.Model):
         if field and hasattr(field, 'name'):
             return os.path.basename(field.name)
         return None
+
+    def get_image(self, field_name, use_derivative=False):
+        """
+        The stored file for an image field; with use_derivative, the normalized
+        derivative when one has been written (falls back to the original).
+        """
+        if use_derivative:
+            for derivative in self.derivatives.all():
+                if derivative.source_field == field_name and derivative.image:
+                    return derivative.image
+        return getattr(self, field_name)
+
+
+class ProcessingJob(models.Model):
+    """
+    Background quality-scoring job for one submission.
+    Created when a submission is saved and run by the process_submissions
+    management command, so scoring never happens on the request path.
+    """
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    submission = models.OneToOneField(
+        Submission,
+        on_delete=models.CASCADE,
+        related_name='processing_job'
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now, db_index=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['run_after']
+        verbose_name = 'Processing Job'
+        verbose_name_plural = 'Processing Jobs'
+
+    def __str__(self):
+        return f"Job for submission #{self.submission_id} ({self.status})"
+
+
+class ImageQualityMetrics(models.Model):
+    """
+    Quality metrics for one eye image of a submission.
+    Same values as calculate_image_quality_metrics in the offline Phase A analysis.
+    """
+
+    EYE_CHOICES = [
+        ('left', 'Left Eye'),
+        ('right', 'Right Eye'),
+    ]
+
+    submission = models.ForeignKey(
+        Submission,
+        on_delete=models.CASCADE,
+        related_name='quality_metrics'
+    )
+    eye_side = models.CharField(max_length=5, choices=EYE_CHOICES)
+
+    resolution = models.CharField(max_length=20)
+    megapixels = models.FloatField()
+    aspect_ratio = models.FloatField()
+    file_size_kb = models.FloatField()
+    brightness = models.FloatField()
+    sharpness_score = models.FloatField()
+
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['submission', 'eye_side']
+        verbose_name = 'Image Quality Metrics'
+        verbose_name_plural = 'Image Quality Metrics'
+        constraints = [
+            models.UniqueConstraint(fields=['submission', 'eye_side'], name='unique_metrics_per_eye'),
+        ]
+
+    def __str__(self):
+        return f"Submission #{self.submission_id} - {self.get_eye_side_display()}"
+
+
+class ImageFingerprint(models.Model):
+    """
+    Perceptual hash (dHash) of one eye image, used to find near-duplicate photos.
+    The 64-bit hash is also split into four indexed 16-bit bands for
+    multi-index Hamming-distance lookups (see uploads.fingerprints).
+    """
+
+    submission = models.ForeignKey(
+        Submission,
+        on_delete=models.CASCADE,
+        related_name='fingerprints'
+    )
+    eye_side = models.CharField(max_length=5, choices=ImageQualityMetrics.EYE_CHOICES)
+
+    # Unsigned 64-bit hash stored as signed (BigIntegerField)
+    dhash = models.BigIntegerField()
+    band0 = models.PositiveIntegerField(db_index=True)
+    band1 = models.PositiveIntegerField(db_index=True)
+    band2 = models.PositiveIntegerField(db_index=True)
+    band3 = models.PositiveIntegerField(db_index=True)
+
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['submission', 'eye_side']
+        verbose_name = 'Image Fingerprint'
+        verbose_name_plural = 'Image Fingerprints'
+        constraints = [
+            models.UniqueConstraint(fields=['submission', 'eye_side'], name='unique_fingerprint_per_eye'),
+        ]
+
+    def __str__(self):
+        return f"Submission #{self.submission_id} - {self.get_eye_side_display()}"
+
+class ImageDerivative(models.Model):
+    """
+    Normalized copy of one submission image, written by the background worker:
+    EXIF orientation applied, long edge capped at DERIVATIVE_MAX_LONG_EDGE,
+    re-encoded as a progressive JPEG without metadata. The EXIF extracted from
+    the original is kept here.
+    """
+
+    SOURCE_CHOICES = [
+        ('left_eye_image', 'Left Eye Image'),
+        ('right_eye_image', 'Right Eye Image'),
+        ('camera_specs_image', 'Camera Specifications Screenshot'),
+    ]
+
+    submission = models.ForeignKey(
+        Submission,
+        on_delete=models.CASCADE,
+        related_name='derivatives'
+    )
+    source_field = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    image = models.ImageField(upload_to=upload_to, storage=eye_image_storage,
+                              width_field='width', height_field='height')
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    exif = models.JSONField(default=dict, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['submission', 'source_field']
+        verbose_name = 'Image Derivative'
+        verbose_name_plural = 'Image Derivatives'
+        constraints = [
+            models.UniqueConstraint(fields=['submission', 'source_field'], name='unique_derivative_per_image'),
+        ]
+
+    def __str__(self):
+        return f"Submission #{self.submission_id} - {self.get_source_field_display()} ({self.width}x{self.height})"
+
+
+class StoredBlob(models.Model):
+    """
+    Reference count of one content-addressed image blob.
+    Incremented when a file is stored under the name and decremented when a
+    Submission or ImageDerivative stops using it; both happen under a row
+    lock, so a blob is never deleted while another transaction is reusing it.
+    """
+
+    name = models.CharField(max_length=255, unique=True)
+    ref_count = models.IntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = 'Stored Blob'
+        verbose_name_plural = 'Stored Blobs'
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} reference(s))"
+
+
+class ResumableUpload(models.Model):
+    """
+    One file uploaded in chunks over several requests (tus-style).
+    Bytes are written to a partial file under RESUMABLE_UPLOAD_DIR until the
+    upload is finalized into a Submission or purged as abandoned.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    length = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Resumable Upload'
+        verbose_name_plural = 'Resumable Uploads'
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.length} bytes)"
+
+    @property
+    def path(self):
+        """Location of the partial file on local disk"""
+        return Path(settings.RESUMABLE_UPLOAD_DIR) / f'{self.id}.part'
+
+    @property
+    def is_complete(self):
+        return self.offset == self.length
+
+    def create_file(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.touch()
+
+    def write_chunk(self, stream, offset, chunk_size=64 * 1024):
+        """
+        Write stream to the partial file starting at offset and return the new
+        offset. Writing at an explicit position makes a retried chunk
+        idempotent. Raises ValueError if the data runs past self.length.
+        """
+        with open(self.path, 'r+b') as partial:
+            partial.seek(offset)
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                if offset + len(chunk) > self.length:
+                    raise ValueError('Chunk runs past the declared upload length')
+                partial.write(chunk)
+                offset += len(chunk)
+        return offset
+
+    def read_header(self, size=12):
+        with open(self.path, 'rb') as partial:
+            return partial.read(size)
+
+    def delete_file(self):
+        self.path.unlink(missing_ok=True)
+
+
+class DraftSubmission(models.Model):
+    """
+    A submission whose images are uploaded one request at a time (possibly in parallel).
+    Committing runs SubmissionForm on the collected images and creates the Submission.
+    """
+
+    # Image fields, uploaded independently
+    IMAGE_FIELDS = ('left_eye_image', 'right_eye_image', 'camera_specs_image')
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    left_eye_image = models.ImageField(upload_to=draft_upload_to, blank=True)
+    right_eye_image = models.ImageField(upload_to=draft_upload_to, blank=True)
+    camera_specs_image = models.ImageField(upload_to=draft_upload_to, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Draft Submission'
+        verbose_name_plural = 'Draft Submissions'
+
+    def __str__(self):
+        return f"Draft {self.id}"
+
+    def images(self):
+        """{field_name: uploaded filename or None}"""
+        return {field_name: self.get_filename(field_name) for field_name in self.IMAGE_FIELDS}
+
+    def get_filename(self, field_name):
+        field = getattr(self, field_name)
+        return os.path.basename(field.name) if field else None
+
+    def delete_files(self):
+        for field_name in self.IMAGE_FIELDS:
+            field = getattr(self, field_name)
+            if field:
+                field.delete(save=False)
+
+
+class ExportCheckpoint(models.Model):
+    """
+    Named position in the submission sequence for incremental exports.
+    An incremental export under this name contains the submissions with an
+    id above last_submission_id, and moves the checkpoint when it finishes.
+    """
+
+    name = models.SlugField(max_length=50, unique=True)
+    last_submission_id = models.PositiveBigIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = 'Export Checkpoint'
+        verbose_name_plural = 'Export Checkpoints'
+
+    def __str__(self):
+        return f"{self.name} (after #{self.last_submission_id})"
+
+
+class ExportJob(models.Model):
+    """
+    Export written to EXPORT_DIR by the process_exports management command.
+    Either a fixed selection of submissions (submission_ids) or, with a
+    checkpoint, every submission added since the checkpoint's last export.
+    """
+
+    FORMAT_CSV = 'csv'
+    FORMAT_JSON = 'json'
+    FORMAT_ZIP = 'zip'
+    FORMAT_ZIP_NORMALIZED = 'zip_normalized'
+    FORMAT_CHOICES = [
+        (FORMAT_CSV, 'CSV'),
+        (FORMAT_JSON, 'JSON'),
+        (FORMAT_ZIP, 'ZIP with images'),
+        (FORMAT_ZIP_NORMALIZED, 'ZIP with normalized images'),
+    ]
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    export_format = models.CharField(max_length=20, choices=FORMAT_CHOICES, default=FORMAT_ZIP)
+    submission_ids = models.JSONField(null=True, blank=True, editable=False)
+    checkpoint = models.ForeignKey(
+        ExportCheckpoint,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='jobs',
+        help_text='Export only the submissions added since this checkpoint',
+    )
+    # Submission id range of an incremental export, fixed when the job starts
+    after_submission_id = models.PositiveBigIntegerField(null=True, blank=True)
+    up_to_submission_id = models.PositiveBigIntegerField(null=True, blank=True)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    filename = models.CharField(max_length=255, blank=True)
+    last_error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Export Job'
+        verbose_name_plural = 'Export Jobs'
+
+    def __str__(self):
+        return f"Export #{self.pk} ({self.get_export_format_display()}, {self.status})"
+
+    def clean(self):
+        # Jobs added in the admin have no submission_ids; without a checkpoint they would export nothing
+        if self.checkpoint_id is None and self.submission_ids is None:
+            raise ValidationError({'checkpoint': 'Choose a checkpoint, or export a selection from the submission list.'})
+
+    @property
+    def path(self):
+        """Location of the finished export on local disk"""
+        return Path(settings.EXPORT_DIR) / self.filename
+
+    @property
+    def extension(self):
+        return 'zip' if self.export_format in (self.FORMAT_ZIP, self.FORMAT_ZIP_NORMALIZED) else self.export_format
+
+    def delete_file(self):
+        if self.filename and self.path.exists():
+            self.path.unlink()
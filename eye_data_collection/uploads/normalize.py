@@ -0,0 +1,86 @@
+"""
+Ingest-time normalization of submission images.
+
+normalize_image applies the EXIF orientation, extracts the EXIF tags into a
+JSON-safe dict (kept in the database) and re-encodes the image as a
+progressive JPEG whose long edge is capped, without any metadata. The
+derivative is what exports and analysis can read instead of the original
+multi-megabyte phone photo.
+"""
+
+from io import BytesIO
+
+from PIL import Image, ImageOps
+from PIL.ExifTags import IFD, TAGS
+from PIL.TiffImagePlugin import IFDRational
+
+# Tags not kept in the database: large binary blobs and thumbnail pointers
+SKIPPED_EXIF_TAGS = {'MakerNote', 'UserComment', 'PrintImageMatching', 'JPEGInterchangeFormat',
+                     'JPEGInterchangeFormatLength', 'ExifOffset', 'GPSInfo'}
+
+
+def _json_value(value):
+    """Convert an EXIF value to something JSONField can store, or None to drop it"""
+    if isinstance(value, IFDRational):
+        return float(value) if value.denominator else None
+    if isinstance(value, bytes):
+        return None
+    if isinstance(value, (tuple, list)):
+        converted = [_json_value(item) for item in value]
+        return None if None in converted else converted
+    if isinstance(value, str):
+        return value.strip('\x00').strip()
+    if isinstance(value, (int, float)):
+        return value
+    return str(value)
+
+
+def extract_exif(img):
+    """
+    Base and Exif-IFD tags of an open image as {tag name: value}.
+    GPS data is left out on purpose (participant location).
+    """
+    exif = img.getexif()
+    tags = dict(exif)
+    tags.update(exif.get_ifd(IFD.Exif))
+
+    result = {}
+    for tag_id, value in tags.items():
+        name = TAGS.get(tag_id, str(tag_id))
+        if name in SKIPPED_EXIF_TAGS:
+            continue
+        value = _json_value(value)
+        if value is not None and value != '':
+            result[name] = value
+    return result
+
+
+def normalize_image(image_file, max_long_edge, quality=85):
+    """
+    Auto-orient, downscale and re-encode an image.
+
+    Returns a dict with 'content' (progressive JPEG bytes, no metadata),
+    'width', 'height' and 'exif' (tags extracted from the original).
+    """
+    with Image.open(image_file) as img:
+        exif = extract_exif(img)
+        # Decode JPEGs at reduced scale when the cap allows it; the final
+        # resize below brings the long edge down to max_long_edge exactly
+        width, height = img.size
+        if max(width, height) > max_long_edge:
+            ratio = max_long_edge / max(width, height)
+            img.draft('RGB', (round(width * ratio), round(height * ratio)))
+        normalized = ImageOps.exif_transpose(img)
+        if normalized.mode != 'RGB':
+            normalized = normalized.convert('RGB')
+        normalized.thumbnail((max_long_edge, max_long_edge), Image.Resampling.LANCZOS)
+
+        buffer = BytesIO()
+        normalized.save(buffer, 'JPEG', quality=quality, progressive=True, optimize=True)
+
+    return {
+        'content': buffer.getvalue(),
+        'width': normalized.width,
+        'height': normalized.height,
+        'exif': exif,
+    }
@@ -0,0 +1,190 @@
+"""
+Database-backed job queue for scoring submissions in the background.
+
+A ProcessingJob row is created for every new Submission (see signals.py).
+The process_submissions management command claims due jobs, computes the
+quality metrics and perceptual fingerprints of the left and right eye
+images, writes normalized derivatives of all images and retries scoring
+failures with exponential backoff. Claiming uses a conditional UPDATE
+instead of row locks, so several workers can share the queue on SQLite as
+well as PostgreSQL.
+"""
+
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .fingerprints import compute_dhash, fingerprint_fields
+from .models import ImageDerivative, ImageFingerprint, ImageQualityMetrics, ProcessingJob, Submission
+from .normalize import normalize_image
+from .quality import calculate_image_quality_metrics
+from .storage import release_blob
+
+# Eye image fields scored for every submission, by eye_side
+EYE_IMAGE_FIELDS = {
+    'left': 'left_eye_image',
+    'right': 'right_eye_image',
+}
+
+
+def max_attempts():
+    return getattr(settings, 'PROCESSING_MAX_ATTEMPTS', 5)
+
+
+def retry_delay(attempts):
+    """Backoff before the next attempt: base * 2^(attempts - 1), capped"""
+    base = getattr(settings, 'PROCESSING_RETRY_BASE_SECONDS', 10)
+    cap = getattr(settings, 'PROCESSING_RETRY_MAX_SECONDS', 3600)
+    return timedelta(seconds=min(base * 2 ** max(attempts - 1, 0), cap))
+
+
+def enqueue_missing_jobs():
+    """Create pending jobs for submissions that have none (e.g. rows saved before the queue existed)"""
+    missing = Submission.objects.filter(processing_job__isnull=True).values_list('id', flat=True)
+    jobs = [ProcessingJob(submission_id=submission_id) for submission_id in missing]
+    ProcessingJob.objects.bulk_create(jobs, ignore_conflicts=True)
+    return len(jobs)
+
+
+def claim_next_job():
+    """
+    Claim the oldest due job and mark it running, or return None.
+
+    A running job whose lease (PROCESSING_LEASE_SECONDS) has expired is
+    assumed to belong to a crashed worker and can be claimed again.
+    """
+    now = timezone.now()
+    lease = timedelta(seconds=getattr(settings, 'PROCESSING_LEASE_SECONDS', 600))
+
+    due = (
+        ProcessingJob.objects.filter(status=ProcessingJob.STATUS_PENDING, run_after__lte=now)
+        | ProcessingJob.objects.filter(status=ProcessingJob.STATUS_RUNNING, locked_at__lt=now - lease)
+    )
+    for job in due.order_by('run_after')[:10]:
+        claimed = ProcessingJob.objects.filter(
+            pk=job.pk, status=job.status, attempts=job.attempts
+        ).update(
+            status=ProcessingJob.STATUS_RUNNING,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+
+def write_derivative(submission, field_name):
+    """
+    Normalize one submission image and store it (with its EXIF) as an ImageDerivative.
+    Storing the blob takes a reference to it; the reference is released again
+    if the row cannot be saved, and the replaced blob's reference is released.
+    """
+    field = getattr(submission, field_name)
+    with field.open('rb') as image_file:
+        normalized = normalize_image(
+            image_file,
+            max_long_edge=getattr(settings, 'DERIVATIVE_MAX_LONG_EDGE', 2048),
+            quality=getattr(settings, 'DERIVATIVE_JPEG_QUALITY', 85),
+        )
+
+    derivative = (
+        ImageDerivative.objects.filter(submission=submission, source_field=field_name).first()
+        or ImageDerivative(submission=submission, source_field=field_name)
+    )
+    previous_name = derivative.image.name
+    derivative.exif = normalized['exif']
+    with transaction.atomic():
+        derivative.image.save('normalized.jpg', ContentFile(normalized['content']), save=False)
+        # Set after image.save(), which clears width_field/height_field for the unnamed ContentFile
+        derivative.width = normalized['width']
+        derivative.height = normalized['height']
+        derivative.save()
+        if previous_name:
+            release_blob(derivative.image.storage, previous_name)
+    return derivative
+
+
+def score_submission(submission):
+    """Compute and store quality metrics and fingerprints for the eye images of a submission"""
+    for eye_side, field_name in EYE_IMAGE_FIELDS.items():
+        field = getattr(submission, field_name)
+        if not field:
+            continue
+        with field.open('rb') as image_file:
+            metrics = calculate_image_quality_metrics(image_file, field.size)
+            image_file.seek(0)
+            dhash = compute_dhash(image_file)
+        ImageQualityMetrics.objects.update_or_create(
+            submission=submission,
+            eye_side=eye_side,
+            defaults=metrics,
+        )
+        ImageFingerprint.objects.update_or_create(
+            submission=submission,
+            eye_side=eye_side,
+            defaults=fingerprint_fields(dhash),
+        )
+
+
+def process_submission(submission):
+    """
+    Score the eye images of a submission, then write normalized derivatives
+    of all its images. Scoring errors are raised (the job is retried); a
+    derivative that cannot be written does not undo the scores or the other
+    derivatives and is reported in the returned list of error messages.
+    """
+    with transaction.atomic():
+        score_submission(submission)
+
+    errors = []
+    for field_name in Submission.IMAGE_FIELDS:
+        if not getattr(submission, field_name):
+            continue
+        try:
+            write_derivative(submission, field_name)
+        except Exception:
+            errors.append(f'Derivative of {field_name} failed:\n{traceback.format_exc()}')
+    return errors
+
+
+def run_job(job):
+    """Run a claimed job; on failure schedule a retry or mark it failed. Returns True on success."""
+    try:
+        derivative_errors = process_submission(job.submission)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts >= max_attempts():
+            job.status = ProcessingJob.STATUS_FAILED
+        else:
+            job.status = ProcessingJob.STATUS_PENDING
+            job.run_after = timezone.now() + retry_delay(job.attempts)
+        job.locked_at = None
+        job.save(update_fields=['status', 'run_after', 'locked_at', 'last_error', 'updated_at'])
+        return False
+
+    job.status = ProcessingJob.STATUS_DONE
+    job.locked_at = None
+    # Derivatives are optional (exports fall back to the originals); keep their errors visible
+    job.last_error = '\n'.join(derivative_errors)
+    job.save(update_fields=['status', 'locked_at', 'last_error', 'updated_at'])
+    return True
+
+
+def process_pending_jobs(limit=None):
+    """Run due jobs until none are left (or limit is reached). Returns (succeeded, failed)."""
+    succeeded = failed = 0
+    while limit is None or succeeded + failed < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        if run_job(job):
+            succeeded += 1
+        else:
+            failed += 1
+    return succeeded, failed
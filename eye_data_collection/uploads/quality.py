@@ -0,0 +1,181 @@
+"""
+Image quality metrics for uploaded eye images.
+
+Computes the same values as calculate_image_quality_metrics in the offline
+Phase A analysis (image_analysis.py): resolution, megapixels, aspect_ratio,
+file_size_kb, brightness (mean pixel intensity) and sharpness_score
+(variance of the Laplacian of the grey-level frame). Only NumPy and Pillow
+are needed, so the web deployment does not pull in pandas or SciPy.
+"""
+
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+
+# Decode cost estimates used by the upload quality gate, in milliseconds per
+# source megapixel. JPEGs are decoded at 1/2-1/8 scale (Image.draft), other
+# formats in full. The values start from measurements on a 12 MP JPEG and a
+# 2 MP PNG and are updated from observed timings (moving average), capped at
+# MAX_DECODE_COST_FACTOR times the baseline. Each time the estimate makes the
+# gate skip the decode it decays halfway back to the baseline, so a burst of
+# slow decodes cannot switch the pixel checks off for good.
+BASELINE_DECODE_MS_PER_MEGAPIXEL = {'JPEG': 6.0}
+DEFAULT_DECODE_MS_PER_MEGAPIXEL = 60.0
+MAX_DECODE_COST_FACTOR = 4
+DECODE_MS_PER_MEGAPIXEL = dict(BASELINE_DECODE_MS_PER_MEGAPIXEL)
+_decode_cost_lock = threading.Lock()
+
+# Laplacian variance of a photo decoded at 1/scale resolution divided by its
+# full-resolution value, by decode scale (fast_mode_calibration.md, plus 1/8
+# measured on IMG_4977.jpeg). Used to apply the full-resolution sharpness
+# threshold to the gate's downscaled decode.
+SHARPNESS_SCALE_RATIOS = {1: 1.0, 2: 1.5, 4: 2.5, 8: 2.75}
+
+
+def laplacian_variance(gray):
+    """
+    Variance of the 4-neighbour Laplacian of a 2-D array.
+    Edges are mirrored like scipy.ndimage.laplace's default 'reflect' mode.
+    """
+    padded = np.pad(gray, 1, mode='symmetric')
+    laplacian = (
+        padded[:-2, 1:-1] + padded[2:, 1:-1]
+        + padded[1:-1, :-2] + padded[1:-1, 2:]
+        - 4 * gray
+    )
+    return float(laplacian.var(dtype=np.float64))
+
+
+def calculate_image_quality_metrics(image_file, file_size):
+    """
+    Calculate basic quality metrics for an open image file.
+
+    image_file is anything Image.open accepts (a path or a file object such
+    as a FieldFile opened for reading); file_size is its size in bytes.
+    Errors are raised to the caller so the job can be retried.
+    """
+    with Image.open(image_file) as img:
+        width, height = img.size
+        pixels = np.asarray(img)
+
+    gray = pixels.mean(axis=2, dtype=np.float32) if pixels.ndim == 3 else pixels.astype(np.float32)
+
+    return {
+        'resolution': f"{width}x{height}",
+        'megapixels': round((width * height) / 1_000_000, 2),
+        'aspect_ratio': round(width / height, 2),
+        'file_size_kb': round(file_size / 1024, 2),
+        'brightness': round(float(pixels.mean()), 2),
+        'sharpness_score': round(laplacian_variance(gray), 2),
+    }
+
+
+def _baseline_decode_ms(image_format):
+    return BASELINE_DECODE_MS_PER_MEGAPIXEL.get(image_format, DEFAULT_DECODE_MS_PER_MEGAPIXEL)
+
+
+def _estimated_decode_ms(image_format, megapixels):
+    with _decode_cost_lock:
+        return megapixels * DECODE_MS_PER_MEGAPIXEL.get(image_format, _baseline_decode_ms(image_format))
+
+
+def _record_decode_ms(image_format, megapixels, elapsed_ms):
+    if megapixels <= 0:
+        return
+    baseline = _baseline_decode_ms(image_format)
+    with _decode_cost_lock:
+        previous = DECODE_MS_PER_MEGAPIXEL.get(image_format, baseline)
+        learned = 0.8 * previous + 0.2 * (elapsed_ms / megapixels)
+        DECODE_MS_PER_MEGAPIXEL[image_format] = min(learned, baseline * MAX_DECODE_COST_FACTOR)
+
+
+def _decay_decode_ms(image_format):
+    """Move the estimate halfway back to the baseline after a skipped decode"""
+    baseline = _baseline_decode_ms(image_format)
+    with _decode_cost_lock:
+        previous = DECODE_MS_PER_MEGAPIXEL.get(image_format, baseline)
+        DECODE_MS_PER_MEGAPIXEL[image_format] = baseline + (previous - baseline) / 2
+
+
+def _decode_downscaled(img, working_size):
+    """
+    Decode img with its long edge reduced towards working_size.
+    Only JPEGs can be reduced during decoding (DCT scaling via Image.draft);
+    other formats are fully decoded anyway and are scored at full resolution.
+    """
+    width, height = img.size
+    long_edge = max(width, height)
+    if long_edge > working_size:
+        ratio = working_size / long_edge
+        img.draft(img.mode, (round(width * ratio), round(height * ratio)))
+    img.load()
+    return img
+
+
+def sharpness_threshold(min_sharpness, decode_scale):
+    """Full-resolution sharpness threshold converted to a frame decoded at 1/decode_scale"""
+    scale = min(SHARPNESS_SCALE_RATIOS, key=lambda known: abs(np.log2(known) - np.log2(max(decode_scale, 1))))
+    return min_sharpness * SHARPNESS_SCALE_RATIOS[scale]
+
+
+def check_upload_quality(image_file, min_megapixels, min_brightness, min_sharpness,
+                         budget_ms=200, working_size=768):
+    """
+    Quick quality gate for an uploaded image.
+
+    Checks the header dimensions first, then brightness and sharpness on a
+    decode downscaled to about working_size pixels. The pixel check is
+    skipped (header-only result) when its estimated decode time does not fit
+    in what is left of budget_ms; the estimate recovers after a skip (see
+    DECODE_MS_PER_MEGAPIXEL), so an image of the same size is decoded again
+    later.
+
+    min_sharpness is a full-resolution score (like MIN_SHARPNESS in the
+    Phase A analysis); it is scaled to the decode with sharpness_threshold.
+
+    Returns a dict with 'problems' (list of messages, empty when the image
+    passes), 'stage' ('header' or 'pixels'), 'metrics' and 'elapsed_ms'.
+    """
+    started = time.perf_counter()
+    result = {'problems': [], 'stage': 'header', 'metrics': {}, 'elapsed_ms': 0.0}
+
+    def elapsed_ms():
+        return (time.perf_counter() - started) * 1000
+
+    with Image.open(image_file) as img:
+        width, height = img.size
+        megapixels = round((width * height) / 1_000_000, 2)
+        result['metrics']['megapixels'] = megapixels
+        if megapixels < min_megapixels:
+            result['problems'].append(
+                f'the resolution is too low ({megapixels} MP, at least {min_megapixels} MP needed)'
+            )
+
+        remaining_ms = budget_ms - elapsed_ms()
+        fits_budget = _estimated_decode_ms(img.format, megapixels) <= remaining_ms
+        if not result['problems'] and not fits_budget:
+            _decay_decode_ms(img.format)
+        if not result['problems'] and fits_budget:
+            decode_started = time.perf_counter()
+            image_format = img.format
+            decoded = _decode_downscaled(img, working_size)
+            pixels = np.asarray(decoded)
+            _record_decode_ms(image_format, megapixels, (time.perf_counter() - decode_started) * 1000)
+
+            gray = pixels.mean(axis=2, dtype=np.float32) if pixels.ndim == 3 else pixels.astype(np.float32)
+            brightness = round(float(pixels.mean()), 2)
+            sharpness = round(laplacian_variance(gray), 2)
+            decode_scale = max(width, height) / max(decoded.size)
+            result['metrics'].update(brightness=brightness, sharpness_score=sharpness,
+                                     decode_scale=round(decode_scale, 3))
+            result['stage'] = 'pixels'
+
+            if brightness < min_brightness:
+                result['problems'].append('the photo is too dark')
+            if sharpness < sharpness_threshold(min_sharpness, decode_scale):
+                result['problems'].append('the photo is blurry')
+
+    result['elapsed_ms'] = round(elapsed_ms(), 1)
+    return result
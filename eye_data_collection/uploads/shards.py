@@ -0,0 +1,167 @@
+"""
+WebDataset-style tar shards of the submission dataset for model training.
+
+Each sample is stored as consecutive tar members sharing a key:
+submission_<id>.left.<ext>, submission_<id>.right.<ext> and
+submission_<id>.json (camera type, EXIF and quality metrics per eye).
+Shards hold a fixed number of samples in id order and are written as
+.part files that are renamed when complete. shards.json in the output
+directory lists the finished shards with their last submission id, so an
+interrupted export resumes after the last completed shard.
+"""
+
+import json
+import os
+import tarfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+
+from PIL import Image
+
+from .exports import iterate_by_pk
+from .normalize import extract_exif
+from .processing import EYE_IMAGE_FIELDS
+
+INDEX_FILENAME = 'shards.json'
+
+QUALITY_FIELDS = ('resolution', 'megapixels', 'aspect_ratio', 'file_size_kb', 'brightness', 'sharpness_score')
+
+
+def shard_name(number):
+    return f'shard-{number:06d}.tar'
+
+
+def load_index(output_dir):
+    """Finished shards recorded in shards.json, or [] for a new export"""
+    index_path = Path(output_dir) / INDEX_FILENAME
+    if not index_path.exists():
+        return []
+    with open(index_path) as index_file:
+        return json.load(index_file)['shards']
+
+
+def save_index(output_dir, shards):
+    """Write shards.json atomically"""
+    index_path = Path(output_dir) / INDEX_FILENAME
+    temp_path = index_path.with_name(INDEX_FILENAME + '.part')
+    with open(temp_path, 'w') as index_file:
+        json.dump({'shards': shards}, index_file, indent=2)
+    os.replace(temp_path, index_path)
+
+
+def image_exif(content):
+    """EXIF tags of an image file's bytes (only the header is parsed)"""
+    try:
+        with Image.open(BytesIO(content)) as img:
+            return extract_exif(img)
+    except Exception:
+        return {}
+
+
+def read_sample(submission, use_derivatives=False):
+    """
+    Tar members {name: bytes} of one submission. Runs in a worker thread, so
+    files are opened through the storage rather than the shared FieldFiles.
+    Expects derivatives and quality_metrics to be prefetched.
+    """
+    key = f'submission_{submission.id:08d}'
+    derivatives = {derivative.source_field: derivative for derivative in submission.derivatives.all()}
+    metrics = {metric.eye_side: metric for metric in submission.quality_metrics.all()}
+
+    members = {}
+    sidecar = {
+        'submission_id': submission.id,
+        'submitted_at': submission.submitted_at.isoformat(),
+        'camera_type': submission.camera_type,
+        'eyes': {},
+    }
+    for eye_side, field_name in EYE_IMAGE_FIELDS.items():
+        image = submission.get_image(field_name, use_derivatives)
+        if not image:
+            continue
+        with image.storage.open(image.name, 'rb') as image_file:
+            content = image_file.read()
+        extension = os.path.splitext(image.name)[1].lower() or '.jpg'
+        members[f'{key}.{eye_side}{extension}'] = content
+
+        derivative = derivatives.get(field_name)
+        metric = metrics.get(eye_side)
+        sidecar['eyes'][eye_side] = {
+            # EXIF was stripped from the derivative; it is kept on the derivative row
+            'exif': derivative.exif if derivative is not None else image_exif(content),
+            'quality': {field: getattr(metric, field) for field in QUALITY_FIELDS} if metric else None,
+        }
+
+    members[f'{key}.json'] = json.dumps(sidecar, sort_keys=True).encode('utf-8')
+    return submission, members
+
+
+def ordered_parallel(function, items, workers):
+    """
+    function(item) for each item, computed by a thread pool and yielded in
+    input order. At most 2 * workers results are pending at a time, so memory
+    stays bounded however many items there are.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(function, item))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def add_sample(tar, submission, members):
+    """Append one sample's members to an open tar file"""
+    mtime = submission.submitted_at.timestamp()
+    for name, content in members.items():
+        info = tarfile.TarInfo(name)
+        info.size = len(content)
+        info.mtime = mtime
+        tar.addfile(info, BytesIO(content))
+
+
+def export_shards(queryset, output_dir, samples_per_shard=1000, workers=8, use_derivatives=False):
+    """
+    Write the submissions of queryset to tar shards in output_dir, resuming
+    after the last shard in shards.json. Samples are streamed into the open
+    shard, so only the read-ahead window is held in memory. Yields the index
+    entry of each shard as it is completed; the last one may be smaller.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    shards = load_index(output_dir)
+    for stale in output_dir.glob('*.tar.part'):
+        stale.unlink()
+
+    if shards:
+        queryset = queryset.filter(id__gt=shards[-1]['last_submission_id'])
+    submissions = iterate_by_pk(queryset.prefetch_related('derivatives', 'quality_metrics'), 500)
+    samples = ordered_parallel(lambda submission: read_sample(submission, use_derivatives), submissions, workers)
+
+    tar = entry = None
+    for submission, members in samples:
+        if tar is None:
+            entry = {'name': shard_name(len(shards)), 'samples': 0, 'first_submission_id': submission.id}
+            tar = tarfile.open(output_dir / (entry['name'] + '.part'), 'w')
+        add_sample(tar, submission, members)
+        entry['samples'] += 1
+        entry['last_submission_id'] = submission.id
+
+        if entry['samples'] == samples_per_shard:
+            yield _finish_shard(output_dir, shards, tar, entry)
+            tar = None
+    if tar is not None:
+        yield _finish_shard(output_dir, shards, tar, entry)
+
+
+def _finish_shard(output_dir, shards, tar, entry):
+    """Close a shard, move it into place and record it in shards.json"""
+    tar.close()
+    os.replace(output_dir / (entry['name'] + '.part'), output_dir / entry['name'])
+    shards.append(entry)
+    save_index(output_dir, shards)
+    return entry
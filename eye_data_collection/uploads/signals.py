@@ -0,0 +1,63 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import ExportJob, ImageDerivative, ProcessingJob, Submission
+from .storage import release_blob
+
+
+@receiver(post_save, sender=Submission)
+def enqueue_processing_job(sender, instance, created, **kwargs):
+    """Queue a new submission for background quality scoring"""
+    if created:
+        ProcessingJob.objects.get_or_create(submission=instance)
+
+
+@receiver(pre_save, sender=Submission)
+def remember_replaced_images(sender, instance, **kwargs):
+    """
+    Note the stored names of images that this save replaces: a different
+    name, or a new upload not stored yet (it may get the same name back).
+    """
+    instance._replaced_image_names = []
+    if instance.pk is None:
+        return
+    previous = Submission.objects.filter(pk=instance.pk).values(*Submission.IMAGE_FIELDS).first() or {}
+    for field_name, previous_name in previous.items():
+        field = getattr(instance, field_name)
+        if previous_name and (field.name != previous_name or not field._committed):
+            instance._replaced_image_names.append(previous_name)
+
+
+@receiver(post_save, sender=Submission)
+def release_replaced_images(sender, instance, **kwargs):
+    """Drop the references held by images replaced in this save"""
+    for name in getattr(instance, '_replaced_image_names', []):
+        release_blob(instance.left_eye_image.storage, name)
+    instance._replaced_image_names = []
+
+
+@receiver(post_delete, sender=Submission)
+def delete_unreferenced_images(sender, instance, **kwargs):
+    """
+    Drop the submission's references to its image blobs.
+    Blobs are shared between submissions with identical images; a blob is
+    deleted after commit once its reference count reaches zero.
+    """
+    for field_name in Submission.IMAGE_FIELDS:
+        name = getattr(instance, field_name).name
+        if name:
+            release_blob(instance.left_eye_image.storage, name)
+
+
+@receiver(post_delete, sender=ImageDerivative)
+def delete_unreferenced_derivative(sender, instance, **kwargs):
+    """Drop a derivative's reference to its blob"""
+    if instance.image:
+        release_blob(instance.image.storage, instance.image.name)
+
+
+@receiver(post_delete, sender=ExportJob)
+def delete_export_file(sender, instance, **kwargs):
+    """Remove the export file from EXPORT_DIR along with its job"""
+    transaction.on_commit(instance.delete_file)
@@ -0,0 +1,167 @@
+"""
+Content-addressed storage for submission images.
+
+Each file is hashed (SHA-256) while it is streamed to disk and stored
+under a name derived from its digest, so identical uploads share one blob.
+Blob names use the same sharded layout as upload_to
+(uploads/ab/cd/<32 hex>.ext), with the first 128 bits of the digest as
+the key. Each blob has a StoredBlob row counting the Submission and
+ImageDerivative fields that use it. Storing a file increments the count and
+releasing a reference decrements it, both under a lock on that row, and the
+file is deleted after commit once the count is zero (see signals.py). A
+concurrent upload of the same bytes therefore either keeps the blob alive
+or stores it again after the delete; it never ends up pointing at a file
+that was just removed.
+"""
+
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage, storages
+from django.db import transaction
+from django.db.models import F, Q
+
+from .upload_handlers import SNIFF_BYTES, sniff_image_type
+
+# Matches names produced by upload_to: uploads/ab/cd/abcd...(32 hex).ext
+SHARDED_NAME_REGEX = r'^uploads/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{32}(\.[A-Za-z0-9]+)?$'
+
+# Blob extension per sniffed image type, and for spellings of the same type
+IMAGE_TYPE_EXTENSIONS = {'jpeg': '.jpg', 'png': '.png', 'heic': '.heic'}
+EXTENSION_ALIASES = {'.jpeg': '.jpg', '.jpe': '.jpg', '.heif': '.heic'}
+
+
+def sharded_name(key, filename):
+    """
+    Storage name uploads/<k[0:2]>/<k[2:4]>/<k><ext> for a 32-character hex key.
+    Two levels of 256 directories keep each directory small at any scale.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    return '/'.join(['uploads', key[:2], key[2:4], key + extension])
+
+
+def blob_extension(header, filename):
+    """
+    Extension of a blob: from the image type of its first bytes, otherwise
+    from filename with aliases such as .jpeg folded, so the same bytes
+    uploaded as photo.JPG and photo.jpeg get one name
+    """
+    image_type = sniff_image_type(header)
+    if image_type is not None:
+        return IMAGE_TYPE_EXTENSIONS[image_type]
+    extension = os.path.splitext(filename)[1].lower()
+    return EXTENSION_ALIASES.get(extension, extension)
+
+
+def digest_name(digest, filename, header=b''):
+    """Storage name for a blob with the given SHA-256 hex digest and first bytes"""
+    return sharded_name(digest[:32], '') + blob_extension(header, filename)
+
+
+def file_digest(content):
+    """SHA-256 hex digest of a file object, read in chunks"""
+    hasher = hashlib.sha256()
+    if hasattr(content, 'chunks'):
+        chunks = content.chunks()
+    else:
+        content.seek(0)
+        chunks = iter(lambda: content.read(64 * 1024), b'')
+    for chunk in chunks:
+        hasher.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return hasher.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage that stores each unique file content once.
+    The name passed to save() only contributes its extension, and only for
+    content that is not a recognised image (see blob_extension).
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is only known after hashing; identical content may reuse a name
+        return name
+
+    def _save(self, name, content):
+        os.makedirs(self.location, exist_ok=True)
+        hasher = hashlib.sha256()
+        header = b''
+        descriptor, temp_path = tempfile.mkstemp(prefix='.incoming-', dir=self.location)
+        try:
+            with os.fdopen(descriptor, 'wb') as temp_file:
+                for chunk in content.chunks():
+                    hasher.update(chunk)
+                    header += chunk[:SNIFF_BYTES - len(header)]
+                    temp_file.write(chunk)
+
+            name = digest_name(hasher.hexdigest(), name, header)
+            full_path = self.path(name)
+            with transaction.atomic():
+                # The count is raised before the file is checked. Under autocommit the
+                # row lock ends with this block, but a release only deletes the file if
+                # the count is still zero when delete_unreferenced_blob re-checks it
+                # under the lock after commit, so this reference keeps the blob alive
+                acquire_blob(name)
+                if os.path.exists(full_path):
+                    # Duplicate content: keep the existing blob
+                    os.remove(temp_path)
+                else:
+                    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                    if self.file_permissions_mode is not None:
+                        os.chmod(temp_path, self.file_permissions_mode)
+                    os.replace(temp_path, full_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return name
+
+
+def eye_image_storage():
+    """Storage for Submission images (STORAGES['eye_images'])"""
+    return storages['eye_images']
+
+
+def acquire_blob(name):
+    """Count one more reference to a blob, locking its StoredBlob row (call inside a transaction)"""
+    from .models import StoredBlob
+    blob, created = StoredBlob.objects.select_for_update().get_or_create(name=name)
+    StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+
+
+def release_blob(storage, name):
+    """
+    Drop one reference to a blob. Once the surrounding transaction commits,
+    the file is deleted if no reference is left.
+    """
+    from .models import StoredBlob
+    StoredBlob.objects.filter(name=name).update(ref_count=F('ref_count') - 1)
+    transaction.on_commit(lambda: delete_unreferenced_blob(storage, name))
+
+
+def delete_unreferenced_blob(storage, name):
+    """Delete a blob's file and row if its reference count is zero"""
+    from .models import StoredBlob
+    with transaction.atomic():
+        blob = StoredBlob.objects.select_for_update().filter(name=name).first()
+        if blob is not None and blob.ref_count <= 0:
+            storage.delete(name)
+            blob.delete()
+
+
+def find_duplicates(file):
+    """
+    Submissions that already contain this exact file content.
+    Only hashes the file; nothing is written.
+    """
+    from .models import Submission
+    digest = file_digest(file)
+    # Any extension: blobs stored before names were canonical may end in .jpeg or .JPG
+    prefix = digest_name(digest, '')
+    query = Q()
+    for field_name in Submission.IMAGE_FIELDS:
+        query |= Q(**{f'{field_name}__startswith': prefix})
+    return Submission.objects.filter(query)
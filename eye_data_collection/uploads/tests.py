@@ -1,3 +1,264 @@
-from django.test import TestCase
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from .models import ImageDerivative, ProcessingJob, ResumableUpload, StoredBlob, Submission
+from .processing import claim_next_job, process_pending_jobs, retry_delay, run_job
+from .storage import file_digest, find_duplicates, sharded_name
+
+SAMPLE_JPEG = settings.BASE_DIR / 'static' / 'IMG_4977.jpeg'
+
+
+class ResumableUploadTests(TestCase):
+    """tus-style chunked uploads: create, offset checks and size limits"""
+
+    def setUp(self):
+        upload_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(upload_dir.cleanup)
+        overrides = override_settings(RESUMABLE_UPLOAD_DIR=upload_dir.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.content = SAMPLE_JPEG.read_bytes()
+
+    def create(self, length):
+        return self.client.post(reverse('uploads:resumable_create'), headers={
+            'Tus-Resumable': '1.0.0',
+            'Upload-Length': str(length),
+            'Upload-Metadata': 'filename SU1HXzQ5NzcuanBlZw==,filetype aW1hZ2UvanBlZw==',
+        })
+
+    def patch(self, upload, data, offset):
+        return self.client.patch(
+            reverse('uploads:resumable_upload', args=[upload.pk]),
+            data,
+            content_type='application/offset+octet-stream',
+            headers={'Tus-Resumable': '1.0.0', 'Upload-Offset': str(offset)},
+        )
+
+    def test_create(self):
+        response = self.create(len(self.content))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response['Upload-Offset'], '0')
+        upload = ResumableUpload.objects.get()
+        self.assertTrue(response['Location'].endswith(f'/api/resumable/{upload.pk}/'))
+        self.assertEqual(
+            (upload.filename, upload.content_type, upload.length),
+            ('IMG_4977.jpeg', 'image/jpeg', len(self.content)),
+        )
+        self.assertTrue(upload.path.exists())
+
+    @override_settings(UPLOAD_MAX_FILE_SIZE=1000)
+    def test_create_over_max_size(self):
+        response = self.create(1001)
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(response['Tus-Max-Size'], '1000')
+        self.assertFalse(ResumableUpload.objects.exists())
+
+    def test_chunks_advance_offset(self):
+        self.create(len(self.content))
+        upload = ResumableUpload.objects.get()
+        half = len(self.content) // 2
+
+        response = self.patch(upload, self.content[:half], 0)
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(response['Upload-Offset'], str(half))
+
+        response = self.client.head(reverse('uploads:resumable_upload', args=[upload.pk]))
+        self.assertEqual(response['Upload-Offset'], str(half))
+
+        response = self.patch(upload, self.content[half:], half)
+        self.assertEqual(response.status_code, 204)
+        upload.refresh_from_db()
+        self.assertTrue(upload.is_complete)
+        self.assertEqual(upload.path.read_bytes(), self.content)
+
+    def test_offset_mismatch_is_a_conflict(self):
+        self.create(len(self.content))
+        upload = ResumableUpload.objects.get()
+        self.patch(upload, self.content[:1000], 0)
+
+        # A retried first chunk, and a chunk that skips ahead
+        for offset in (0, 2000):
+            response = self.patch(upload, self.content[offset:offset + 1000], offset)
+            self.assertEqual(response.status_code, 409)
+            self.assertEqual(response['Upload-Offset'], '1000')
+        upload.refresh_from_db()
+        self.assertEqual(upload.offset, 1000)
+        self.assertEqual(upload.path.read_bytes(), self.content[:1000])
+
+    def test_patch_losing_race_is_a_conflict(self):
+        self.create(len(self.content))
+        upload = ResumableUpload.objects.get()
+        write_chunk = ResumableUpload.write_chunk
+
+        def concurrent_write(instance, stream, offset):
+            # Another PATCH at the same offset finishes while this one is writing
+            new_offset = write_chunk(instance, stream, offset)
+            ResumableUpload.objects.filter(pk=instance.pk).update(offset=1500)
+            return new_offset
+
+        with mock.patch.object(ResumableUpload, 'write_chunk', concurrent_write):
+            response = self.patch(upload, self.content[:1000], 0)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Upload-Offset'], '1500')
+        upload.refresh_from_db()
+        self.assertEqual(upload.offset, 1500)
+
+    def test_chunk_past_declared_length(self):
+        self.create(1000)
+        upload = ResumableUpload.objects.get()
+        response = self.patch(upload, self.content[:1001], 0)
+        self.assertEqual(response.status_code, 413)
+        upload.refresh_from_db()
+        self.assertEqual(upload.offset, 0)
+
+    def test_non_image_is_rejected(self):
+        self.create(100)
+        upload = ResumableUpload.objects.get()
+        response = self.patch(upload, b'%PDF-1.7' + b'\0' * 92, 0)
+        self.assertEqual(response.status_code, 415)
+        self.assertFalse(ResumableUpload.objects.exists())
+        self.assertFalse(upload.path.exists())
+
+
+@override_settings(
+    PROCESSING_MAX_ATTEMPTS=3,
+    PROCESSING_RETRY_BASE_SECONDS=10,
+    PROCESSING_RETRY_MAX_SECONDS=30,
+    PROCESSING_LEASE_SECONDS=600,
+)
+class ProcessingJobTests(TestCase):
+    """Claiming due jobs, lease expiry and retry with backoff"""
+
+    def setUp(self):
+        # Saving a submission queues its job
+        self.job = Submission.objects.create(camera_type='back', consent=True).processing_job
+
+    def test_claim_marks_job_running(self):
+        job = claim_next_job()
+        self.assertEqual(job.pk, self.job.pk)
+        self.assertEqual(job.status, ProcessingJob.STATUS_RUNNING)
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNotNone(job.locked_at)
+        self.assertIsNone(claim_next_job())
+
+    def test_claims_oldest_due_job_first(self):
+        older = Submission.objects.create(camera_type='front', consent=True).processing_job
+        ProcessingJob.objects.filter(pk=older.pk).update(run_after=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(claim_next_job().pk, older.pk)
+        self.assertEqual(claim_next_job().pk, self.job.pk)
+
+    def test_job_not_due_is_not_claimed(self):
+        ProcessingJob.objects.filter(pk=self.job.pk).update(run_after=timezone.now() + timedelta(minutes=1))
+        self.assertIsNone(claim_next_job())
+
+    def test_expired_lease_is_reclaimed(self):
+        claim_next_job()
+        self.assertIsNone(claim_next_job())
+        ProcessingJob.objects.filter(pk=self.job.pk).update(locked_at=timezone.now() - timedelta(seconds=601))
+        job = claim_next_job()
+        self.assertEqual(job.pk, self.job.pk)
+        self.assertEqual(job.attempts, 2)
+
+    def test_failure_schedules_retry_with_backoff(self):
+        job = claim_next_job()
+        with mock.patch('uploads.processing.process_submission', side_effect=OSError('storage unavailable')):
+            started = timezone.now()
+            self.assertFalse(run_job(job))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ProcessingJob.STATUS_PENDING)
+        self.assertIsNone(job.locked_at)
+        self.assertIn('storage unavailable', job.last_error)
+        self.assertGreaterEqual(job.run_after, started + timedelta(seconds=10))
+        self.assertIsNone(claim_next_job())
+
+    def test_failed_after_max_attempts(self):
+        with mock.patch('uploads.processing.process_submission', side_effect=OSError('storage unavailable')):
+            for _ in range(3):
+                ProcessingJob.objects.filter(pk=self.job.pk).update(run_after=timezone.now())
+                self.assertFalse(run_job(claim_next_job()))
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, ProcessingJob.STATUS_FAILED)
+        self.assertEqual(self.job.attempts, 3)
+        self.assertIsNone(claim_next_job())
+
+    def test_success_keeps_derivative_errors(self):
+        job = claim_next_job()
+        with mock.patch('uploads.processing.process_submission', return_value=['Derivative of left_eye_image failed']):
+            self.assertTrue(run_job(job))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ProcessingJob.STATUS_DONE)
+        self.assertEqual(job.last_error, 'Derivative of left_eye_image failed')
+
+    def test_retry_delay_doubles_up_to_cap(self):
+        self.assertEqual(
+            [retry_delay(attempts).total_seconds() for attempts in (1, 2, 3, 4)],
+            [10, 20, 30, 30],
+        )
+
+
+class DerivativeTests(TestCase):
+    """Normalized derivatives written by the processing worker"""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        overrides = override_settings(MEDIA_ROOT=media_root.name, DERIVATIVE_MAX_LONG_EDGE=1024)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_derivative_dimensions_are_stored(self):
+        submission = Submission(camera_type='back', consent=True)
+        submission.left_eye_image.save('IMG_4977.jpeg', ContentFile(SAMPLE_JPEG.read_bytes()), save=False)
+        submission.save()
+        self.assertEqual(process_pending_jobs(), (1, 0))
+
+        # 1685x1334 capped at a 1024px long edge
+        self.assertEqual(
+            list(ImageDerivative.objects.values_list('source_field', 'width', 'height')),
+            [('left_eye_image', 1024, 811)],
+        )
+        derivative = ImageDerivative.objects.get()
+        with derivative.image.open('rb') as image_file:
+            self.assertEqual(Image.open(image_file).size, (1024, 811))
+
+
+class ContentAddressedStorageTests(TestCase):
+    """One blob per unique content, whatever the upload's file name"""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        overrides = override_settings(MEDIA_ROOT=media_root.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.content = SAMPLE_JPEG.read_bytes()
+
+    def submit(self, filename):
+        submission = Submission(camera_type='back', consent=True)
+        submission.left_eye_image.save(filename, ContentFile(self.content), save=False)
+        submission.save()
+        return submission
+
+    def test_extension_spellings_share_one_blob(self):
+        first = self.submit('photo.JPG')
+        second = self.submit('photo.jpeg')
+        self.assertEqual(first.left_eye_image.name, second.left_eye_image.name)
+        self.assertTrue(first.left_eye_image.name.endswith('.jpg'))
+        self.assertEqual(StoredBlob.objects.get().ref_count, 2)
+
+    def test_find_duplicates_ignores_extension(self):
+        submission = self.submit('photo.jpeg')
+        self.assertEqual(list(find_duplicates(ContentFile(self.content, name='copy.JPG'))), [submission])
+
+        # A blob stored before names were canonical
+        legacy_name = sharded_name(file_digest(ContentFile(self.content))[:32], 'photo.jpeg')
+        Submission.objects.filter(pk=submission.pk).update(left_eye_image=legacy_name)
+        self.assertEqual(list(find_duplicates(ContentFile(self.content, name='copy.jpg'))), [submission])
@@ -0,0 +1,91 @@
+"""
+Upload handlers for the uploads app.
+
+ImageUploadGuardHandler runs before Django's memory/temporary-file handlers
+(see FILE_UPLOAD_HANDLERS in settings) and aborts the request while the
+upload is still streaming in, instead of after the whole body has been
+received and spooled to disk:
+
+- as soon as a file grows past UPLOAD_MAX_FILE_SIZE bytes;
+- when the first bytes of a file are not a JPEG, PNG or HEIC signature.
+
+The reason is stored in request.upload_errors ({field_name: message}) so
+the view can show it on the form.
+"""
+
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+
+# Bytes needed to recognise any of the signatures below
+SNIFF_BYTES = 12
+
+# ISO BMFF brands used by HEIC/HEIF photos (bytes 8-12 of the 'ftyp' box)
+HEIC_BRANDS = {b'heic', b'heix', b'heim', b'heis', b'hevc', b'hevx', b'mif1', b'msf1'}
+
+
+def sniff_image_type(header):
+    """Return 'jpeg', 'png' or 'heic' from the first bytes of a file, or None"""
+    if header.startswith(b'\xff\xd8\xff'):
+        return 'jpeg'
+    if header.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if header[4:8] == b'ftyp' and header[8:12] in HEIC_BRANDS:
+        return 'heic'
+    return None
+
+
+class ImageUploadGuardHandler(FileUploadHandler):
+    """
+    Reject oversized or non-image files while their chunks arrive.
+    Passes every chunk on unchanged to the next handler.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_size = getattr(settings, 'UPLOAD_MAX_FILE_SIZE', 10 * 1024 * 1024)
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None,
+                 content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        self.received = 0
+        self.header = b''
+        if content_length is not None and content_length > self.max_size:
+            self._reject(self._size_message())
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            self._reject(self._size_message())
+
+        if self.header is not None:
+            self.header += raw_data[:SNIFF_BYTES - len(self.header)]
+            if len(self.header) >= SNIFF_BYTES:
+                self._check_header()
+        return raw_data
+
+    def file_complete(self, file_size):
+        # Files shorter than SNIFF_BYTES are checked on whatever arrived
+        if self.header is not None:
+            self._check_header()
+        return None
+
+    def _check_header(self):
+        if sniff_image_type(self.header) is None:
+            self._reject(
+                f'"{self.file_name}" is not a JPEG, PNG or HEIC image. '
+                'Please choose a photo file.'
+            )
+        self.header = None
+
+    def _size_message(self):
+        return (
+            f'"{self.file_name}" exceeds the maximum upload size of '
+            f'{self.max_size // (1024 * 1024)}MB.'
+        )
+
+    def _reject(self, message):
+        if self.request is not None:
+            if not hasattr(self.request, 'upload_errors'):
+                self.request.upload_errors = {}
+            self.request.upload_errors[self.field_name] = message
+        raise StopUpload(connection_reset=True)
@@ -6,4 +6,15 @@ app_name = 'uploads'
 urlpatterns = [
     path('', views.upload_form, name='upload_form'),
     path('success/', views.upload_success, name='upload_success'),
+
+    # Resumable (tus-style) uploads
+    path('api/resumable/', views.resumable_create, name='resumable_create'),
+    path('api/resumable/finalize/', views.resumable_finalize, name='resumable_finalize'),
+    path('api/resumable/<uuid:upload_id>/', views.resumable_upload, name='resumable_upload'),
+
+    # Draft submissions (one request per image)
+    path('api/drafts/', views.draft_create, name='draft_create'),
+    path('api/drafts/<uuid:draft_id>/', views.draft_detail, name='draft_detail'),
+    path('api/drafts/<uuid:draft_id>/images/<str:field_name>/', views.draft_image, name='draft_image'),
+    path('api/drafts/<uuid:draft_id>/commit/', views.draft_commit, name='draft_commit'),
 ]
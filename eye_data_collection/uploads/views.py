@@ -1,7 +1,25 @@
-from django.shortcuts import render, redirect
+import base64
+import binascii
+import os
+
+from django.conf import settings
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse
+from django.urls import reverse
+from django.utils import timezone
 from django.views.decorators.http import require_http_methods
 from .forms import SubmissionForm
+from .models import DraftSubmission, ResumableUpload
+from .upload_handlers import SNIFF_BYTES, sniff_image_type
+
+TUS_VERSION = '1.0.0'
+
+# Form fields that can be filled from a finished resumable upload
+RESUMABLE_FILE_FIELDS = ('left_eye_image', 'right_eye_image', 'camera_specs_image')
 
 
 def upload_form(request):
@@ -10,7 +28,9 @@ def upload_form(request):
     """
     if request.method == 'POST':
         form = SubmissionForm(request.POST, request.FILES)
-        if form.is_valid():
+        # Files rejected while streaming in by ImageUploadGuardHandler
+        upload_errors = getattr(request, 'upload_errors', {})
+        if form.is_valid() and not upload_errors:
             # Save the submission with IP address
             submission = form.save(commit=False)
             submission.ip_address = get_client_ip(request)
@@ -20,7 +40,17 @@ def upload_form(request):
                 request,
                 'Your images have been successfully uploaded! Thank you for your contribution.'
             )
+            if getattr(form, 'duplicates', None):
+                messages.info(
+                    request,
+                    'We already had an identical copy of some of these images, so they were not stored twice.'
+                )
             return redirect('uploads:upload_success')
+        if upload_errors:
+            # The rest of the request was never read, so only report why it was cut off
+            form.errors.clear()
+            for field_name, error in upload_errors.items():
+                form.errors[field_name] = form.error_class([error])
     else:
         form = SubmissionForm()
     
@@ -44,3 +74,277 @@ def get_client_ip(request):
     else:
         ip = request.META.get('REMOTE_ADDR')
     return ip
+
+
+# ============================================================================
+# Resumable (tus-style) uploads
+#
+# POST   api/resumable/            create an upload (Upload-Length, Upload-Metadata)
+# HEAD   api/resumable/<id>/       current Upload-Offset
+# PATCH  api/resumable/<id>/       write bytes at Upload-Offset
+# DELETE api/resumable/<id>/       abandon the upload
+# POST   api/resumable/finalize/   attach finished uploads to a new Submission
+# ============================================================================
+
+def _tus_response(status, **headers):
+    response = HttpResponse(status=status)
+    response['Tus-Resumable'] = TUS_VERSION
+    for name, value in headers.items():
+        response[name.replace('_', '-')] = str(value)
+    return response
+
+
+def _parse_upload_metadata(header):
+    """Decode a tus Upload-Metadata header ('key base64value,key2 base64value2')"""
+    metadata = {}
+    for pair in filter(None, (item.strip() for item in header.split(','))):
+        key, _, value = pair.partition(' ')
+        try:
+            metadata[key] = base64.b64decode(value).decode('utf-8') if value else ''
+        except (binascii.Error, UnicodeDecodeError):
+            metadata[key] = ''
+    return metadata
+
+
+@require_http_methods(['POST'])
+def resumable_create(request):
+    """
+    Create a resumable upload for one image.
+    The client sends Upload-Length and Upload-Metadata (filename, filetype).
+    """
+    try:
+        length = int(request.headers.get('Upload-Length', ''))
+    except ValueError:
+        return _tus_response(400)
+    if length <= 0:
+        return _tus_response(400)
+    if length > settings.UPLOAD_MAX_FILE_SIZE:
+        return _tus_response(413, Tus_Max_Size=settings.UPLOAD_MAX_FILE_SIZE)
+
+    metadata = _parse_upload_metadata(request.headers.get('Upload-Metadata', ''))
+    upload = ResumableUpload.objects.create(
+        filename=os.path.basename(metadata.get('filename', '')) or 'upload',
+        content_type=metadata.get('filetype', '')[:100],
+        length=length,
+    )
+    upload.create_file()
+
+    location = request.build_absolute_uri(reverse('uploads:resumable_upload', args=[upload.id]))
+    return _tus_response(201, Location=location, Upload_Offset=0)
+
+
+@require_http_methods(['HEAD', 'PATCH', 'DELETE'])
+def resumable_upload(request, upload_id):
+    """Report the offset of, write a chunk to, or delete a resumable upload"""
+    upload = get_object_or_404(ResumableUpload, pk=upload_id)
+
+    if request.method == 'HEAD':
+        return _tus_response(200, Upload_Offset=upload.offset, Upload_Length=upload.length,
+                             Cache_Control='no-store')
+
+    if request.method == 'DELETE':
+        upload.delete_file()
+        upload.delete()
+        return _tus_response(204)
+
+    if request.content_type != 'application/offset+octet-stream':
+        return _tus_response(415)
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return _tus_response(400)
+    if offset != upload.offset:
+        return _tus_response(409, Upload_Offset=upload.offset)
+    if offset + int(request.headers.get('Content-Length') or 0) > upload.length:
+        return _tus_response(413)
+
+    try:
+        new_offset = upload.write_chunk(request, offset)
+    except ValueError:
+        return _tus_response(413)
+
+    # Reject non-images as soon as the signature bytes are in
+    if offset < SNIFF_BYTES and (new_offset >= SNIFF_BYTES or new_offset == upload.length):
+        if sniff_image_type(upload.read_header(SNIFF_BYTES)) is None:
+            upload.delete_file()
+            upload.delete()
+            return _tus_response(415)
+
+    # Only advance if no concurrent PATCH got there first; if one did, this
+    # chunk's bytes do not count and the client must resume from the stored offset
+    advanced = ResumableUpload.objects.filter(pk=upload.pk, offset=offset).update(
+        offset=new_offset, updated_at=timezone.now()
+    )
+    if not advanced:
+        upload.refresh_from_db(fields=['offset'])
+        return _tus_response(409, Upload_Offset=upload.offset)
+    return _tus_response(204, Upload_Offset=new_offset)
+
+
+@require_http_methods(['POST'])
+def resumable_finalize(request):
+    """
+    Create a Submission from finished resumable uploads.
+    POST fields: left_eye_image, right_eye_image and camera_specs_image hold
+    upload ids; camera_type and consent as in the upload form. The files go
+    through the same SubmissionForm validation as a regular upload.
+    """
+    uploads = {}
+    errors = {}
+    for field_name in RESUMABLE_FILE_FIELDS:
+        upload_id = request.POST.get(field_name)
+        try:
+            upload = ResumableUpload.objects.filter(pk=upload_id).first() if upload_id else None
+        except ValidationError:
+            upload = None
+        if upload is None:
+            errors[field_name] = ['Unknown upload id.']
+        elif not upload.is_complete:
+            errors[field_name] = [f'Upload is incomplete ({upload.offset} of {upload.length} bytes).']
+        else:
+            uploads[field_name] = upload
+    if errors:
+        return JsonResponse({'errors': errors}, status=409)
+
+    files = {
+        field_name: UploadedFile(
+            file=open(upload.path, 'rb'),
+            name=upload.filename,
+            content_type=upload.content_type,
+            size=upload.length,
+        )
+        for field_name, upload in uploads.items()
+    }
+    submission, form = _submit_files(
+        request, files,
+        ResumableUpload.objects.filter(pk__in=[upload.pk for upload in uploads.values()]).delete,
+    )
+    if submission is None:
+        return JsonResponse({'errors': form.errors.get_json_data()}, status=400)
+
+    for upload in uploads.values():
+        upload.delete_file()
+    return _submission_created(submission)
+
+
+def _submit_files(request, files, on_success=None):
+    """
+    Validate request.POST and files with SubmissionForm and save the Submission.
+    on_success runs in the same transaction (e.g. to delete the staging rows).
+    Returns (submission or None, form); the files are closed afterwards.
+    """
+    try:
+        form = SubmissionForm(request.POST, files)
+        if not form.is_valid():
+            return None, form
+
+        with transaction.atomic():
+            submission = form.save(commit=False)
+            submission.ip_address = get_client_ip(request)
+            submission.save()
+            if on_success is not None:
+                on_success()
+        return submission, form
+    finally:
+        for uploaded_file in files.values():
+            uploaded_file.close()
+
+
+def _submission_created(submission):
+    return JsonResponse({
+        'submission_id': submission.id,
+        'redirect': reverse('uploads:upload_success'),
+    }, status=201)
+
+
+# ============================================================================
+# Draft submissions: one request per image
+#
+# POST   api/drafts/                     create a draft
+# GET    api/drafts/<id>/                images uploaded so far
+# POST   api/drafts/<id>/images/<field>/ upload one image (multipart field 'image')
+# POST   api/drafts/<id>/commit/         camera_type + consent; creates the Submission
+# ============================================================================
+
+def _draft_status(draft):
+    return {
+        'draft_id': str(draft.id),
+        'images': draft.images(),
+        'upload_urls': {
+            field_name: reverse('uploads:draft_image', args=[draft.id, field_name])
+            for field_name in DraftSubmission.IMAGE_FIELDS
+        },
+        'commit_url': reverse('uploads:draft_commit', args=[draft.id]),
+    }
+
+
+@require_http_methods(['POST'])
+def draft_create(request):
+    """Start a draft submission"""
+    draft = DraftSubmission.objects.create()
+    return JsonResponse(_draft_status(draft), status=201)
+
+
+@require_http_methods(['GET'])
+def draft_detail(request, draft_id):
+    """Show which images of a draft have been uploaded"""
+    draft = get_object_or_404(DraftSubmission, pk=draft_id)
+    return JsonResponse(_draft_status(draft))
+
+
+@require_http_methods(['POST'])
+def draft_image(request, draft_id, field_name):
+    """
+    Upload one image of a draft. The image is checked with the same field
+    validation as SubmissionForm (type, size, quality gate) before it is kept.
+    """
+    if field_name not in DraftSubmission.IMAGE_FIELDS:
+        return JsonResponse({'errors': {field_name: ['Unknown image field.']}}, status=404)
+    draft = get_object_or_404(DraftSubmission, pk=draft_id)
+
+    # Files rejected while streaming in by ImageUploadGuardHandler
+    upload_errors = getattr(request, 'upload_errors', {})
+    if upload_errors:
+        return JsonResponse({'errors': {field_name: list(upload_errors.values())}}, status=400)
+
+    image = request.FILES.get('image')
+    if image is None:
+        return JsonResponse({'errors': {field_name: ['No image was uploaded.']}}, status=400)
+
+    form = SubmissionForm(files={field_name: image})
+    form.is_valid()
+    if field_name in form.errors:
+        return JsonResponse({'errors': {field_name: list(form.errors[field_name])}}, status=400)
+
+    previous = getattr(draft, field_name)
+    previous_name = previous.name if previous else None
+    getattr(draft, field_name).save(image.name, image, save=False)
+    # Only write this column so concurrent uploads of the other images are not overwritten
+    draft.save(update_fields=[field_name, 'updated_at'])
+    if previous_name and previous_name != getattr(draft, field_name).name:
+        previous.storage.delete(previous_name)
+
+    return JsonResponse(_draft_status(draft))
+
+
+@require_http_methods(['POST'])
+def draft_commit(request, draft_id):
+    """Create the Submission from a draft's images plus camera_type and consent"""
+    draft = get_object_or_404(DraftSubmission, pk=draft_id)
+
+    files = {}
+    for field_name in DraftSubmission.IMAGE_FIELDS:
+        field = getattr(draft, field_name)
+        if field:
+            files[field_name] = UploadedFile(
+                file=field.storage.open(field.name, 'rb'),
+                name=os.path.basename(field.name),
+                size=field.size,
+            )
+
+    submission, form = _submit_files(request, files, draft.delete)
+    if submission is None:
+        return JsonResponse({'errors': form.errors.get_json_data()}, status=400)
+
+    draft.delete_files()
+    return _submission_created(submission)
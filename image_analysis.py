@@ -1,190 +1,1210 @@
 import os
 import json
-from PIL import Image
+import argparse
+import csv
+import sqlite3
+import time
+import re
+from PIL import Image, ImageOps
 from PIL.ExifTags import TAGS
 import pandas as pd
 from datetime import datetime
 import numpy as np
+from exif_header import read_exif_header
+from collections import Counter, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields
 
-def extract_exif_data(image_path):
-    """Extract EXIF metadata from an image"""
+BASE_DIR = r"C:\Users\User2\Desktop\Nicole"
+LEFT_EYE_SUBDIRS = (
+    "Upload Image of Your Left Eye (Taken with your smartphone)  Untitled Question (File responses)-20251215T225135Z-3-001",
+    "Upload Image of Your Left Eye (Taken with your smartphone)  Untitled Question (File responses)",
+)
+RIGHT_EYE_SUBDIRS = (
+    "Upload Image of Your Right Eye (Taken with your smartphone) (File responses)-20251215T225137Z-3-001",
+    "Upload Image of Your Right Eye (Taken with your smartphone) (File responses)",
+)
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+CACHE_FILENAME = 'phase_a_analysis_cache.sqlite3'
+# Bump whenever extract_exif_data or calculate_image_quality_metrics change
+# their output, so cached rows computed by the old code are discarded.
+METRICS_VERSION = 1
+# Default long edge (pixels) that fast mode decodes to; see fast_mode_calibration.md
+FAST_WORKING_SIZE = 768
+# Images at or above this size are scored band-by-band (see tiled_gray_statistics)
+TILED_MIN_MEGAPIXELS = 24
+TILE_BAND_ROWS = 256
+# Phase A quality checks (flagged in visualize_data.py's quality concerns)
+MIN_MEGAPIXELS = 2
+MIN_SHARPNESS = 40
+MIN_BRIGHTNESS = 100
+# Fast-mode sharpness divided by the full-resolution score, by decode scale
+# (fast_mode_calibration.md, plus 1/8 measured on IMG_4977.jpeg)
+SHARPNESS_SCALE_RATIOS = {1: 1.0, 2: 1.5, 4: 2.5, 8: 2.75}
+# (width, height) every image is normalized to by BatchQualityEngine
+BATCH_WORKING_SIZE = (512, 384)
+LUMA_WEIGHTS = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+# Registry of named quality metrics, filled by @quality_metric
+QualityMetric = namedtuple('QualityMetric', ['name', 'requires', 'compute'])
+QUALITY_METRICS = {}
+# Inputs a metric can declare, cheapest first: header fields, file stat,
+# EXIF tags, decoded pixels, grey-level frame
+METRIC_STAGES = ('header', 'stat', 'exif', 'pixels', 'gray')
+DEFAULT_QUALITY_METRICS = (
+    'resolution', 'megapixels', 'aspect_ratio', 'file_size_kb', 'brightness', 'sharpness_score',
+)
+RESULT_COLUMNS = [
+    'participant_id', 'eye_side', 'filename', 'filepath', 'width', 'height',
+    'resolution', 'megapixels', 'file_size_kb', 'brightness', 'sharpness_score',
+    'camera_make', 'camera_model', 'datetime', 'flash', 'focal_length', 'iso',
+    'exposure_time',
+]
+NUMERIC_COLUMNS = (
+    'width', 'height', 'megapixels', 'file_size_kb', 'brightness', 'sharpness_score',
+)
+# Column types of the typed (Parquet) tracking output and of load_tracking_data()
+RESULT_TYPES = {
+    'participant_id': 'string',
+    'eye_side': 'category',
+    'filename': 'string',
+    'filepath': 'string',
+    'width': 'int32',
+    'height': 'int32',
+    'resolution': 'string',
+    'megapixels': 'float64',
+    'file_size_kb': 'float64',
+    'brightness': 'float64',
+    'sharpness_score': 'float64',
+    'camera_make': 'category',
+    'camera_model': 'category',
+    'datetime': 'datetime',
+    'flash': 'int16',
+    'focal_length': 'float64',
+    'iso': 'int32',
+    'exposure_time': 'float64',
+}
+EXIF_DATETIME_FORMAT = '%Y:%m:%d %H:%M:%S'
+
+class ImageContext:
+    """
+    An image opened once and shared by every extractor.
+
+    The file is stat'ed and its header parsed on construction; EXIF tags and
+    the decoded pixel buffer are read lazily on first use and cached, so one
+    context reads and decodes its image at most once.
+
+    With working_size set ("fast" mode) the pixels are decoded at reduced
+    resolution: JPEGs are scaled in the DCT domain via Image.draft and any
+    remaining excess is removed with Image.reduce, giving a long edge of at
+    least working_size. width/height always report the original header size;
+    decode_scale is the original-to-decoded size ratio.
+
+    tiled=True scores brightness/sharpness band-by-band with bounded memory
+    (tiled_gray_statistics); the default (None) does so for full-resolution
+    decodes of TILED_MIN_MEGAPIXELS or more.
+    """
+
+    def __init__(self, image_path, working_size=None, tiled=None):
+        self.path = image_path
+        self.working_size = working_size
+        self.tiled = tiled
+        self.stat = os.stat(image_path)
+        self.image = Image.open(image_path)
+        self.width, self.height = self.image.size
+        self._exif = None
+        self._decoded = None
+        self._pixels = None
+        self._gray = None
+        self._gray_statistics = None
+        self._prepared = {'header', 'stat'}
+
+    @property
+    def format(self):
+        return self.image.format
+
+    @property
+    def mode(self):
+        return self.image.mode
+
+    @property
+    def file_size(self):
+        return self.stat.st_size
+
+    @property
+    def exif(self):
+        """Raw EXIF tags as {tag_id: value}, empty when the image has none"""
+        if self._exif is None:
+            getexif = getattr(self.image, '_getexif', None)
+            self._exif = (getexif() if getexif else None) or {}
+        return self._exif
+
+    def decoded_image(self):
+        """The loaded PIL image, decoded at reduced resolution in fast mode"""
+        if self._decoded is None:
+            image = self.image
+            if self.working_size:
+                image = self._reduce(image)
+            image.load()
+            self._decoded = image
+        return self._decoded
+
+    @property
+    def pixels(self):
+        """Decoded pixel buffer as a NumPy array"""
+        if self._pixels is None:
+            self._pixels = np.array(self.decoded_image())
+        return self._pixels
+
+    @property
+    def use_tiled(self):
+        if self.tiled is not None:
+            return self.tiled
+        return not self.working_size and self.width * self.height >= TILED_MIN_MEGAPIXELS * 1_000_000
+
+    @property
+    def gray(self):
+        """Grey-level frame (channel mean of pixels) used for sharpness"""
+        if self._gray is None:
+            pixels = self.pixels
+            self._gray = np.mean(pixels, axis=2) if pixels.ndim == 3 else pixels
+        return self._gray
+
+    def gray_statistics(self):
+        """(brightness, laplacian_variance) from tiled_gray_statistics, cached"""
+        if self._gray_statistics is None:
+            self._gray_statistics = tiled_gray_statistics(self.decoded_image())
+        return self._gray_statistics
+
+    def prepare(self, stage):
+        """
+        Materialize a decode stage (see METRIC_STAGES) ahead of the metrics
+        that need it. Returns True if work was done, False if already cached.
+        """
+        if stage in self._prepared:
+            return False
+        if stage == 'exif':
+            self.exif
+        elif self.use_tiled:
+            self.gray_statistics()
+        elif stage == 'pixels':
+            self.pixels
+        elif stage == 'gray':
+            self.gray
+        self._prepared.add(stage)
+        return True
+
+    @property
+    def decode_scale(self):
+        """How many original pixels span one decoded pixel along the long edge"""
+        return max(self.width, self.height) / max(self.decoded_image().size)
+
+    def _reduce(self, image):
+        """Return a reduced-resolution version of image close to working_size"""
+        long_edge = max(self.width, self.height)
+        if long_edge <= self.working_size:
+            return image
+        ratio = self.working_size / long_edge
+        # draft() picks the smallest DCT scale (1/2, 1/4, 1/8) that still covers
+        # the requested size; it is a no-op for formats other than JPEG
+        image.draft(image.mode, (round(self.width * ratio), round(self.height * ratio)))
+        factor = max(image.size) // self.working_size
+        if factor > 1:
+            image = image.reduce(factor)
+        return image
+
+    def close(self):
+        if self._decoded is not None and self._decoded is not self.image:
+            self._decoded.close()
+        self.image.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def _band_to_gray(band):
+    """Average a uint8 band over its channels into a float32 grey band"""
+    if band.ndim == 3:
+        return band.mean(axis=2, dtype=np.float32)
+    return band.astype(np.float32)
+
+def tiled_gray_statistics(image, band_rows=TILE_BAND_ROWS):
+    """
+    Compute (brightness, laplacian_variance) of a PIL image in row bands.
+
+    Each band is cropped with a one-row halo above and below, so the
+    Laplacian matches scipy.ndimage.laplace over the whole frame (including
+    its 'reflect' borders). Working buffers are uint8/float32 and one band
+    tall; means and variances are merged across bands with Chan's parallel
+    form of Welford's algorithm. Peak memory is the decoded uint8 image plus
+    a few band-sized buffers instead of several float64 full frames.
+    """
+    width, height = image.size
+    brightness_mean = 0.0
+    count = 0
+    lap_mean = 0.0
+    lap_m2 = 0.0
+
+    for top in range(0, height, band_rows):
+        bottom = min(top + band_rows, height)
+        crop_top = max(top - 1, 0)
+        crop_bottom = min(bottom + 1, height)
+        gray = _band_to_gray(np.asarray(image.crop((0, crop_top, width, crop_bottom))))
+
+        # Rows that belong to this band (the rest is halo)
+        core = gray[top - crop_top:top - crop_top + (bottom - top)]
+
+        # Reflect at the image borders, as ndimage.laplace does
+        if top == 0:
+            gray = np.concatenate([gray[:1], gray])
+        if bottom == height:
+            gray = np.concatenate([gray, gray[-1:]])
+        gray = np.pad(gray, ((0, 0), (1, 1)), mode='symmetric')
+
+        lap = gray[:-2, 1:-1] + gray[2:, 1:-1] + gray[1:-1, :-2] + gray[1:-1, 2:]
+        lap -= 4 * gray[1:-1, 1:-1]
+
+        band_count = core.size
+        new_count = count + band_count
+
+        band_brightness = float(core.mean(dtype=np.float64))
+        brightness_mean += (band_brightness - brightness_mean) * band_count / new_count
+
+        band_mean = float(lap.mean(dtype=np.float64))
+        lap -= band_mean
+        band_m2 = float(np.square(lap).sum(dtype=np.float64))
+        delta = band_mean - lap_mean
+        lap_mean += delta * band_count / new_count
+        lap_m2 += band_m2 + delta * delta * count * band_count / new_count
+
+        count = new_count
+
+    return brightness_mean, lap_m2 / count
+
+def _open_context(image):
+    """Return (context, owned) for an image path or an existing ImageContext"""
+    if isinstance(image, ImageContext):
+        return image, False
+    return ImageContext(image), True
+
+def extract_exif_data(image_path, header_only=False):
+    """
+    Extract EXIF metadata from an image path or ImageContext.
+
+    header_only=True reads just the container header with read_exif_header()
+    and decodes only the tags the tracking spreadsheet uses.
+    """
+    if header_only:
+        path = image_path.path if isinstance(image_path, ImageContext) else image_path
+        return read_exif_header(path)
+
+    context = None
+    owned = False
     try:
-        image = Image.open(image_path)
+        context, owned = _open_context(image_path)
         exif_data = {}
 
         # Get EXIF data if available
-        exif = image._getexif()
-        if exif:
-            for tag_id, value in exif.items():
-                tag = TAGS.get(tag_id, tag_id)
-                exif_data[tag] = str(value)
+        for tag_id, value in context.exif.items():
+            tag = TAGS.get(tag_id, tag_id)
+            exif_data[tag] = str(value)
 
         # Basic image properties
-        exif_data['Width'] = image.width
-        exif_data['Height'] = image.height
-        exif_data['Format'] = image.format
-        exif_data['Mode'] = image.mode
+        exif_data['Width'] = context.width
+        exif_data['Height'] = context.height
+        exif_data['Format'] = context.format
+        exif_data['Mode'] = context.mode
 
         return exif_data
     except Exception as e:
         return {'Error': str(e)}
+    finally:
+        if owned:
+            context.close()
 
-def calculate_image_quality_metrics(image_path):
-    """Calculate basic quality metrics for an image"""
-    try:
-        image = Image.open(image_path)
-        img_array = np.array(image)
-
-        metrics = {
-            'resolution': f"{image.width}x{image.height}",
-            'megapixels': round((image.width * image.height) / 1_000_000, 2),
-            'aspect_ratio': round(image.width / image.height, 2),
-            'file_size_kb': round(os.path.getsize(image_path) / 1024, 2),
-        }
+def quality_metric(name, requires):
+    """Register func(context) as the quality metric `name`, computed from stage `requires`"""
+    if requires not in METRIC_STAGES:
+        raise ValueError(f"Unknown metric stage: {requires}")
+
+    def register(func):
+        QUALITY_METRICS[name] = QualityMetric(name, requires, func)
+        return func
+    return register
+
+@quality_metric('resolution', requires='header')
+def _metric_resolution(context):
+    return f"{context.width}x{context.height}"
+
+@quality_metric('megapixels', requires='header')
+def _metric_megapixels(context):
+    return round((context.width * context.height) / 1_000_000, 2)
+
+@quality_metric('aspect_ratio', requires='header')
+def _metric_aspect_ratio(context):
+    return round(context.width / context.height, 2)
+
+@quality_metric('file_size_kb', requires='stat')
+def _metric_file_size_kb(context):
+    return round(context.file_size / 1024, 2)
+
+@quality_metric('brightness', requires='pixels')
+def _metric_brightness(context):
+    """Mean pixel intensity over all channels"""
+    if context.use_tiled:
+        return round(context.gray_statistics()[0], 2)
+    return round(np.mean(context.pixels), 2)
+
+@quality_metric('sharpness_score', requires='gray')
+def _metric_sharpness_score(context):
+    """Laplacian variance of the grey-level frame"""
+    if context.use_tiled:
+        return round(context.gray_statistics()[1], 2)
+    from scipy import ndimage
+    return round(ndimage.laplace(context.gray).var(), 2)
+
+def calculate_image_quality_metrics(image_path, working_size=None, tiled=None, metrics=None,
+                                    timings=None):
+    """
+    Calculate basic quality metrics for an image path or ImageContext.
+
+    metrics selects a subset of QUALITY_METRICS (default:
+    DEFAULT_QUALITY_METRICS). Only the decode stages those metrics declare are
+    run, so header/stat metrics such as megapixels or file_size_kb never
+    decode pixels. If a timings dict is given, seconds spent per metric and
+    per decode stage ('decode:pixels', ...) are added to it.
 
-        # Calculate brightness (mean pixel intensity)
-        if len(img_array.shape) == 3:  # Color image
-            brightness = np.mean(img_array)
-        else:  # Grayscale
-            brightness = np.mean(img_array)
-        metrics['brightness'] = round(brightness, 2)
-
-        # Calculate sharpness approximation (Laplacian variance)
-        from scipy import ndimage
-        if len(img_array.shape) == 3:
-            gray = np.mean(img_array, axis=2)
+    Passing working_size (or a context created with one) computes brightness
+    and sharpness on a reduced-resolution decode and adds a 'decode_scale'
+    entry; see fast_mode_calibration.md for how those values compare.
+    tiled is passed on to ImageContext.
+    """
+    names = list(DEFAULT_QUALITY_METRICS if metrics is None else metrics)
+    unknown = [name for name in names if name not in QUALITY_METRICS]
+    if unknown:
+        raise ValueError(f"Unknown quality metric(s): {', '.join(unknown)}")
+    if timings is None:
+        timings = {}
+
+    context = None
+    owned = False
+    try:
+        if isinstance(image_path, ImageContext):
+            context = image_path
+            if tiled is not None:
+                context.tiled = tiled
         else:
-            gray = img_array
-        laplacian_var = ndimage.laplace(gray).var()
-        metrics['sharpness_score'] = round(laplacian_var, 2)
+            context = ImageContext(image_path, working_size=working_size, tiled=tiled)
+            owned = True
+
+        results = {}
+        decoded = False
+        for name in names:
+            metric = QUALITY_METRICS[name]
+
+            started = time.perf_counter()
+            if context.prepare(metric.requires):
+                stage_key = f'decode:{metric.requires}'
+                timings[stage_key] = timings.get(stage_key, 0.0) + time.perf_counter() - started
+
+            started = time.perf_counter()
+            results[name] = metric.compute(context)
+            timings[name] = timings.get(name, 0.0) + time.perf_counter() - started
+            decoded = decoded or metric.requires in ('pixels', 'gray')
 
-        return metrics
+        if decoded and context.working_size:
+            results['decode_scale'] = round(context.decode_scale, 3)
+
+        return results
     except Exception as e:
         return {'Error': str(e)}
+    finally:
+        if owned:
+            context.close()
 
-def analyze_eye_images():
-    """Analyze all eye images and create tracking spreadsheet"""
+def profile_quality_metrics(image_paths, metrics=None, working_size=None):
+    """Total seconds spent per quality metric and decode stage over image_paths, slowest first"""
+    timings = {}
+    for image_path in image_paths:
+        calculate_image_quality_metrics(image_path, working_size=working_size, metrics=metrics,
+                                        timings=timings)
+    return pd.Series(timings, name='seconds', dtype=float).sort_values(ascending=False)
 
-    base_dir = r"C:\Users\User2\Desktop\Nicole"
+@dataclass
+class BatchQualityResult:
+    """Column-oriented quality metrics for a batch of images, one array per field"""
+    filepath: np.ndarray
+    width: np.ndarray
+    height: np.ndarray
+    megapixels: np.ndarray
+    brightness: np.ndarray
+    sharpness_score: np.ndarray
+    low_resolution: np.ndarray
+    low_sharpness: np.ndarray
+    dark: np.ndarray
+    error: np.ndarray
 
-    # Define paths
-    left_eye_dir = os.path.join(base_dir, "Upload Image of Your Left Eye (Taken with your smartphone)  Untitled Question (File responses)-20251215T225135Z-3-001",
-                                "Upload Image of Your Left Eye (Taken with your smartphone)  Untitled Question (File responses)")
-    right_eye_dir = os.path.join(base_dir, "Upload Image of Your Right Eye (Taken with your smartphone) (File responses)-20251215T225137Z-3-001",
-                                 "Upload Image of Your Right Eye (Taken with your smartphone) (File responses)")
-
-    results = []
-
-    # Process left eye images
-    if os.path.exists(left_eye_dir):
-        for filename in os.listdir(left_eye_dir):
-            if filename.lower().endswith(('.jpg', '.jpeg', '.png')):
-                filepath = os.path.join(left_eye_dir, filename)
-                print(f"Processing left eye: {filename}")
-
-                exif = extract_exif_data(filepath)
-                quality = calculate_image_quality_metrics(filepath)
-
-                result = {
-                    'participant_id': filename.split('.')[0],
-                    'eye_side': 'LEFT',
-                    'filename': filename,
-                    'filepath': filepath,
-                    'width': exif.get('Width', 'N/A'),
-                    'height': exif.get('Height', 'N/A'),
-                    'resolution': quality.get('resolution', 'N/A'),
-                    'megapixels': quality.get('megapixels', 'N/A'),
-                    'file_size_kb': quality.get('file_size_kb', 'N/A'),
-                    'brightness': quality.get('brightness', 'N/A'),
-                    'sharpness_score': quality.get('sharpness_score', 'N/A'),
-                    'camera_make': exif.get('Make', 'N/A'),
-                    'camera_model': exif.get('Model', 'N/A'),
-                    'datetime': exif.get('DateTime', 'N/A'),
-                    'flash': exif.get('Flash', 'N/A'),
-                    'focal_length': exif.get('FocalLength', 'N/A'),
-                    'iso': exif.get('ISOSpeedRatings', 'N/A'),
-                    'exposure_time': exif.get('ExposureTime', 'N/A'),
-                }
-                results.append(result)
-
-    # Process right eye images
-    if os.path.exists(right_eye_dir):
-        for filename in os.listdir(right_eye_dir):
-            if filename.lower().endswith(('.jpg', '.jpeg', '.png')):
-                filepath = os.path.join(right_eye_dir, filename)
-                print(f"Processing right eye: {filename}")
-
-                exif = extract_exif_data(filepath)
-                quality = calculate_image_quality_metrics(filepath)
-
-                result = {
-                    'participant_id': filename.split('.')[0],
-                    'eye_side': 'RIGHT',
-                    'filename': filename,
-                    'filepath': filepath,
-                    'width': exif.get('Width', 'N/A'),
-                    'height': exif.get('Height', 'N/A'),
-                    'resolution': quality.get('resolution', 'N/A'),
-                    'megapixels': quality.get('megapixels', 'N/A'),
-                    'file_size_kb': quality.get('file_size_kb', 'N/A'),
-                    'brightness': quality.get('brightness', 'N/A'),
-                    'sharpness_score': quality.get('sharpness_score', 'N/A'),
-                    'camera_make': exif.get('Make', 'N/A'),
-                    'camera_model': exif.get('Model', 'N/A'),
-                    'datetime': exif.get('DateTime', 'N/A'),
-                    'flash': exif.get('Flash', 'N/A'),
-                    'focal_length': exif.get('FocalLength', 'N/A'),
-                    'iso': exif.get('ISOSpeedRatings', 'N/A'),
-                    'exposure_time': exif.get('ExposureTime', 'N/A'),
-                }
-                results.append(result)
-
-    # Create DataFrame
-    df = pd.DataFrame(results)
-
-    # Save to CSV
-    output_csv = os.path.join(base_dir, 'phase_a_image_tracking.csv')
-    df.to_csv(output_csv, index=False)
-    print(f"\nTracking spreadsheet saved to: {output_csv}")
-
-    # Generate summary statistics
-    print("\n" + "="*60)
-    print("PHASE A - IMAGE ANALYSIS SUMMARY")
-    print("="*60)
-    print(f"Total images analyzed: {len(df)}")
-    print(f"Left eye images: {len(df[df['eye_side'] == 'LEFT'])}")
-    print(f"Right eye images: {len(df[df['eye_side'] == 'RIGHT'])}")
-    print(f"\nUnique camera models detected: {df['camera_model'].nunique()}")
-    print(f"Camera models: {df['camera_model'].unique()}")
-
-    print("\n" + "-"*60)
-    print("IMAGE QUALITY METRICS")
-    print("-"*60)
-
-    # Filter numeric columns for statistics
-    numeric_df = df.select_dtypes(include=[np.number])
-    if not numeric_df.empty:
-        print(f"Average resolution: {df['megapixels'].mean():.2f} MP")
-        print(f"Resolution range: {df['megapixels'].min():.2f} - {df['megapixels'].max():.2f} MP")
-        print(f"Average file size: {df['file_size_kb'].mean():.2f} KB")
-        print(f"Average brightness: {df['brightness'].mean():.2f}")
-        print(f"Average sharpness: {df['sharpness_score'].mean():.2f}")
+    def __len__(self):
+        return len(self.filepath)
+
+    def to_dataframe(self):
+        return pd.DataFrame({field.name: getattr(self, field.name) for field in fields(self)})
+
+def sharpness_threshold(min_sharpness, decode_scale):
+    """
+    Full-resolution sharpness threshold converted to a frame decoded at
+    1/decode_scale, using the nearest calibrated scale. decode_scale may be
+    an array.
+    """
+    known = np.log2(list(SHARPNESS_SCALE_RATIOS))
+    ratios = np.array(list(SHARPNESS_SCALE_RATIOS.values()))
+    scales = np.log2(np.maximum(np.asarray(decode_scale, dtype=np.float64), 1))
+    return min_sharpness * ratios[np.abs(np.subtract.outer(scales, known)).argmin(axis=-1)]
+
+class BatchQualityEngine:
+    """
+    Vectorized quality scoring over stacks of images.
+
+    Images are decoded (with JPEG draft scaling), shrunk by a whole factor to
+    fit the working size with their aspect ratio kept, padded with black and
+    packed into a reusable (batch, height, width, 3) uint8 stack. The
+    Laplacian is computed for the whole stack in a few NumPy passes, reusing
+    the same grey/Laplacian buffers for every batch; brightness and sharpness
+    are then taken over each image's own area, so the padding does not count.
+
+    Brightness is the mean over all channels, as in
+    calculate_image_quality_metrics. Sharpness uses Rec. 601 luma rather
+    than an unweighted channel mean. It is measured at the working size, so
+    min_sharpness is a full-resolution score (like MIN_SHARPNESS) that is
+    scaled per image by its decode scale with sharpness_threshold.
+    """
+
+    def __init__(self, working_size=BATCH_WORKING_SIZE, batch_size=64,
+                 min_megapixels=MIN_MEGAPIXELS, min_sharpness=MIN_SHARPNESS,
+                 min_brightness=MIN_BRIGHTNESS):
+        self.working_size = working_size
+        self.batch_size = batch_size
+        self.min_megapixels = min_megapixels
+        self.min_sharpness = min_sharpness
+        self.min_brightness = min_brightness
+        width, height = working_size
+        self._stack = np.empty((batch_size, height, width, 3), dtype=np.uint8)
+        self._gray = np.empty((batch_size, height + 2, width + 2), dtype=np.float32)
+        self._laplacian = np.empty((batch_size, height, width), dtype=np.float32)
+        self._scratch = np.empty((batch_size, height, width), dtype=np.float32)
+
+    def load_into(self, stack, filepaths):
+        """
+        Decode filepaths into the rows of stack.
+
+        Images are shrunk to fit the working size with JPEG draft scaling and
+        Image.reduce (never enlarged) and centred on a black background.
+        Returns (header sizes, image boxes, errors). A box is the
+        (left, top, right, bottom) area of the row covered by the image; rows
+        that fail to load are zeroed and get an error message instead of None.
+        """
+        width, height = self.working_size
+        sizes = np.zeros((len(filepaths), 2), dtype=np.int64)
+        boxes = np.zeros((len(filepaths), 4), dtype=np.int64)
+        errors = []
+        for index, filepath in enumerate(filepaths):
+            try:
+                with Image.open(filepath) as image:
+                    sizes[index] = image.size
+                    # Shrink by whole factors (DCT scaling, then Image.reduce) as
+                    # fast mode does, so the calibrated sharpness ratios apply;
+                    # smaller images are only padded
+                    factor = max(-(-image.width // width), -(-image.height // height))
+                    image.draft('RGB', (image.width // factor, image.height // factor))
+                    factor = max(-(-image.width // width), -(-image.height // height))
+                    working = image.convert('RGB')
+                    if factor > 1:
+                        working = working.reduce(factor)
+                left = (width - working.width) // 2
+                top = (height - working.height) // 2
+                boxes[index] = (left, top, left + working.width, top + working.height)
+                stack[index] = 0
+                stack[index, top:top + working.height, left:left + working.width] = np.asarray(working)
+                errors.append(None)
+            except Exception as e:
+                stack[index] = 0
+                boxes[index] = (0, 0, width, height)
+                errors.append(str(e))
+        return sizes, boxes, errors
+
+    def score_stack(self, stack, boxes=None):
+        """
+        Return (brightness, sharpness) arrays for an (N, height, width, 3)
+        uint8 stack, over each row's (left, top, right, bottom) box if given
+        """
+        count, height, width = stack.shape[:3]
+        if boxes is None:
+            boxes = np.tile([0, 0, width, height], (count, 1))
+        brightness = np.empty(count, dtype=np.float64)
+        sharpness = np.empty(count, dtype=np.float64)
+        for start in range(0, count, self.batch_size):
+            chunk = stack[start:start + self.batch_size]
+            n = len(chunk)
+
+            gray = self._gray[:n]
+            core = gray[:, 1:-1, 1:-1]
+            np.einsum('nhwc,c->nhw', chunk, LUMA_WEIGHTS, out=core, casting='unsafe')
+            for offset, (left, top, right, bottom) in enumerate(boxes[start:start + n]):
+                # Reflect one pixel around the image, as ndimage.laplace does at
+                # its borders, so the padding never enters the Laplacian
+                image = gray[offset]
+                image[top, left + 1:right + 1] = image[top + 1, left + 1:right + 1]
+                image[bottom + 1, left + 1:right + 1] = image[bottom, left + 1:right + 1]
+                image[top:bottom + 2, left] = image[top:bottom + 2, left + 1]
+                image[top:bottom + 2, right + 1] = image[top:bottom + 2, right]
+
+            laplacian = self._laplacian[:n]
+            np.add(gray[:, :-2, 1:-1], gray[:, 2:, 1:-1], out=laplacian)
+            laplacian += gray[:, 1:-1, :-2]
+            laplacian += gray[:, 1:-1, 2:]
+            np.multiply(core, 4, out=self._scratch[:n])
+            laplacian -= self._scratch[:n]
+
+            for offset, (left, top, right, bottom) in enumerate(boxes[start:start + n]):
+                brightness[start + offset] = chunk[offset, top:bottom, left:right].mean()
+                sharpness[start + offset] = laplacian[offset, top:bottom, left:right].var(dtype=np.float64)
+        return brightness, sharpness
+
+    def score(self, filepaths):
+        """Score a list of image paths, batch_size images at a time"""
+        filepaths = list(filepaths)
+        count = len(filepaths)
+        sizes = np.zeros((count, 2), dtype=np.int64)
+        boxes = np.zeros((count, 4), dtype=np.int64)
+        brightness = np.full(count, np.nan)
+        sharpness = np.full(count, np.nan)
+        errors = []
+        for start in range(0, count, self.batch_size):
+            batch = filepaths[start:start + self.batch_size]
+            stack = self._stack[:len(batch)]
+            batch_sizes, batch_boxes, batch_errors = self.load_into(stack, batch)
+            batch_brightness, batch_sharpness = self.score_stack(stack, batch_boxes)
+            failed = np.array([error is not None for error in batch_errors])
+            batch_brightness[failed] = np.nan
+            batch_sharpness[failed] = np.nan
+            end = start + len(batch)
+            sizes[start:end] = batch_sizes
+            boxes[start:end] = batch_boxes
+            brightness[start:end] = batch_brightness
+            sharpness[start:end] = batch_sharpness
+            errors.extend(batch_errors)
+
+        megapixels = np.round(sizes[:, 0] * sizes[:, 1] / 1_000_000, 2)
+        # How many original pixels span one working pixel
+        decode_scale = sizes[:, 0] / np.maximum(boxes[:, 2] - boxes[:, 0], 1)
+        loaded = np.array([error is None for error in errors], dtype=bool)
+        return BatchQualityResult(
+            filepath=np.array(filepaths, dtype=object),
+            width=sizes[:, 0],
+            height=sizes[:, 1],
+            megapixels=megapixels,
+            brightness=np.round(brightness, 2),
+            sharpness_score=np.round(sharpness, 2),
+            low_resolution=loaded & (megapixels < self.min_megapixels),
+            low_sharpness=loaded & (sharpness < sharpness_threshold(self.min_sharpness, decode_scale)),
+            dark=loaded & (brightness < self.min_brightness),
+            error=np.array(errors, dtype=object),
+        )
+
+def score_image_batch(filepaths, working_size=BATCH_WORKING_SIZE, batch_size=64):
+    """Score many images at once with a BatchQualityEngine"""
+    return BatchQualityEngine(working_size=working_size, batch_size=batch_size).score(filepaths)
+
+class AnalysisCache:
+    """
+    On-disk SQLite cache of per-file analysis results.
+
+    Entries are keyed by file path and validated against the file's size and
+    mtime, so a replaced or edited image is re-analyzed. Opening a cache that
+    was written by a different METRICS_VERSION drops every cached entry.
+    """
+
+    def __init__(self, path, version=METRICS_VERSION):
+        self.path = path
+        self.version = version
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "filepath TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, "
+            "exif TEXT NOT NULL, quality TEXT NOT NULL)"
+        )
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'metrics_version'").fetchone()
+        if row is None or row[0] != str(version):
+            self.invalidate()
+
+    def invalidate(self):
+        """Drop all cached results and stamp the cache with the current metrics version"""
+        with self.connection:
+            self.connection.execute("DELETE FROM results")
+            self.connection.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('metrics_version', ?)",
+                (str(self.version),)
+            )
+
+    def get(self, filepath, stat):
+        """Return cached (exif, quality) for an unchanged file, or None"""
+        row = self.connection.execute(
+            "SELECT exif, quality FROM results WHERE filepath = ? AND size = ? AND mtime_ns = ?",
+            (filepath, stat.st_size, stat.st_mtime_ns)
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), json.loads(row[1])
+
+    def put(self, filepath, stat, exif, quality):
+        """Store results for a file; failed analyses are not cached so they are retried"""
+        if 'Error' in exif or 'Error' in quality:
+            return
+        self.connection.execute(
+            "INSERT OR REPLACE INTO results (filepath, size, mtime_ns, exif, quality) VALUES (?, ?, ?, ?, ?)",
+            (filepath, stat.st_size, stat.st_mtime_ns, json.dumps(exif), json.dumps(quality))
+        )
 
+    def commit(self):
+        self.connection.commit()
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def analyze_image_file(filepath, working_size=None):
+    """
+    Extract EXIF data and quality metrics for one image (process-pool entry point).
+
+    EXIF comes from the header-only reader, falling back to Pillow for files
+    it cannot parse. The quality metrics use one ImageContext, so the file is
+    opened, stat'ed and decoded once. working_size enables fast mode (see
+    ImageContext).
+    """
+    try:
+        context = ImageContext(filepath, working_size=working_size)
+    except Exception as e:
+        return {'Error': str(e)}, {'Error': str(e)}
+    with context:
+        exif = extract_exif_data(filepath, header_only=True)
+        if 'Error' in exif:
+            exif = extract_exif_data(context)
+        return exif, calculate_image_quality_metrics(context)
+
+def discover_eye_images(left_eye_dir, right_eye_dir):
+    """List (eye_side, filename, filepath) for every eye image, in a stable order"""
+    tasks = []
+    for eye_side, directory in (('LEFT', left_eye_dir), ('RIGHT', right_eye_dir)):
+        if not os.path.exists(directory):
+            continue
+        for filename in sorted(os.listdir(directory)):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                tasks.append((eye_side, filename, os.path.join(directory, filename)))
+    return tasks
+
+def build_result_row(eye_side, filename, filepath, exif, quality):
+    """Combine EXIF data and quality metrics into one tracking spreadsheet row"""
+    return {
+        'participant_id': filename.split('.')[0],
+        'eye_side': eye_side,
+        'filename': filename,
+        'filepath': filepath,
+        'width': exif.get('Width', 'N/A'),
+        'height': exif.get('Height', 'N/A'),
+        'resolution': quality.get('resolution', 'N/A'),
+        'megapixels': quality.get('megapixels', 'N/A'),
+        'file_size_kb': quality.get('file_size_kb', 'N/A'),
+        'brightness': quality.get('brightness', 'N/A'),
+        'sharpness_score': quality.get('sharpness_score', 'N/A'),
+        'camera_make': exif.get('Make', 'N/A'),
+        'camera_model': exif.get('Model', 'N/A'),
+        'datetime': exif.get('DateTime', 'N/A'),
+        'flash': exif.get('Flash', 'N/A'),
+        'focal_length': exif.get('FocalLength', 'N/A'),
+        'iso': exif.get('ISOSpeedRatings', 'N/A'),
+        'exposure_time': exif.get('ExposureTime', 'N/A'),
+    }
+
+def calibrate_fast_mode(image_paths, working_size=FAST_WORKING_SIZE):
+    """
+    Compare full-resolution and fast-mode metrics on the same images.
+
+    Returns one row per image with both sets of values and their ratios; the
+    median sharpness_ratio per decode_scale is the factor documented in
+    fast_mode_calibration.md.
+    """
+    rows = []
+    for image_path in image_paths:
+        full = calculate_image_quality_metrics(image_path)
+        fast = calculate_image_quality_metrics(image_path, working_size=working_size)
+        if 'Error' in full or 'Error' in fast:
+            continue
+        rows.append({
+            'filepath': image_path,
+            'megapixels': full['megapixels'],
+            'decode_scale': fast['decode_scale'],
+            'brightness_full': full['brightness'],
+            'brightness_fast': fast['brightness'],
+            'brightness_delta': round(fast['brightness'] - full['brightness'], 2),
+            'sharpness_full': full['sharpness_score'],
+            'sharpness_fast': fast['sharpness_score'],
+            'sharpness_ratio': round(fast['sharpness_score'] / full['sharpness_score'], 3)
+            if full['sharpness_score'] else np.nan,
+        })
+    return pd.DataFrame(rows)
+
+def _future_result(future):
+    """Result of an analyze_image_file future, or per-file error dicts if its worker failed"""
+    try:
+        return future.result()
+    except Exception as e:
+        return {'Error': str(e)}, {'Error': str(e)}
+
+def iter_image_analysis(filepaths, workers=1, working_size=None, executor=None, window=None):
+    """
+    Yield (exif, quality) for each path, in input order.
+
+    filepaths may be any iterable and is consumed lazily. With workers > 1
+    (or an existing executor) the files are spread across a process pool
+    with at most `window` files in flight (default: four per worker). A file
+    whose worker fails (e.g. the process is killed) yields {'Error': ...}
+    dicts like any other per-file failure instead of aborting the batch.
+    """
+    if executor is None and workers <= 1:
+        for filepath in filepaths:
+            yield analyze_image_file(filepath, working_size)
+        return
+
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            yield from iter_image_analysis(filepaths, working_size=working_size, executor=executor,
+                                           window=window or 4 * workers)
+        return
+
+    window = window or 64
+    in_flight = deque()
+    for filepath in filepaths:
+        in_flight.append(executor.submit(analyze_image_file, filepath, working_size))
+        if len(in_flight) >= window:
+            yield _future_result(in_flight.popleft())
+    while in_flight:
+        yield _future_result(in_flight.popleft())
+
+def _stat_or_error(filepath):
+    """os.stat() of a file, or the OSError raised trying"""
+    try:
+        return os.stat(filepath)
+    except OSError as e:
+        return e
+
+def iter_analyzed_images(tasks, workers=1, working_size=None, cache=None, chunk_size=None):
+    """
+    Extract stage: yield (task, exif, quality, cached) for each discovered task, in order.
+
+    Tasks are handled chunk_size at a time (default: 16 per worker, at least
+    64). Within a chunk, cached results are reused and only new or modified
+    files are analyzed. The cache is committed after every chunk, so an
+    interrupted run keeps the work it finished.
+    """
+    chunk_size = chunk_size or max(64, 16 * workers)
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for start in range(0, len(tasks), chunk_size):
+            chunk = tasks[start:start + chunk_size]
+            stats = [_stat_or_error(filepath) for _, _, filepath in chunk]
+            hits = [cache.get(filepath, stat) if cache and isinstance(stat, os.stat_result) else None
+                    for (_, _, filepath), stat in zip(chunk, stats)]
+            pending = [filepath for (_, _, filepath), stat, hit in zip(chunk, stats, hits)
+                       if hit is None and isinstance(stat, os.stat_result)]
+            analyses = iter_image_analysis(pending, working_size=working_size, executor=executor,
+                                           window=len(pending) or None)
+            for task, stat, hit in zip(chunk, stats, hits):
+                if isinstance(stat, OSError):
+                    # Removed or made unreadable since discovery: an Error row, not an aborted run
+                    yield task, {'Error': str(stat)}, {'Error': str(stat)}, False
+                    continue
+                if hit is not None:
+                    yield task, hit[0], hit[1], True
+                    continue
+                exif, quality = next(analyses)
+                if cache:
+                    cache.put(task[2], stat, exif, quality)
+                yield task, exif, quality, False
+            if cache:
+                cache.commit()
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+
+def iter_result_rows(analyzed, total=None):
+    """Score stage: turn extract-stage output into tracking rows, printing progress"""
+    for index, ((eye_side, filename, filepath), exif, quality, cached) in enumerate(analyzed, start=1):
+        action = "Cached" if cached else "Processing"
+        progress = f"{index}/{total}" if total is not None else f"{index}"
+        print(f"[{progress}] {action} {eye_side.lower()} eye: {filename}")
+        yield build_result_row(eye_side, filename, filepath, exif, quality)
+
+class CsvSink:
+    """Write tracking rows to a CSV file as they arrive, flushing every flush_every rows"""
+
+    def __init__(self, path, columns=RESULT_COLUMNS, flush_every=100):
+        self.path = path
+        self.flush_every = flush_every
+        self.rows_written = 0
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=columns, extrasaction='ignore',
+                                      lineterminator='\n')
+        self._writer.writeheader()
+
+    def write(self, row):
+        self._writer.writerow(row)
+        self.rows_written += 1
+        if self.rows_written % self.flush_every == 0:
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def typed_value(kind, value):
+    """
+    Convert one tracking-row value to its RESULT_TYPES kind.
+
+    'N/A', empty and unparseable values become None. Multi-valued EXIF
+    numbers such as ISOSpeedRatings "(100, 100)" keep their first value.
+    """
+    if value is None or value == 'N/A' or value == '':
+        return None
+    if kind in ('string', 'category'):
+        return str(value)
+    if kind == 'datetime':
+        try:
+            return datetime.strptime(str(value).strip(), EXIF_DATETIME_FORMAT)
+        except ValueError:
+            return None
+    if isinstance(value, str):
+        match = re.search(r'-?\d+(?:\.\d+)?(?:[eE]-?\d+)?', value)
+        if match is None:
+            return None
+        value = match.group()
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    if number != number:
+        return None
+    if kind.startswith('int'):
+        return int(number)
+    return number
+
+def _arrow_type(kind):
+    import pyarrow as pa
+
+    if kind == 'category':
+        return pa.dictionary(pa.int32(), pa.string())
+    if kind == 'datetime':
+        return pa.timestamp('s')
+    if kind == 'string':
+        return pa.string()
+    return getattr(pa, kind)()
+
+def tracking_arrow_schema(columns=RESULT_COLUMNS):
+    """Arrow schema of the typed tracking output"""
+    import pyarrow as pa
+
+    return pa.schema([(column, _arrow_type(RESULT_TYPES[column])) for column in columns])
+
+class ParquetSink:
+    """
+    Write tracking rows to a typed Parquet file, one row group per flush_every rows.
+
+    Values are converted with typed_value() into the RESULT_TYPES schema:
+    proper nulls instead of 'N/A', integer/float EXIF fields, a timestamp
+    for datetime and dictionary-encoded (categorical) eye_side, camera_make
+    and camera_model. Requires pyarrow.
+    """
+
+    def __init__(self, path, columns=RESULT_COLUMNS, flush_every=1000):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.path = path
+        self.columns = columns
+        self.flush_every = flush_every
+        self.rows_written = 0
+        self.schema = tracking_arrow_schema(columns)
+        self._pa = pa
+        self._writer = pq.ParquetWriter(path, self.schema)
+        self._buffer = []
+
+    def write(self, row):
+        self._buffer.append(row)
+        self.rows_written += 1
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        arrays = {
+            column: [typed_value(RESULT_TYPES[column], row.get(column)) for row in self._buffer]
+            for column in self.columns
+        }
+        self._writer.write_table(self._pa.Table.from_pydict(arrays, schema=self.schema))
+        self._buffer = []
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def coerce_tracking_frame(df):
+    """Cast a tracking DataFrame read from CSV to the RESULT_TYPES dtypes"""
+    for column in df.columns:
+        kind = RESULT_TYPES.get(column)
+        if kind is None:
+            continue
+        values = df[column].mask(df[column].isin(['N/A', '']))
+        if kind == 'string':
+            df[column] = values.astype('string')
+        elif kind == 'category':
+            df[column] = values.astype('category')
+        elif kind == 'datetime':
+            df[column] = pd.to_datetime(values, format=EXIF_DATETIME_FORMAT, errors='coerce')
+        else:
+            if values.dtype == object or pd.api.types.is_string_dtype(values):
+                values = values.astype('string').str.extract(r'(-?\d+(?:\.\d+)?(?:[eE]-?\d+)?)', expand=False)
+            numbers = pd.to_numeric(values, errors='coerce')
+            df[column] = numbers.round().astype(kind.capitalize()) if kind.startswith('int') else numbers.astype(kind)
     return df
 
+def load_tracking_data(path, columns=None):
+    """
+    Load a tracking spreadsheet with typed columns.
+
+    Parquet files are read with column projection, so only `columns` are
+    decoded. CSV files are read with usecols and cast to the same dtypes
+    with coerce_tracking_frame(). Categorical columns come back as pandas
+    categories, and missing values come back as nulls instead of 'N/A'.
+    """
+    if str(path).endswith('.parquet'):
+        df = pd.read_parquet(path, columns=columns)
+        # Integer columns with nulls arrive as float64; restore nullable ints
+        for column in df.columns:
+            kind = RESULT_TYPES.get(column, '')
+            if kind.startswith('int'):
+                df[column] = df[column].astype(kind.capitalize())
+        return df
+    df = pd.read_csv(path, usecols=columns, dtype=str, keep_default_na=False)
+    return coerce_tracking_frame(df)
+
+class StreamingSummary:
+    """
+    Summary statistics maintained row by row instead of over a DataFrame.
+
+    Tracks counts per eye side and camera model, plus count/mean/std/min/max
+    (Welford's algorithm) of every numeric column, in constant memory per
+    column.
+    """
+
+    def __init__(self, numeric_columns=NUMERIC_COLUMNS):
+        self.total = 0
+        self.eye_sides = Counter()
+        self.camera_models = Counter()
+        self.stats = {column: {'count': 0, 'mean': 0.0, 'm2': 0.0, 'min': None, 'max': None}
+                      for column in numeric_columns}
+
+    def add(self, row):
+        self.total += 1
+        self.eye_sides[row.get('eye_side')] += 1
+        self.camera_models[row.get('camera_model', 'N/A')] += 1
+        for column, stat in self.stats.items():
+            value = row.get(column)
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value != value:
+                continue
+            stat['count'] += 1
+            delta = value - stat['mean']
+            stat['mean'] += delta / stat['count']
+            stat['m2'] += delta * (value - stat['mean'])
+            stat['min'] = value if stat['min'] is None else min(stat['min'], value)
+            stat['max'] = value if stat['max'] is None else max(stat['max'], value)
+
+    def describe(self):
+        """Per-column {count, mean, std, min, max}, like DataFrame.describe().to_dict()"""
+        summary = {}
+        for column, stat in self.stats.items():
+            count = stat['count']
+            summary[column] = {
+                'count': count,
+                'mean': float(stat['mean']) if count else None,
+                'std': float((stat['m2'] / (count - 1)) ** 0.5) if count > 1 else None,
+                'min': stat['min'],
+                'max': stat['max'],
+            }
+        return summary
+
+    def print_report(self):
+        print("\n" + "="*60)
+        print("PHASE A - IMAGE ANALYSIS SUMMARY")
+        print("="*60)
+        print(f"Total images analyzed: {self.total}")
+        print(f"Left eye images: {self.eye_sides['LEFT']}")
+        print(f"Right eye images: {self.eye_sides['RIGHT']}")
+        print(f"\nUnique camera models detected: {len(self.camera_models)}")
+        print(f"Camera models: {list(self.camera_models)}")
+
+        print("\n" + "-"*60)
+        print("IMAGE QUALITY METRICS")
+        print("-"*60)
+
+        stats = self.describe()
+        if stats['megapixels']['count']:
+            print(f"Average resolution: {stats['megapixels']['mean']:.2f} MP")
+            print(f"Resolution range: {stats['megapixels']['min']:.2f} - {stats['megapixels']['max']:.2f} MP")
+            print(f"Average file size: {stats['file_size_kb']['mean']:.2f} KB")
+            print(f"Average brightness: {stats['brightness']['mean']:.2f}")
+            print(f"Average sharpness: {stats['sharpness_score']['mean']:.2f}")
+
+def analyze_eye_images(base_dir=BASE_DIR, workers=None, use_cache=True, cache_path=None,
+                       working_size=None, output_format='csv'):
+    """
+    Analyze all eye images and create tracking spreadsheet.
+
+    Runs as a streaming pipeline: discover -> extract (iter_analyzed_images)
+    -> score (iter_result_rows) -> sink (CsvSink or ParquetSink, by
+    output_format). Rows are written and folded into a StreamingSummary as
+    they are produced, so memory stays flat however many images there are,
+    and a crash leaves every row flushed so far on disk. Returns the summary.
+
+    EXIF extraction and quality metrics run on a pool of `workers` processes
+    (default: one per CPU core); pass workers=1 to process files in-process.
+    Rows keep the order of discover_eye_images() regardless of worker count.
+
+    Unless use_cache is False, results are kept in an AnalysisCache (by
+    default phase_a_analysis_cache.sqlite3 in base_dir) and only new or
+    modified images are analyzed on later runs.
+
+    working_size enables fast mode: brightness and sharpness are computed on a
+    decode whose long edge is reduced to about that many pixels. Fast and
+    full-resolution results are cached separately.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if output_format not in OUTPUT_SINKS:
+        raise ValueError(f"Unknown output format: {output_format}")
+
+    # Define paths
+    left_eye_dir = os.path.join(base_dir, *LEFT_EYE_SUBDIRS)
+    right_eye_dir = os.path.join(base_dir, *RIGHT_EYE_SUBDIRS)
+
+    tasks = discover_eye_images(left_eye_dir, right_eye_dir)
+    print(f"Found {len(tasks)} images, analyzing with {workers} worker(s)")
+
+    cache = None
+    if use_cache:
+        version = f"{METRICS_VERSION}-fast{working_size}" if working_size else METRICS_VERSION
+        cache = AnalysisCache(cache_path or os.path.join(base_dir, CACHE_FILENAME), version=version)
+
+    sink_class, extension = OUTPUT_SINKS[output_format]
+    output_path = os.path.join(base_dir, f'phase_a_image_tracking.{extension}')
+    summary = StreamingSummary()
+    try:
+        with sink_class(output_path) as sink:
+            analyzed = iter_analyzed_images(tasks, workers=workers, working_size=working_size, cache=cache)
+            for row in iter_result_rows(analyzed, total=len(tasks)):
+                sink.write(row)
+                summary.add(row)
+    finally:
+        if cache:
+            cache.close()
+    print(f"\nTracking spreadsheet saved to: {output_path}")
+
+    summary.print_report()
+    return summary
+
+# output_format -> (sink class, file extension)
+OUTPUT_SINKS = {
+    'csv': (CsvSink, 'csv'),
+    'parquet': (ParquetSink, 'parquet'),
+}
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analyze Phase A eye images")
+    parser.add_argument('--base-dir', default=BASE_DIR,
+                        help="Folder containing the Google Forms file-response folders")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Number of worker processes (default: one per CPU core)")
+    parser.add_argument('--cache-path', default=None,
+                        help=f"Analysis cache database (default: <base-dir>/{CACHE_FILENAME})")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Re-analyze every image and leave the cache untouched")
+    parser.add_argument('--output-format', choices=sorted(OUTPUT_SINKS), default='csv',
+                        help="Tracking spreadsheet format (parquet is typed, see RESULT_TYPES)")
+    parser.add_argument('--fast', action='store_true',
+                        help="Compute brightness/sharpness on a reduced-resolution decode")
+    parser.add_argument('--working-size', type=int, default=FAST_WORKING_SIZE,
+                        help=f"Long edge in pixels used by --fast (default: {FAST_WORKING_SIZE})")
+    parser.add_argument('--calibrate', action='store_true',
+                        help="Print full vs fast metric calibration for all images and exit")
+    parser.add_argument('--profile', action='store_true',
+                        help="Print time spent per quality metric and decode stage and exit")
+    parser.add_argument('--metrics', default=None,
+                        help=f"Comma-separated metrics for --profile (default: all of "
+                             f"{', '.join(DEFAULT_QUALITY_METRICS)})")
+    args = parser.parse_args()
+
+    if args.profile:
+        tasks = discover_eye_images(os.path.join(args.base_dir, *LEFT_EYE_SUBDIRS),
+                                    os.path.join(args.base_dir, *RIGHT_EYE_SUBDIRS))
+        print(profile_quality_metrics([filepath for _, _, filepath in tasks],
+                                      metrics=args.metrics.split(',') if args.metrics else None,
+                                      working_size=args.working_size if args.fast else None))
+        raise SystemExit(0)
+
+    if args.calibrate:
+        tasks = discover_eye_images(os.path.join(args.base_dir, *LEFT_EYE_SUBDIRS),
+                                    os.path.join(args.base_dir, *RIGHT_EYE_SUBDIRS))
+        calibration = calibrate_fast_mode([filepath for _, _, filepath in tasks], args.working_size)
+        print(calibration.to_string(index=False))
+        print(calibration.groupby('decode_scale')[['brightness_delta', 'sharpness_ratio']].median())
+        raise SystemExit(0)
+
     try:
-        df = analyze_eye_images()
+        summary = analyze_eye_images(base_dir=args.base_dir, workers=args.workers,
+                                     use_cache=not args.no_cache, cache_path=args.cache_path,
+                                     working_size=args.working_size if args.fast else None,
+                                     output_format=args.output_format)
 
         # Save detailed JSON report
         report = {
             'analysis_date': datetime.now().isoformat(),
-            'total_images': len(df),
-            'summary': df.describe().to_dict(),
-            'camera_models': df['camera_model'].value_counts().to_dict()
+            'total_images': summary.total,
+            'summary': summary.describe(),
+            'camera_models': dict(summary.camera_models.most_common())
         }
 
-        with open(r'C:\Users\User2\Desktop\Nicole\analysis_report.json', 'w') as f:
+        with open(os.path.join(args.base_dir, 'analysis_report.json'), 'w') as f:
             json.dump(report, f, indent=2)
 
         print("\nDetailed report saved to: analysis_report.json")
@@ -0,0 +1,86 @@
+import os
+import struct
+import tempfile
+import unittest
+
+from PIL import ExifTags, Image
+
+from exif_header import EXIF_IFD_TAGS, IFD0_TAGS, read_exif_header
+
+SAMPLE_JPEG = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'eye_data_collection', 'static', 'IMG_4977.jpeg')
+# Offset of the TIFF header inside the sample's APP1 segment (SOI, marker, length, 'Exif\0\0')
+TIFF_OFFSET = 2 + 4 + 6
+
+
+def pillow_header(path):
+    """What extract_exif_data() reports through Pillow, limited to the tags read_exif_header decodes"""
+    with Image.open(path) as img:
+        exif = img.getexif()
+        tags = {**exif, **exif.get_ifd(ExifTags.IFD.Exif)}
+        result = {ExifTags.TAGS[tag]: str(value) for tag, value in tags.items()
+                  if tag in IFD0_TAGS or tag in EXIF_IFD_TAGS}
+        result.update({'Width': img.width, 'Height': img.height, 'Format': img.format, 'Mode': img.mode})
+    return result
+
+
+class ReadExifHeaderTests(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        with open(SAMPLE_JPEG, 'rb') as sample:
+            self.sample = sample.read()
+
+    def write(self, name, content):
+        path = os.path.join(self.temp_dir.name, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_jpeg_matches_pillow(self):
+        header = read_exif_header(SAMPLE_JPEG)
+        self.assertEqual(header, pillow_header(SAMPLE_JPEG))
+        self.assertEqual(header['Model'], 'iPhone 11 Pro Max')
+
+    def test_png_exif_chunk_matches_pillow(self):
+        path = os.path.join(self.temp_dir.name, 'sample.png')
+        with Image.open(SAMPLE_JPEG) as img:
+            img.save(path, exif=img.getexif().tobytes())
+        header = read_exif_header(path)
+        self.assertEqual(header, pillow_header(path))
+        self.assertEqual(header['Format'], 'PNG')
+
+    def test_truncated_in_exif_segment(self):
+        path = self.write('truncated.jpg', self.sample[:2000])
+        self.assertEqual(read_exif_header(path), {'Error': 'Truncated image header'})
+
+    def test_truncated_before_frame_header(self):
+        app1_end = 4 + struct.unpack('>H', self.sample[4:6])[0]
+        path = self.write('truncated.jpg', self.sample[:app1_end + 3])
+        self.assertEqual(read_exif_header(path), {'Error': 'Truncated image header'})
+
+    def test_invalid_marker(self):
+        path = self.write('bad_marker.jpg', self.sample[:2] + b'\x00' + self.sample[3:])
+        self.assertEqual(read_exif_header(path), {'Error': 'Invalid JPEG marker'})
+
+    def test_unknown_tiff_byte_order_keeps_dimensions(self):
+        content = self.sample[:TIFF_OFFSET] + b'XX' + self.sample[TIFF_OFFSET + 2:]
+        header = read_exif_header(self.write('bad_tiff.jpg', content))
+        self.assertEqual(header, {'Format': 'JPEG', 'Width': 1685, 'Height': 1334, 'Mode': 'RGB'})
+
+    def test_ifd_offset_past_exif_block_keeps_dimensions(self):
+        offset = TIFF_OFFSET + 4
+        content = self.sample[:offset] + b'\xff\xff\xff\xff' + self.sample[offset + 4:]
+        header = read_exif_header(self.write('bad_ifd.jpg', content))
+        self.assertEqual(header, {'Format': 'JPEG', 'Width': 1685, 'Height': 1334, 'Mode': 'RGB'})
+
+    def test_unsupported_format(self):
+        header = read_exif_header(self.write('notes.txt', b'not an image at all'))
+        self.assertEqual(header, {'Error': 'Unsupported image format: notes.txt'})
+
+    def test_missing_file(self):
+        self.assertIn('Error', read_exif_header(os.path.join(self.temp_dir.name, 'missing.jpg')))
+
+
+if __name__ == '__main__':
+    unittest.main()
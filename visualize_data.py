@@ -1,200 +1,330 @@
-import pandas as pd
-import matplotlib.pyplot as plt
+import argparse
 import seaborn as sns
 import numpy as np
 from pathlib import Path
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from image_analysis import BASE_DIR, MIN_BRIGHTNESS, MIN_MEGAPIXELS, MIN_SHARPNESS, load_tracking_data
 
-# Set style
-sns.set_style("whitegrid")
-plt.rcParams['figure.figsize'] = (15, 10)
-
-# Read data
-df = pd.read_csv(r'C:\Users\User2\Desktop\Nicole\phase_a_image_tracking.csv')
-
-# Create figure with subplots
-fig = plt.figure(figsize=(16, 12))
-
-# 1. Camera Model Distribution
-ax1 = plt.subplot(3, 3, 1)
-camera_counts = df['camera_model'].value_counts()
-colors = sns.color_palette("husl", len(camera_counts))
-ax1.bar(range(len(camera_counts)), camera_counts.values, color=colors)
-ax1.set_xticks(range(len(camera_counts)))
-ax1.set_xticklabels(camera_counts.index, rotation=45, ha='right')
-ax1.set_title('Camera Model Distribution', fontweight='bold')
-ax1.set_ylabel('Count')
-ax1.grid(axis='y', alpha=0.3)
-
-# 2. Resolution Distribution
-ax2 = plt.subplot(3, 3, 2)
-resolutions = df['megapixels'].values
-ax2.hist(resolutions, bins=8, color='skyblue', edgecolor='black', alpha=0.7)
-ax2.axvline(resolutions.mean(), color='red', linestyle='--', linewidth=2, label=f'Mean: {resolutions.mean():.2f} MP')
-ax2.set_title('Resolution Distribution', fontweight='bold')
-ax2.set_xlabel('Megapixels')
-ax2.set_ylabel('Frequency')
-ax2.legend()
-ax2.grid(axis='y', alpha=0.3)
-
-# 3. Brightness Distribution
-ax3 = plt.subplot(3, 3, 3)
-brightness = df['brightness'].values
-ax3.hist(brightness, bins=8, color='gold', edgecolor='black', alpha=0.7)
-ax3.axvline(brightness.mean(), color='red', linestyle='--', linewidth=2, label=f'Mean: {brightness.mean():.2f}')
-ax3.set_title('Brightness Distribution', fontweight='bold')
-ax3.set_xlabel('Brightness Score')
-ax3.set_ylabel('Frequency')
-ax3.legend()
-ax3.grid(axis='y', alpha=0.3)
-
-# 4. Sharpness Distribution
-ax4 = plt.subplot(3, 3, 4)
-sharpness = df['sharpness_score'].values
-ax4.hist(sharpness, bins=8, color='lightcoral', edgecolor='black', alpha=0.7)
-ax4.axvline(sharpness.mean(), color='red', linestyle='--', linewidth=2, label=f'Mean: {sharpness.mean():.2f}')
-ax4.set_title('Sharpness Distribution', fontweight='bold')
-ax4.set_xlabel('Sharpness Score')
-ax4.set_ylabel('Frequency')
-ax4.legend()
-ax4.grid(axis='y', alpha=0.3)
-
-# 5. Eye Side Distribution
-ax5 = plt.subplot(3, 3, 5)
-eye_counts = df['eye_side'].value_counts()
-ax5.pie(eye_counts.values, labels=eye_counts.index, autopct='%1.1f%%',
-        colors=['lightblue', 'lightcoral'], startangle=90)
-ax5.set_title('Left vs Right Eye Distribution', fontweight='bold')
-
-# 6. File Size vs Resolution
-ax6 = plt.subplot(3, 3, 6)
-scatter = ax6.scatter(df['megapixels'], df['file_size_kb'],
-                      c=df['brightness'], cmap='viridis', s=100, alpha=0.6)
-ax6.set_xlabel('Resolution (MP)')
-ax6.set_ylabel('File Size (KB)')
-ax6.set_title('File Size vs Resolution (colored by brightness)', fontweight='bold')
-plt.colorbar(scatter, ax=ax6, label='Brightness')
-ax6.grid(alpha=0.3)
-
-# 7. Quality Metrics by Camera Model
-ax7 = plt.subplot(3, 3, 7)
-camera_quality = df.groupby('camera_model')[['megapixels', 'brightness', 'sharpness_score']].mean()
-x_pos = np.arange(len(camera_quality))
-width = 0.25
-
-bars1 = ax7.bar(x_pos - width, camera_quality['megapixels'], width, label='Resolution (MP)', alpha=0.8)
-bars2 = ax7.bar(x_pos, camera_quality['brightness']/20, width, label='Brightness/20', alpha=0.8)
-bars3 = ax7.bar(x_pos + width, camera_quality['sharpness_score']/20, width, label='Sharpness/20', alpha=0.8)
-
-ax7.set_xlabel('Camera Model')
-ax7.set_ylabel('Normalized Values')
-ax7.set_title('Quality Metrics by Camera Model', fontweight='bold')
-ax7.set_xticks(x_pos)
-ax7.set_xticklabels(camera_quality.index, rotation=45, ha='right')
-ax7.legend()
-ax7.grid(axis='y', alpha=0.3)
-
-# 8. Brightness vs Sharpness
-ax8 = plt.subplot(3, 3, 8)
-for camera in df['camera_model'].unique():
-    subset = df[df['camera_model'] == camera]
-    ax8.scatter(subset['brightness'], subset['sharpness_score'],
-                label=camera, s=100, alpha=0.6)
-ax8.set_xlabel('Brightness')
-ax8.set_ylabel('Sharpness Score')
-ax8.set_title('Brightness vs Sharpness by Camera', fontweight='bold')
-ax8.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
-ax8.grid(alpha=0.3)
-
-# 9. Summary Statistics Table
-ax9 = plt.subplot(3, 3, 9)
-ax9.axis('off')
-
-summary_text = f"""
+# Columns the dashboard uses; Parquet input only decodes these
+DASHBOARD_COLUMNS = [
+    'filename', 'eye_side', 'camera_model', 'megapixels', 'file_size_kb',
+    'brightness', 'sharpness_score', 'flash',
+]
+METRIC_COLUMNS = ['megapixels', 'brightness', 'sharpness_score', 'file_size_kb']
+DEFAULT_DPI = 300
+
+
+def load_dashboard_data(path=None):
+    """Load the tracking data, preferring the typed Parquet output when it exists"""
+    if path is None:
+        path = Path(BASE_DIR) / 'phase_a_image_tracking.parquet'
+        if not path.exists():
+            path = Path(BASE_DIR) / 'phase_a_image_tracking.csv'
+    df = load_tracking_data(path, columns=DASHBOARD_COLUMNS)
+    df['camera_model'] = df['camera_model'].astype('category')
+    if 'N/A' not in df['camera_model'].cat.categories:
+        df['camera_model'] = df['camera_model'].cat.add_categories(['N/A'])
+    df['camera_model'] = df['camera_model'].fillna('N/A')
+    return df
+
+
+def compute_aggregates(df):
+    """
+    Compute every per-camera and global statistic the dashboard needs.
+
+    Per-camera counts and means come from one grouped pass, global
+    mean/std/min/max from one pass over the metric columns.
+    """
+    grouped = df.groupby('camera_model', observed=True)
+    per_camera = grouped.agg(
+        count=('filename', 'size'),
+        megapixels=('megapixels', 'mean'),
+        brightness=('brightness', 'mean'),
+        sharpness_score=('sharpness_score', 'mean'),
+        file_size_kb=('file_size_kb', 'mean'),
+    ).sort_values('count', ascending=False)
+
+    flash = (
+        df.dropna(subset=['flash'])
+        .groupby(['camera_model', 'flash'], observed=True)
+        .size()
+    )
+
+    return {
+        'total': len(df),
+        'eye_sides': df['eye_side'].value_counts().loc[lambda counts: counts > 0],
+        'per_camera': per_camera,
+        'flash': flash,
+        'metrics': df[METRIC_COLUMNS].agg(['mean', 'std', 'min', 'max']),
+    }
+
+
+def quality_concerns(df, min_megapixels=MIN_MEGAPIXELS, min_sharpness=MIN_SHARPNESS,
+                     min_brightness=MIN_BRIGHTNESS):
+    """Return {concern: rows} for low resolution, low sharpness, dark and missing-EXIF images"""
+    return {
+        'low_resolution': df[df['megapixels'] < min_megapixels],
+        'low_sharpness': df[df['sharpness_score'] < min_sharpness],
+        'dark': df[df['brightness'] < min_brightness],
+        'missing_exif': df[df['camera_model'] == 'N/A'],
+    }
+
+
+def draw_camera_distribution(ax, df, aggregates):
+    camera_counts = aggregates['per_camera']['count']
+    colors = sns.color_palette("husl", len(camera_counts))
+    ax.bar(range(len(camera_counts)), camera_counts.values, color=colors)
+    ax.set_xticks(range(len(camera_counts)))
+    ax.set_xticklabels(camera_counts.index, rotation=45, ha='right')
+    ax.set_title('Camera Model Distribution', fontweight='bold')
+    ax.set_ylabel('Count')
+    ax.grid(axis='y', alpha=0.3)
+
+
+def _draw_histogram(ax, values, color, title, xlabel, mean_label):
+    values = values.dropna()
+    ax.hist(values, bins=8, color=color, edgecolor='black', alpha=0.7)
+    ax.axvline(values.mean(), color='red', linestyle='--', linewidth=2, label=mean_label.format(values.mean()))
+    ax.set_title(title, fontweight='bold')
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel('Frequency')
+    ax.legend()
+    ax.grid(axis='y', alpha=0.3)
+
+
+def draw_resolution(ax, df, aggregates):
+    _draw_histogram(ax, df['megapixels'], 'skyblue', 'Resolution Distribution', 'Megapixels',
+                    'Mean: {:.2f} MP')
+
+
+def draw_brightness(ax, df, aggregates):
+    _draw_histogram(ax, df['brightness'], 'gold', 'Brightness Distribution', 'Brightness Score',
+                    'Mean: {:.2f}')
+
+
+def draw_sharpness(ax, df, aggregates):
+    _draw_histogram(ax, df['sharpness_score'], 'lightcoral', 'Sharpness Distribution', 'Sharpness Score',
+                    'Mean: {:.2f}')
+
+
+def draw_eye_side(ax, df, aggregates):
+    eye_counts = aggregates['eye_sides']
+    ax.pie(eye_counts.values, labels=eye_counts.index, autopct='%1.1f%%',
+           colors=['lightblue', 'lightcoral'], startangle=90)
+    ax.set_title('Left vs Right Eye Distribution', fontweight='bold')
+
+
+def draw_size_vs_resolution(ax, df, aggregates):
+    scatter = ax.scatter(df['megapixels'], df['file_size_kb'],
+                         c=df['brightness'], cmap='viridis', s=100, alpha=0.6)
+    ax.set_xlabel('Resolution (MP)')
+    ax.set_ylabel('File Size (KB)')
+    ax.set_title('File Size vs Resolution (colored by brightness)', fontweight='bold')
+    ax.figure.colorbar(scatter, ax=ax, label='Brightness')
+    ax.grid(alpha=0.3)
+
+
+def draw_camera_quality(ax, df, aggregates):
+    camera_quality = aggregates['per_camera']
+    x_pos = np.arange(len(camera_quality))
+    width = 0.25
+
+    ax.bar(x_pos - width, camera_quality['megapixels'], width, label='Resolution (MP)', alpha=0.8)
+    ax.bar(x_pos, camera_quality['brightness']/20, width, label='Brightness/20', alpha=0.8)
+    ax.bar(x_pos + width, camera_quality['sharpness_score']/20, width, label='Sharpness/20', alpha=0.8)
+
+    ax.set_xlabel('Camera Model')
+    ax.set_ylabel('Normalized Values')
+    ax.set_title('Quality Metrics by Camera Model', fontweight='bold')
+    ax.set_xticks(x_pos)
+    ax.set_xticklabels(camera_quality.index, rotation=45, ha='right')
+    ax.legend()
+    ax.grid(axis='y', alpha=0.3)
+
+
+def draw_brightness_vs_sharpness(ax, df, aggregates):
+    for camera, subset in df.groupby('camera_model', observed=True):
+        ax.scatter(subset['brightness'], subset['sharpness_score'],
+                   label=camera, s=100, alpha=0.6)
+    ax.set_xlabel('Brightness')
+    ax.set_ylabel('Sharpness Score')
+    ax.set_title('Brightness vs Sharpness by Camera', fontweight='bold')
+    ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
+    ax.grid(alpha=0.3)
+
+
+def draw_summary(ax, df, aggregates):
+    ax.axis('off')
+    metrics = aggregates['metrics']
+    eye_sides = aggregates['eye_sides']
+
+    summary_text = f"""
 PHASE A SUMMARY STATISTICS
 {'='*40}
 
-Total Images: {len(df)}
-Left Eye: {len(df[df['eye_side']=='LEFT'])}
-Right Eye: {len(df[df['eye_side']=='RIGHT'])}
+Total Images: {aggregates['total']}
+Left Eye: {eye_sides.get('LEFT', 0)}
+Right Eye: {eye_sides.get('RIGHT', 0)}
 
-Unique Cameras: {df['camera_model'].nunique()}
+Unique Cameras: {len(aggregates['per_camera'])}
 
 RESOLUTION
-  Mean: {df['megapixels'].mean():.2f} MP
-  Min: {df['megapixels'].min():.2f} MP
-  Max: {df['megapixels'].max():.2f} MP
+  Mean: {metrics.at['mean', 'megapixels']:.2f} MP
+  Min: {metrics.at['min', 'megapixels']:.2f} MP
+  Max: {metrics.at['max', 'megapixels']:.2f} MP
 
 BRIGHTNESS
-  Mean: {df['brightness'].mean():.2f}
-  Std: {df['brightness'].std():.2f}
+  Mean: {metrics.at['mean', 'brightness']:.2f}
+  Std: {metrics.at['std', 'brightness']:.2f}
 
 SHARPNESS
-  Mean: {df['sharpness_score'].mean():.2f}
-  Std: {df['sharpness_score'].std():.2f}
+  Mean: {metrics.at['mean', 'sharpness_score']:.2f}
+  Std: {metrics.at['std', 'sharpness_score']:.2f}
 
 FILE SIZE
-  Mean: {df['file_size_kb'].mean():.0f} KB
-  Range: {df['file_size_kb'].min():.0f} - {df['file_size_kb'].max():.0f} KB
+  Mean: {metrics.at['mean', 'file_size_kb']:.0f} KB
+  Range: {metrics.at['min', 'file_size_kb']:.0f} - {metrics.at['max', 'file_size_kb']:.0f} KB
 """
 
-ax9.text(0.1, 0.95, summary_text, transform=ax9.transAxes,
-         fontsize=10, verticalalignment='top', fontfamily='monospace',
-         bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.3))
-
-plt.tight_layout()
-plt.savefig(r'C:\Users\User2\Desktop\Nicole\phase_a_analysis_dashboard.png', dpi=300, bbox_inches='tight')
-print("Dashboard saved to: phase_a_analysis_dashboard.png")
-plt.show()
-
-# Generate individual camera reports
-print("\n" + "="*60)
-print("DETAILED CAMERA ANALYSIS")
-print("="*60)
-
-for camera in df['camera_model'].unique():
-    camera_df = df[df['camera_model'] == camera]
-    print(f"\n{camera.upper()}")
-    print("-" * 40)
-    print(f"  Image Count: {len(camera_df)}")
-    print(f"  Avg Resolution: {camera_df['megapixels'].mean():.2f} MP")
-    print(f"  Avg Brightness: {camera_df['brightness'].mean():.2f}")
-    print(f"  Avg Sharpness: {camera_df['sharpness_score'].mean():.2f}")
-    print(f"  Avg File Size: {camera_df['file_size_kb'].mean():.0f} KB")
-
-    # Flash usage if available
-    flash_info = camera_df['flash'].value_counts()
-    if not flash_info.empty and flash_info.index[0] != 'N/A':
-        print(f"  Flash Usage: {flash_info.to_dict()}")
-
-# Identify quality concerns
-print("\n" + "="*60)
-print("QUALITY CONCERNS")
-print("="*60)
-
-# Low resolution images
-low_res = df[df['megapixels'] < 2]
-if not low_res.empty:
-    print(f"\nLOW RESOLUTION IMAGES (<2 MP): {len(low_res)}")
-    for _, row in low_res.iterrows():
-        print(f"  - {row['filename']}: {row['megapixels']} MP ({row['camera_model']})")
-
-# Low sharpness images
-low_sharp = df[df['sharpness_score'] < 40]
-if not low_sharp.empty:
-    print(f"\nLOW SHARPNESS IMAGES (<40): {len(low_sharp)}")
-    for _, row in low_sharp.iterrows():
-        print(f"  - {row['filename']}: {row['sharpness_score']:.2f} ({row['camera_model']})")
-
-# Dark images
-dark = df[df['brightness'] < 100]
-if not dark.empty:
-    print(f"\nDARK IMAGES (<100 brightness): {len(dark)}")
-    for _, row in dark.iterrows():
-        print(f"  - {row['filename']}: {row['brightness']:.2f} ({row['camera_model']})")
-
-# Missing EXIF data
-no_exif = df[df['camera_model'] == 'N/A']
-if not no_exif.empty:
-    print(f"\nIMAGES WITH MISSING EXIF DATA: {len(no_exif)}")
-    for _, row in no_exif.iterrows():
-        print(f"  - {row['filename']}")
+    ax.text(0.1, 0.95, summary_text, transform=ax.transAxes,
+            fontsize=10, verticalalignment='top', fontfamily='monospace',
+            bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.3))
+
+
+# Dashboard panels in grid order (3x3)
+PANELS = {
+    'camera_distribution': draw_camera_distribution,
+    'resolution': draw_resolution,
+    'brightness': draw_brightness,
+    'sharpness': draw_sharpness,
+    'eye_side': draw_eye_side,
+    'size_vs_resolution': draw_size_vs_resolution,
+    'camera_quality': draw_camera_quality,
+    'brightness_vs_sharpness': draw_brightness_vs_sharpness,
+    'summary': draw_summary,
+}
+
+
+def _new_figure(figsize):
+    """Create a figure on the non-interactive Agg canvas (no pyplot state, never shown)"""
+    figure = Figure(figsize=figsize)
+    FigureCanvasAgg(figure)
+    return figure
+
+
+def build_dashboard(df, output_path=None, dpi=DEFAULT_DPI, aggregates=None):
+    """Render the 3x3 dashboard figure, saving it to output_path if given"""
+    if aggregates is None:
+        aggregates = compute_aggregates(df)
+    with sns.axes_style("whitegrid"):
+        figure = _new_figure((16, 12))
+        for index, draw in enumerate(PANELS.values(), start=1):
+            draw(figure.add_subplot(3, 3, index), df, aggregates)
+        figure.tight_layout()
+    if output_path is not None:
+        figure.savefig(output_path, dpi=dpi, bbox_inches='tight')
+    return figure
+
+
+def export_panels(df, output_dir, panels=None, dpi=DEFAULT_DPI, aggregates=None, figsize=(6, 5)):
+    """Save each named panel (default: all of PANELS) as <output_dir>/<panel>.png"""
+    if aggregates is None:
+        aggregates = compute_aggregates(df)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for name in panels or PANELS:
+        with sns.axes_style("whitegrid"):
+            figure = _new_figure(figsize)
+            PANELS[name](figure.add_subplot(1, 1, 1), df, aggregates)
+            figure.tight_layout()
+        path = output_dir / f'{name}.png'
+        figure.savefig(path, dpi=dpi, bbox_inches='tight')
+        paths.append(path)
+    return paths
+
+
+def print_camera_report(aggregates):
+    print("\n" + "="*60)
+    print("DETAILED CAMERA ANALYSIS")
+    print("="*60)
+
+    flash = aggregates['flash']
+    flash_cameras = set(flash.index.get_level_values('camera_model')) if len(flash) else set()
+    for camera, stats in aggregates['per_camera'].iterrows():
+        print(f"\n{str(camera).upper()}")
+        print("-" * 40)
+        print(f"  Image Count: {stats['count']:.0f}")
+        print(f"  Avg Resolution: {stats['megapixels']:.2f} MP")
+        print(f"  Avg Brightness: {stats['brightness']:.2f}")
+        print(f"  Avg Sharpness: {stats['sharpness_score']:.2f}")
+        print(f"  Avg File Size: {stats['file_size_kb']:.0f} KB")
+
+        # Flash usage if available
+        if camera in flash_cameras:
+            flash_info = flash.loc[camera].sort_values(ascending=False)
+            print(f"  Flash Usage: { {int(mode): int(count) for mode, count in flash_info.items()} }")
+
+
+def _concern_lines(rows, detail):
+    """Format '  - filename: detail (camera)' lines for a concern without iterating rows in Python"""
+    return ('  - ' + rows['filename'].astype(str) + detail).tolist()
+
+
+def print_quality_concerns(concerns):
+    print("\n" + "="*60)
+    print("QUALITY CONCERNS")
+    print("="*60)
+
+    sections = [
+        (f"LOW RESOLUTION IMAGES (<{MIN_MEGAPIXELS} MP)", concerns['low_resolution'],
+         lambda rows: ': ' + rows['megapixels'].astype(str) + ' MP'
+                      + ' (' + rows['camera_model'].astype(str) + ')'),
+        (f"LOW SHARPNESS IMAGES (<{MIN_SHARPNESS})", concerns['low_sharpness'],
+         lambda rows: ': ' + rows['sharpness_score'].map('{:.2f}'.format)
+                      + ' (' + rows['camera_model'].astype(str) + ')'),
+        (f"DARK IMAGES (<{MIN_BRIGHTNESS} brightness)", concerns['dark'],
+         lambda rows: ': ' + rows['brightness'].map('{:.2f}'.format)
+                      + ' (' + rows['camera_model'].astype(str) + ')'),
+        ("IMAGES WITH MISSING EXIF DATA", concerns['missing_exif'], lambda rows: ''),
+    ]
+    for title, rows, detail in sections:
+        if rows.empty:
+            continue
+        print(f"\n{title}: {len(rows)}")
+        print("\n".join(_concern_lines(rows, detail(rows))))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render the Phase A analysis dashboard")
+    parser.add_argument('--input', default=None,
+                        help="Tracking spreadsheet (.parquet or .csv; default: the one in BASE_DIR)")
+    parser.add_argument('--output', default=str(Path(BASE_DIR) / 'phase_a_analysis_dashboard.png'),
+                        help="Dashboard image path")
+    parser.add_argument('--dpi', type=int, default=DEFAULT_DPI, help=f"Output DPI (default: {DEFAULT_DPI})")
+    parser.add_argument('--panels-dir', default=None,
+                        help="Also save each panel as a separate PNG in this folder")
+    parser.add_argument('--panels', default=None,
+                        help=f"Comma-separated panels for --panels-dir (default: all of {', '.join(PANELS)})")
+    parser.add_argument('--quiet', action='store_true', help="Skip the camera and quality-concern reports")
+    args = parser.parse_args(argv)
+
+    df = load_dashboard_data(args.input)
+    aggregates = compute_aggregates(df)
+
+    build_dashboard(df, output_path=args.output, dpi=args.dpi, aggregates=aggregates)
+    print(f"Dashboard saved to: {args.output}")
+
+    if args.panels_dir:
+        panels = args.panels.split(',') if args.panels else None
+        paths = export_panels(df, args.panels_dir, panels=panels, dpi=args.dpi, aggregates=aggregates)
+        print(f"Saved {len(paths)} panel(s) to: {args.panels_dir}")
+
+    if not args.quiet:
+        print_camera_report(aggregates)
+        print_quality_concerns(quality_concerns(df))
+
+
+if __name__ == "__main__":
+    main()